@@ -0,0 +1,492 @@
+'''
+Module for storing geometries in columnar NumPy arrays
+'''
+
+import math
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+import numpy as np
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+# Define type for containing geometry elements
+TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
+TGeometryList = List[TGeometryItem]
+
+# Geometry types in the order of their type code
+GEOMETRY_TYPES: Tuple[str, ...] = ('POINT', 'LINE', 'ARC', 'ELLIPSE', 'SPLINE', 'LWPOLYLINE')
+
+# Point formats: 0 = [(X,Y,Z)], 1 = [(X,Y)], 2 = bare (X,Y) and 3 = bare (X,Y,Z) as created by import_txt_file
+POINT_FORMAT_LIST = 0
+POINT_FORMAT_LIST_2D = 1
+
+# ID # of geometries whose name has none ('TYPE' instead of 'TYPE:#')
+NO_ID = -1
+
+# Names of all arrays of a batch
+ARRAY_NAMES: Tuple[str, ...] = (
+    'types',
+    'points', 'point_formats', 'point_ids',
+    'lines', 'line_dimensions', 'line_ids',
+    'arcs', 'arc_dimensions', 'arc_ids',
+    'ellipses', 'ellipse_dimensions', 'ellipse_ids',
+    'spline_headers', 'spline_control_points', 'spline_weights', 'spline_knots',
+    'spline_control_offsets', 'spline_knot_offsets', 'spline_ids',
+    'lwpolyline_vertices', 'lwpolyline_offsets', 'lwpolyline_closed', 'lwpolyline_ids',
+)
+
+def _pad_xyz(values: Tuple[float, ...]) -> Tuple[float, ...]:
+    '''
+    Summary:
+        Pad a 2D coordinate with Z=0.0 so every stored coordinate is 3D
+    Args:
+        values (Tuple[float, ...]): 2D or 3D coordinate
+    Returns:
+        Tuple[float, ...]: 3D coordinate
+    '''
+
+    if len(values) == 3:
+        return tuple(values)
+    return (values[0], values[1], 0.0)
+#end def
+
+def _geometry_id(name: str) -> int:
+    '''
+    Summary:
+        Get the unique ID # from a geometry name ('TYPE:#')
+    Args:
+        name (str): Geometry name
+    Returns:
+        int: Unique ID #, NO_ID if the name has none
+    '''
+
+    try:
+        return int(name.split(':')[1])
+    except (IndexError, ValueError):
+        return NO_ID
+#end def
+
+def _geometry_name(geometry: str, geometry_id: int) -> str:
+    '''
+    Summary:
+        Create a geometry name from its type and unique ID #
+    Args:
+        geometry (str): Geometry type (eg. POINT, LINE, ...)
+        geometry_id (int): Unique ID #, NO_ID for names without one
+    Returns:
+        str: 'TYPE:#', or 'TYPE' if there is no ID #
+    '''
+
+    if geometry_id == NO_ID:
+        return geometry
+    return f'{geometry}:{geometry_id}'
+#end def
+
+def _dimensions(dimensions: List[Tuple[int, ...]], shape: Tuple[int, ...]) -> np.ndarray:
+    '''
+    Summary:
+        Store the number of values of coordinates, empty if every coordinate is 3D
+    Args:
+        dimensions (List[Tuple[int, ...]]): Number of values (2 or 3) of the coordinates of every geometry
+        shape (Tuple[int, ...]): Shape of the array for one geometry
+    Returns:
+        np.ndarray: (N,...) uint8 number of values, or an empty array if all are 3
+    '''
+
+    array = np.array(dimensions, dtype=np.uint8).reshape((-1,) + shape)
+    if np.all(array == 3):
+        return np.zeros((0,) + shape, dtype=np.uint8)
+    return array
+#end def
+
+class GeometryBatch:
+    '''
+    Columnar container for geometries, one contiguous float64 array per geometry type
+
+    Arrays (N = number of geometries of that type):
+        POINT: points (N,3) [X,Y,Z], point_formats (N,) uint8 (see POINT_FORMAT_LIST)
+        LINE: lines (N,2,3) [START (X,Y,Z), END (X,Y,Z)], line_dimensions (N,2) uint8
+        ARC: arcs (N,6) [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE], arc_dimensions (N,) uint8
+        ELLIPSE: ellipses (N,7) [CENTER X,Y,Z, MAJOR AXIS ENDPOINT X,Y,Z, RATIO], ellipse_dimensions (N,2) uint8
+        SPLINE: spline_headers (N,3) int [DEGREE, CLOSED, # CONTROL POINTS],
+            spline_control_points (M,3), spline_weights (M,), spline_knots (K,),
+            spline_control_offsets (N+1,), spline_knot_offsets (N+1,), weights of non-rational splines are NaN
+        LWPOLYLINE: lwpolyline_vertices (M,5) [X,Y,START WIDTH,END WIDTH,BULGE],
+            lwpolyline_offsets (N+1,), lwpolyline_closed (N,)
+    Every type also has an int64 id column (point_ids, line_ids, ...) holding the unique ID # of
+    each geometry and `types` (uint8) records the type code of every geometry in its original order.
+    NOTE 2D coordinates are padded with Z=0.0, point_formats and the *_dimensions arrays (2 or 3) restore them in to_list
+    NOTE The *_dimensions arrays are empty when every coordinate of the type is 3D, names without an ID # have NO_ID
+    '''
+
+    def __init__(self):
+        '''
+        Summary:
+            Create an empty batch
+        '''
+
+        # Original order of geometries as type codes (index into GEOMETRY_TYPES)
+        self.types: np.ndarray = np.zeros(0, dtype=np.uint8)
+
+        # POINT
+        self.points: np.ndarray = np.zeros((0, 3))
+        self.point_formats: np.ndarray = np.zeros(0, dtype=np.uint8)
+        self.point_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # LINE
+        self.lines: np.ndarray = np.zeros((0, 2, 3))
+        self.line_dimensions: np.ndarray = np.zeros((0, 2), dtype=np.uint8)
+        self.line_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # ARC
+        self.arcs: np.ndarray = np.zeros((0, 6))
+        self.arc_dimensions: np.ndarray = np.zeros(0, dtype=np.uint8)
+        self.arc_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # ELLIPSE
+        self.ellipses: np.ndarray = np.zeros((0, 7))
+        self.ellipse_dimensions: np.ndarray = np.zeros((0, 2), dtype=np.uint8)
+        self.ellipse_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # SPLINE
+        self.spline_headers: np.ndarray = np.zeros((0, 3), dtype=np.int64)
+        self.spline_control_points: np.ndarray = np.zeros((0, 3))
+        self.spline_weights: np.ndarray = np.zeros(0)
+        self.spline_knots: np.ndarray = np.zeros(0)
+        self.spline_control_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.spline_knot_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.spline_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # LWPOLYLINE
+        self.lwpolyline_vertices: np.ndarray = np.zeros((0, 5))
+        self.lwpolyline_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.lwpolyline_closed: np.ndarray = np.zeros(0)
+        self.lwpolyline_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+    #end def
+
+    def __len__(self) -> int:
+        '''
+        Summary:
+            Total number of geometries in the batch
+        Returns:
+            int: Number of geometries
+        '''
+
+        return len(self.types)
+    #end def
+
+    def __iter__(self) -> Iterator[TGeometryItem]:
+        '''
+        Summary:
+            Lazily yield every geometry as a TGeometryItem in its original order
+        Returns:
+            Iterator[TGeometryItem]: Geometries in TGeometryList format
+        '''
+
+        # Index of the next geometry for each type
+        counters: List[int] = [0]*len(GEOMETRY_TYPES)
+
+        for type_code in self.types.tolist():
+            yield self._item(type_code, counters[type_code])
+            counters[type_code] += 1
+        #end for
+    #end def
+
+    def count(self, geometry: str) -> int:
+        '''
+        Summary:
+            Number of geometries of a given type
+        Args:
+            geometry (str): Geometry type (eg. POINT, LINE, ...)
+        Returns:
+            int: Number of geometries of the given type
+        '''
+
+        return int(np.count_nonzero(self.types == GEOMETRY_TYPES.index(geometry)))
+    #end def
+
+    def _item(self, type_code: int, index: int) -> TGeometryItem:
+        '''
+        Summary:
+            Build the TGeometryItem for the index-th geometry of a type
+        Args:
+            type_code (int): Index into GEOMETRY_TYPES
+            index (int): Index of the geometry within its type arrays
+        Returns:
+            TGeometryItem: Geometry in TGeometryList format
+        '''
+
+        if type_code == 0:
+            # ('POINT:#', [(X,Y,Z)]) or ('POINT:#', [(X,Y)])
+            name = _geometry_name('POINT', self.point_ids[index])
+            point_format = self.point_formats[index]
+            point = tuple(self.points[index].tolist())
+            if point_format == POINT_FORMAT_LIST:
+                return (name, [point])
+            if point_format == POINT_FORMAT_LIST_2D:
+                return (name, [point[:2]])
+
+            # TXT points: ('POINT:#', (X,Y)) or ('POINT:#', (X,Y,Z))
+            return (name, point[:point_format])
+
+        elif type_code == 1:
+            # ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
+            start, end = self.lines[index].tolist()
+            if len(self.line_dimensions):
+                start_dimensions, end_dimensions = self.line_dimensions[index]
+                start, end = start[:start_dimensions], end[:end_dimensions]
+            return (_geometry_name('LINE', self.line_ids[index]), [tuple(start), tuple(end)])
+
+        elif type_code == 2:
+            # ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
+            values = self.arcs[index].tolist()
+            center_dimensions = self.arc_dimensions[index] if len(self.arc_dimensions) else 3
+            return (_geometry_name('ARC', self.arc_ids[index]), [tuple(values[0:center_dimensions]), tuple(values[3:6])])
+
+        elif type_code == 3:
+            # ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+            values = self.ellipses[index].tolist()
+            center_dimensions, axis_dimensions = self.ellipse_dimensions[index] if len(self.ellipse_dimensions) else (3, 3)
+            return (_geometry_name('ELLIPSE', self.ellipse_ids[index]), [tuple(values[0:center_dimensions]), tuple(values[3:3+axis_dimensions]), (values[6],)])
+
+        elif type_code == 4:
+            # ('SPLINE:#', [(DEGREE, CLOSED, #), CONTROL POINT(S)..., KNOT(S) [#,...], WEIGHT(S) [#,...]])
+            control_start, control_end = self.spline_control_offsets[index:index+2]
+            knot_start, knot_end = self.spline_knot_offsets[index:index+2]
+            points: List[Tuple[float, ...]] = [tuple(self.spline_headers[index].tolist())]
+            points.extend(map(tuple, self.spline_control_points[control_start:control_end].tolist()))
+            points.append(self.spline_knots[knot_start:knot_end].tolist())
+            weights = self.spline_weights[control_start:control_end]
+            points.append([] if np.isnan(weights).all() else weights.tolist())
+            return (_geometry_name('SPLINE', self.spline_ids[index]), points)
+
+        else:
+            # ('LWPOLYLINE:#', [(X,Y,START WIDTH,END WIDTH,BULGE)..., CLOSED])
+            start, end = self.lwpolyline_offsets[index:index+2]
+            points = list(map(tuple, self.lwpolyline_vertices[start:end].tolist()))
+            points.append(float(self.lwpolyline_closed[index]))
+            return (_geometry_name('LWPOLYLINE', self.lwpolyline_ids[index]), points)
+        #end if
+    #end def
+
+    def to_list(self) -> TGeometryList:
+        '''
+        Summary:
+            Convert the batch into a TGeometryList
+        Returns:
+            TGeometryList: Geometries in their original order
+        '''
+
+        return list(iter(self))
+    #end def
+
+    @classmethod
+    def from_list(cls, geometries: TGeometryList) -> 'GeometryBatch':
+        '''
+        Summary:
+            Create a batch from a TGeometryList
+        Args:
+            geometries (TGeometryList): Geometries to store
+        Raises:
+            Exception: Unknown geometry type
+        Returns:
+            GeometryBatch: Batch holding the passed geometries
+        '''
+
+        # Pass through existing batches
+        if isinstance(geometries, GeometryBatch):
+            return geometries
+
+        # Per type python lists, converted to arrays once at the end
+        types: List[int] = []
+        ids: Dict[str, List[int]] = {name: [] for name in GEOMETRY_TYPES}
+        points: List[Tuple[float, ...]] = []
+        point_formats: List[int] = []
+        lines: List[Tuple[Tuple[float, ...], ...]] = []
+        line_dimensions: List[Tuple[int, int]] = []
+        arcs: List[Tuple[float, ...]] = []
+        arc_dimensions: List[int] = []
+        ellipses: List[Tuple[float, ...]] = []
+        ellipse_dimensions: List[Tuple[int, int]] = []
+        spline_headers: List[Tuple[int, ...]] = []
+        spline_control_points: List[Tuple[float, ...]] = []
+        spline_weights: List[float] = []
+        spline_knots: List[float] = []
+        spline_control_offsets: List[int] = [0]
+        spline_knot_offsets: List[int] = [0]
+        lwpolyline_vertices: List[Tuple[float, ...]] = []
+        lwpolyline_offsets: List[int] = [0]
+        lwpolyline_closed: List[float] = []
+
+        for name, values in geometries:
+
+            # Truncate name to just include the geometry
+            geometry_name: str = name.split(':')[0].upper()
+
+            if geometry_name == 'POINT':
+
+                # TXT points are stored as a bare tuple
+                if values and not isinstance(values[0], (tuple, list)):
+                    points.append(_pad_xyz(values))
+                    point_formats.append(len(values))
+                else:
+                    points.append(_pad_xyz(values[0]))
+                    point_formats.append(POINT_FORMAT_LIST_2D if len(values[0]) == 2 else POINT_FORMAT_LIST)
+
+            elif geometry_name == 'LINE':
+                lines.append((_pad_xyz(values[0]), _pad_xyz(values[1])))
+                line_dimensions.append((len(values[0]), len(values[1])))
+
+            elif geometry_name == 'ARC':
+                arcs.append(_pad_xyz(values[0]) + tuple(values[1]))
+                arc_dimensions.append(len(values[0]))
+
+            elif geometry_name == 'ELLIPSE':
+                ellipses.append(_pad_xyz(values[0]) + _pad_xyz(values[1]) + (values[2][0],))
+                ellipse_dimensions.append((len(values[0]), len(values[1])))
+
+            elif geometry_name == 'SPLINE':
+                num_control_points: int = values[0][2]
+                spline_headers.append(tuple(values[0]))
+                spline_control_points.extend(_pad_xyz(point) for point in values[1:num_control_points+1])
+                spline_knots.extend(values[num_control_points+1])
+                # Non-rational splines have no weights, stored as NaN
+                weights = values[num_control_points+2]
+                spline_weights.extend(weights if len(weights) else [math.nan]*num_control_points)
+                spline_control_offsets.append(len(spline_control_points))
+                spline_knot_offsets.append(len(spline_knots))
+
+            elif geometry_name == 'LWPOLYLINE':
+                lwpolyline_vertices.extend(values[:-1])
+                lwpolyline_offsets.append(len(lwpolyline_vertices))
+                lwpolyline_closed.append(float(values[-1]))
+
+            else:
+                raise Exception(f'Unknown geometry type {geometry_name}')
+            #end if
+
+            types.append(GEOMETRY_TYPES.index(geometry_name))
+            ids[geometry_name].append(_geometry_id(name))
+        #end for
+
+        # Create arrays
+        batch = cls()
+        batch.types = np.array(types, dtype=np.uint8)
+        batch.points = np.array(points, dtype=np.float64).reshape(-1, 3)
+        batch.point_formats = np.array(point_formats, dtype=np.uint8)
+        batch.lines = np.array(lines, dtype=np.float64).reshape(-1, 2, 3)
+        batch.line_dimensions = _dimensions(line_dimensions, (2,))
+        batch.arcs = np.array(arcs, dtype=np.float64).reshape(-1, 6)
+        batch.arc_dimensions = _dimensions(arc_dimensions, ())
+        batch.ellipses = np.array(ellipses, dtype=np.float64).reshape(-1, 7)
+        batch.ellipse_dimensions = _dimensions(ellipse_dimensions, (2,))
+        batch.spline_headers = np.array(spline_headers, dtype=np.int64).reshape(-1, 3)
+        batch.spline_control_points = np.array(spline_control_points, dtype=np.float64).reshape(-1, 3)
+        batch.spline_weights = np.array(spline_weights, dtype=np.float64)
+        batch.spline_knots = np.array(spline_knots, dtype=np.float64)
+        batch.spline_control_offsets = np.array(spline_control_offsets, dtype=np.int64)
+        batch.spline_knot_offsets = np.array(spline_knot_offsets, dtype=np.int64)
+        batch.lwpolyline_vertices = np.array(lwpolyline_vertices, dtype=np.float64).reshape(-1, 5)
+        batch.lwpolyline_offsets = np.array(lwpolyline_offsets, dtype=np.int64)
+        batch.lwpolyline_closed = np.array(lwpolyline_closed, dtype=np.float64)
+        batch.point_ids = np.array(ids['POINT'], dtype=np.int64)
+        batch.line_ids = np.array(ids['LINE'], dtype=np.int64)
+        batch.arc_ids = np.array(ids['ARC'], dtype=np.int64)
+        batch.ellipse_ids = np.array(ids['ELLIPSE'], dtype=np.int64)
+        batch.spline_ids = np.array(ids['SPLINE'], dtype=np.int64)
+        batch.lwpolyline_ids = np.array(ids['LWPOLYLINE'], dtype=np.int64)
+
+        return batch
+    #end def
+
+    @classmethod
+    def from_points(cls, points: np.ndarray) -> 'GeometryBatch':
+        '''
+        Summary:
+            Create a batch of points numbered from 0
+        Args:
+            points (np.ndarray): (N,3) points [X,Y,Z]
+        Returns:
+            GeometryBatch: Batch of ('POINT:#', [(X,Y,Z)]) points
+        '''
+
+        batch = cls()
+        batch.types = np.zeros(len(points), dtype=np.uint8)
+        batch.points = points
+        batch.point_formats = np.zeros(len(points), dtype=np.uint8)
+        batch.point_ids = np.arange(len(points), dtype=np.int64)
+        return batch
+    #end def
+
+    @classmethod
+    def from_lines(cls, lines: np.ndarray) -> 'GeometryBatch':
+        '''
+        Summary:
+            Create a batch of lines numbered from 0
+        Args:
+            lines (np.ndarray): (N,2,3) lines [START, END]
+        Returns:
+            GeometryBatch: Batch of ('LINE:#', [START (X,Y,Z), END (X,Y,Z)]) lines
+        '''
+
+        batch = cls()
+        batch.types = np.ones(len(lines), dtype=np.uint8)
+        batch.lines = lines
+        batch.line_ids = np.arange(len(lines), dtype=np.int64)
+        return batch
+    #end def
+
+    def save(self, file: Union[str, BinaryIO]):
+        '''
+        Summary:
+            Write all arrays of the batch to an uncompressed .npz file
+        Args:
+            file (str or BinaryIO): Filename with path or open binary file
+        '''
+
+        np.savez(file, **{name: getattr(self, name) for name in ARRAY_NAMES})
+    #end def
+
+    @classmethod
+    def load(cls, file: Union[str, BinaryIO]) -> 'GeometryBatch':
+        '''
+        Summary:
+            Read a batch written by save
+        Args:
+            file (str or BinaryIO): Filename with path or open binary file
+        Raises:
+            Exception: File is not a saved batch
+        Returns:
+            GeometryBatch: Loaded batch
+        '''
+
+        batch = cls()
+        with np.load(file, allow_pickle=False) as arrays:
+            for name in ARRAY_NAMES:
+                try:
+                    setattr(batch, name, arrays[name])
+                except KeyError as error:
+                    # Batches saved before coordinate dimensions were stored are all 3D
+                    if name.endswith('_dimensions'):
+                        continue
+                    raise Exception(f'Missing array {name}') from error
+            #end for
+        #end with
+        return batch
+    #end def
+#end class
+
+def to_geometry_list(geometries) -> TGeometryList:
+    '''
+    Summary:
+        Return the passed geometries as a TGeometryList
+    Args:
+        geometries (TGeometryList or GeometryBatch): Geometries in either format
+    Returns:
+        TGeometryList: Geometries as a TGeometryList
+    '''
+
+    if isinstance(geometries, GeometryBatch):
+        return geometries.to_list()
+    return geometries
+#end def
@@ -1,14 +1,16 @@
+import gc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice, product
 from logging import warning
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import math
-import ezdxf
-from ezdxf.document import Drawing
-
-from ezdxf.layouts.layout import Modelspace
-from ezdxf.math import Vertex
+import numpy as np
+from geometry_batch import ARRAY_NAMES, GEOMETRY_TYPES, GeometryBatch, to_geometry_list
 
 __author__ = 'Joseph Lawler'
-__version__ = '1.2.0'
+__version__ = '1.3.0'
 
 CONVERSION_FACTORS = (
     1.0,  # 0 = Unitless (NO CONVERION USED)
@@ -71,363 +73,998 @@ NUM_SEGMENTS = 10
 # Spline conversion parameter
 SPLINE_PRECISION = 100
 
+# Minimum number of lines per knot span of a spline, same as ezdxf's flattening
+SPLINE_MIN_SEGMENTS = 4
+
+# Largest number of times a spline segment is halved
+SPLINE_MAX_DEPTH = 16
+
+# Number of unit arc templates kept by arc_to_lines
+TEMPLATE_CACHE_SIZE = 256
+
+# Largest angle of a single line when tessellating arcs by max_deviation, so full circles get at least 3 lines
+MAX_DEVIATION_ANGLE = 120.0
+
+# Largest number of arcs per ellipse when converting by max_deviation
+MAX_ELLIPSE_SEGMENTS = 4096
+
+# Number of given geometries converted together by the streaming conversions
+STREAM_CHUNK_SIZE = 1024
+
+# Default number of shapes kept by a ConversionCache
+CONVERSION_CACHE_SIZE = 4096
+
+# Decimal places of the microns used to match shapes in a ConversionCache
+CONVERSION_CACHE_DECIMALS = 6
+
+# Primes mixing the cube coordinates of spatial hashes
+SPATIAL_HASH_PRIMES = (73856093, 19349663, 83492791)
+
+# Offsets of a cube and its 26 neighbouring cubes, the cube itself first
+NEIGHBOUR_OFFSETS = sorted(product((-1, 0, 1), repeat=3), key=lambda offset: offset != (0, 0, 0))
+
+# Smallest number of given geometries per worker process when converting in parallel
+PARALLEL_MIN_GEOMETRIES = 1000
+
+# Geometry types returned by conversions with their GeometryBatch array and ID array
+CONVERTED_ARRAYS: Tuple[Tuple[str, str, str], ...] = (('POINT', 'points', 'point_ids'), ('LINE', 'lines', 'line_ids'), ('ARC', 'arcs', 'arc_ids'))
+
 # Define type for containing geometry elements
 TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
 TGeometryList = List[TGeometryItem]
 
+def _xyz_array(points: Iterable[Tuple[float, ...]]) -> np.ndarray:
+    '''
+    Summary:
+        Stack points into an (N,3) array, 2D points get Z=0.0
+    Args:
+        points (Iterable[Tuple[float, ...]]): Points (X,Y) or (X,Y,Z)
+    Returns:
+        np.ndarray: (N,3) array of points
+    '''
+
+    return np.array([tuple(point[:3]) + (0.0,)*(3-len(point)) for point in points], dtype=np.float64).reshape(-1, 3)
+#end def
+
+def _point_items(point_array: np.ndarray) -> TGeometryList:
+    '''
+    Summary:
+        Create point entries from an array of points
+        NOTE The garbage collector is paused while the entries are created, it would otherwise rescan the growing list many times
+    Args:
+        point_array (np.ndarray): (N,3) array of points
+    Returns:
+        TGeometryList: Points ('POINT:#', [(X,Y,Z)])
+    '''
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Create point entries: ('POINT:#': [(X,Y,Z)])
+        return [(f'POINT:{point_index}', [point]) for point_index, point in enumerate(zip(*point_array.T.tolist()))]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    #end try
+#end def
+
+def _line_items(line_array: np.ndarray) -> TGeometryList:
+    '''
+    Summary:
+        Create line entries from an array of lines
+        NOTE The garbage collector is paused while the entries are created, see _point_items
+    Args:
+        line_array (np.ndarray): (N,2,3) array of lines [START, END]
+    Returns:
+        TGeometryList: Lines ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
+    '''
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Create line entries: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
+        starts = zip(*line_array[:, 0].T.tolist())
+        ends = zip(*line_array[:, 1].T.tolist())
+        return [(f'LINE:{line_index}', [start, end]) for line_index, (start, end) in enumerate(zip(starts, ends))]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    #end try
+#end def
+
+def _arc_items(arc_array: np.ndarray) -> TGeometryList:
+    '''
+    Summary:
+        Create arc entries from an array of arcs
+        NOTE The garbage collector is paused while the entries are created, see _point_items
+    Args:
+        arc_array (np.ndarray): (N,6) array of arcs [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE]
+    Returns:
+        TGeometryList: Arcs ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
+    '''
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Create arc entries: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
+        centers = zip(*arc_array[:, 0:3].T.tolist())
+        values = zip(*arc_array[:, 3:6].T.tolist())
+        return [(f'ARC:{arc_index}', [center, value]) for arc_index, (center, value) in enumerate(zip(centers, values))]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    #end try
+#end def
+
+def _lines_to_point_array(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    num_segments: float = 0,
+    segment_length: float = 0,
+    conversion_factor: float = 1) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Interpolate points along all lines at once
+    Args:
+        starts (np.ndarray): (N,3) start points
+        ends (np.ndarray): (N,3) end points
+        num_segments (float, optional): Number of points per line. Defaults to 0.
+        segment_length (float, optional): Length between points in microns. Defaults to 0.
+        conversion_factor (float, optional): Factor to convert segment_length to microns. Defaults to 1.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (M,3) points and the index of the line of every point
+    '''
+
+    # Number of points per line, possibly fractional when derived from segment_length
+    if num_segments:
+        line_segments = np.full(len(starts), float(num_segments))
+    elif segment_length:
+        line_segments = np.linalg.norm(ends - starts, axis=1) / (segment_length*conversion_factor) + 1
+
+        # Catch num_segments being too large
+        if np.any(line_segments < 0):
+
+            # Let user know about error
+            warning ('segment_length is too large - check units')
+
+            # Use default param
+            line_segments[line_segments < 0] = NUM_SEGMENTS
+        #end if
+    else:
+        # Default param
+        line_segments = np.full(len(starts), float(NUM_SEGMENTS))
+    #end if
+
+    # Lines with the same start and end point become a single point
+    same = np.all(starts == ends, axis=1)
+    line_segments[same] = 1
+    counts = np.maximum(line_segments, 0).astype(np.int64)
+
+    # Step between points, a single point needs no step
+    divisors = line_segments - 1
+    divisors[divisors == 0] = 1
+    steps = (ends - starts) / divisors[:, None]
+
+    # Index of every point along its line
+    line_index = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    point_index = np.arange(len(line_index)) - np.repeat(offsets, counts)
+
+    return starts[line_index] + steps[line_index]*point_index[:, None], line_index
+#end def
+
+def _repeated_points(point_array: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Find points equal to the point before them
+    Args:
+        point_array (np.ndarray): (N,3) points in order
+    Returns:
+        np.ndarray: (N,) True for every repeated point
+    '''
+
+    repeated = np.zeros(len(point_array), dtype=bool)
+    repeated[1:] = np.all(point_array[1:] == point_array[:-1], axis=1)
+    return repeated
+#end def
+
 def lines_to_points(
     given_lines: TGeometryList, 
     num_segments: float = 0, 
     segment_length: float = 0, 
-    units: str = 'um') -> TGeometryList:
+    units: str = 'um',
+    sources: Optional[List[int]] = None,
+    connected: bool = False) -> TGeometryList:
     '''
     Summary:
-        Convert lines to a series of point geometries
+        Convert lines to a series of point geometries, all lines are interpolated at once with NumPy
     Args:
-        given_lines (TGeometryList): Given line to convert
+        given_lines (TGeometryList or GeometryBatch): Given line to convert
         num_segments (float, optional): Number of points to convert the given arc into. Defaults to 0.
         segment_length (float, optional): Length between points. Defaults to 0.
         units (str, optional): Units of segment_length. Defaults to 'um'.
+        sources (List[int], optional): If passed, the index of the given line each point was generated from is appended to it.
+        connected (bool, optional): Leave out points equal to the point before them, so the shared endpoint of adjacent lines is stored once. Defaults to False.
     Raises:
-        Warning: Invalid units
+        Exception: Invalid units
         Warning: segment_length is too large - check units
     Returns:
-        TGeometryList: List of points generated from given lines
+        TGeometryList: List of points generated from given lines, a GeometryBatch if one was given
     '''
 
-    # Generated Points
-    points: TGeometryList = []
+    # Set conversion factor
+    if units in UNIT_TABLE:
+        # Set units to passed units
+        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
+    else:
+        raise Exception('Invalid Units {}', units) from None
+
+    # Start and end points of all lines
+    if isinstance(given_lines, GeometryBatch):
+        starts = given_lines.lines[:, 0]
+        ends = given_lines.lines[:, 1]
+    else:
+        starts = _xyz_array(line[1][0] for line in given_lines)
+        ends = _xyz_array(line[1][1] for line in given_lines)
+    #end if
 
-    # Point index
-    point_index: int = 0
+    # Generate points of all lines
+    point_array, line_index = _lines_to_point_array(starts, ends, num_segments, segment_length, conversion_factor)
 
-    # Run through all given lines
-    for line in given_lines:
-        
-        # Get start and end points
-        values = line[1]
-        start_point = values[0]
-        end_point = values[1]
-
-        # Make sure start and end points are not the same
-        if not start_point == end_point:
-
-            # Set conversion factor
-            if units in UNIT_TABLE:
-                # Set units to passed units
-                conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
-            else:
-                conversion_factor = 1
-                raise Exception('Invalid Units {}', units) from None
+    # Store shared vertices once
+    if connected:
+        kept = ~_repeated_points(point_array)
+        point_array = point_array[kept]
+        line_index = line_index[kept]
+    #end if
 
-            # Create points based on number of segments desired
-            if num_segments:
+    # Record which line each point came from
+    if sources is not None:
+        sources.extend(line_index.tolist())
 
-                # Calc x_difference and y_difference
-                x_difference = ((end_point[0] - start_point[0]) / (num_segments-1))  
-                y_difference = ((end_point[1] - start_point[1]) / (num_segments-1))
+    # Return columnar batches for batches
+    if isinstance(given_lines, GeometryBatch):
+        return GeometryBatch.from_points(point_array)
+    #end if
 
-            # Create lines based on minimum line length 
-            elif segment_length:
+    return _point_items(point_array)
+#end def
 
-                # Calc segment angle based on min_length
-                segment_length = segment_length*conversion_factor
+def _cell_hashes(cells: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Spatial hash of integer cube coordinates
+    Args:
+        cells (np.ndarray): (N,3) int64 cube coordinates
+    Returns:
+        np.ndarray: (N,) int64 hashes, multiplication wraps around
+    '''
 
-                # Calc num_segments from segment_length
-                num_segments = ((math.dist(start_point,end_point)) / segment_length) + 1 
+    with np.errstate(over='ignore'):
+        return (cells[:, 0]*SPATIAL_HASH_PRIMES[0]) ^ (cells[:, 1]*SPATIAL_HASH_PRIMES[1]) ^ (cells[:, 2]*SPATIAL_HASH_PRIMES[2])
+#end def
 
-                # Catch num_segments being too large
-                if num_segments < 0:
+def _merge_mask(point_array: np.ndarray, tolerance: float) -> np.ndarray:
+    '''
+    Summary:
+        Find the points to keep when merging points within tolerance of an earlier kept point
+        NOTE Points are hashed into cubes of tolerance size, points without another point in the neighbouring cubes are kept at once
+        and the rest are compared in order against the kept points of the neighbouring cubes only, a cube holds few kept points
+    Args:
+        point_array (np.ndarray): (N,3) points in order
+        tolerance (float): Largest distance between merged points, 0 only merges equal points
+    Returns:
+        np.ndarray: (N,) True for every kept point
+    '''
 
-                    # Let user know about error
-                    warning ('segment_length is too large - check units')
+    kept = np.zeros(len(point_array), dtype=bool)
 
-                    # Use default param
-                    num_segments = NUM_SEGMENTS
-                
-                # Calc x_difference and y_difference
-                x_difference = ((end_point[0] - start_point[0]) / (num_segments-1))  
-                y_difference = ((end_point[1] - start_point[1]) / (num_segments-1))
+    # Keep the first of equal points
+    if tolerance <= 0:
+        _, first_points = np.unique(point_array, axis=0, return_index=True)
+        kept[first_points] = True
+        return kept
+    #end if
 
-            else:
+    # Hash of the cube of every point, colliding cubes only make points look crowded
+    cells = np.floor(point_array/tolerance).astype(np.int64)
+    cell_hashes, cell_counts = np.unique(_cell_hashes(cells), return_counts=True)
+
+    # Number of points in the neighbouring cubes of every point, including itself
+    neighbour_counts = np.zeros(len(point_array), dtype=np.int64)
+    for offset in NEIGHBOUR_OFFSETS:
+        # Sorted hashes are looked up much faster
+        neighbours = _cell_hashes(cells + np.array(offset, dtype=np.int64))
+        order = np.argsort(neighbours)
+        neighbours = neighbours[order]
+        found = np.minimum(np.searchsorted(cell_hashes, neighbours), len(cell_hashes) - 1)
+        neighbour_counts[order] += np.where(cell_hashes[found] == neighbours, cell_counts[found], 0)
+    #end for
 
-                # Default param
-                num_segments = NUM_SEGMENTS
+    # Points alone in their neighbourhood can not be close to any other point
+    kept[neighbour_counts == 1] = True
+
+    # Merge the crowded points in order, a point is kept if no kept point of the neighbouring cubes is close
+    crowded = np.flatnonzero(neighbour_counts > 1)
+    representatives: Dict[Tuple[int, int, int], List[List[float]]] = {}
+    for index, (x, y, z), point in zip(crowded.tolist(), cells[crowded].tolist(), point_array[crowded].tolist()):
+        close = False
+        for offset_x, offset_y, offset_z in NEIGHBOUR_OFFSETS:
+            for representative in representatives.get((x + offset_x, y + offset_y, z + offset_z), ()):
+                if math.dist(point, representative) <= tolerance:
+                    close = True
+                    break
+            #end for
+            if close:
+                break
+        #end for
+        if not close:
+            kept[index] = True
+            representatives.setdefault((x, y, z), []).append(point)
+        #end if
+    #end for
+    return kept
+#end def
 
-                # Calc x_difference and y_difference
-                x_difference = ((end_point[0] - start_point[0]) / (num_segments-1))  
-                y_difference = ((end_point[1] - start_point[1]) / (num_segments-1))
+def dedup_points(
+    given_geometry: TGeometryList,
+    tolerance: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Merge coincident points, every point within tolerance of an earlier kept point is left out
+        NOTE Other geometries are passed through, names are not changed
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries
+        tolerance (float, optional): Largest distance in microns between merged points, 0 only merges equal points. Defaults to 0.
+        sources (List[int], optional): If passed, the index of every returned geometry in the given geometry is appended to it.
+    Returns:
+        TGeometryList: Given geometries without merged points, a GeometryBatch if one was given
+    '''
 
-            # Define slope
-            slope = 0.0
+    # Merge columnar points directly
+    if isinstance(given_geometry, GeometryBatch):
+        point_positions = np.flatnonzero(given_geometry.types == GEOMETRY_TYPES.index('POINT'))
+        kept_points = _merge_mask(given_geometry.points, tolerance)
+        kept = np.ones(len(given_geometry.types), dtype=bool)
+        kept[point_positions[~kept_points]] = False
+
+        batch = GeometryBatch()
+        for array_name in ARRAY_NAMES:
+            setattr(batch, array_name, getattr(given_geometry, array_name))
+        batch.types = given_geometry.types[kept]
+        batch.points = given_geometry.points[kept_points]
+        batch.point_formats = given_geometry.point_formats[kept_points]
+        batch.point_ids = given_geometry.point_ids[kept_points]
+
+        # Record which geometries remain
+        if sources is not None:
+            sources.extend(np.flatnonzero(kept).tolist())
+        return batch
+    #end if
 
-            # Used as indicator for special cases
-            slope_type: str = 'NONE'
+    # Points, TXT points are a bare tuple
+    point_positions = [position for position, geometry in enumerate(given_geometry) if geometry[0].split(':')[0].upper() == 'POINT']
+    point_array = _xyz_array(
+        given_geometry[position][1] if not isinstance(given_geometry[position][1][0], (tuple, list)) else given_geometry[position][1][0]
+        for position in point_positions
+    )
+    merged = set(np.array(point_positions, dtype=np.int64)[~_merge_mask(point_array, tolerance)].tolist())
+
+    # Record which geometries remain
+    if sources is not None:
+        sources.extend(position for position in range(len(given_geometry)) if position not in merged)
+    return [geometry for position, geometry in enumerate(given_geometry) if position not in merged]
+#end def
 
-            if (start_point[1]-end_point[1]) == 0:
+def _segment_distances(point_array: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Distance of every point to its segment
+    Args:
+        point_array (np.ndarray): (N,3) points
+        starts (np.ndarray): (N,3) segment starts
+        ends (np.ndarray): (N,3) segment ends
+    Returns:
+        np.ndarray: (N,) distances, to the start of zero length segments
+    '''
 
-                # Horizontal line
-                slope_type = 'HORIZONTAL'
+    # Closest position along every segment, clamped to the segment
+    directions = ends - starts
+    lengths_squared = np.einsum('ij,ij->i', directions, directions)
+    offsets = np.einsum('ij,ij->i', point_array - starts, directions)
+    positions = np.clip(np.divide(offsets, lengths_squared, out=np.zeros_like(offsets), where=lengths_squared > 0), 0, 1)
+    return np.linalg.norm(point_array - (starts + positions[:, None]*directions), axis=1)
+#end def
 
-            elif (start_point[0]-end_point[0]) == 0:
+def _simplify_mask(vertex_array: np.ndarray, chain_ends: np.ndarray, tolerance: float) -> np.ndarray:
+    '''
+    Summary:
+        Douglas-Peucker simplification of many vertex chains at once
+        NOTE Every pass splits all open intervals of all chains at their farthest vertex, so there is one pass per level
+        of recursion instead of one call per interval
+    Args:
+        vertex_array (np.ndarray): (N,3) vertices of all chains one after another
+        chain_ends (np.ndarray): (N,) True for the first and last vertex of every chain
+        tolerance (float): Largest distance between a left out vertex and the simplified chain
+    Returns:
+        np.ndarray: (N,) True for every kept vertex
+    '''
 
-                # Vertical line
-                slope_type = 'VERTICAL'
+    kept = chain_ends.copy()
+    open_vertices = np.flatnonzero(~kept)
+    while len(open_vertices):
+
+        # Kept vertices around every open vertex
+        kept_vertices = np.flatnonzero(kept)
+        intervals = np.searchsorted(kept_vertices, open_vertices) - 1
+        distances = _segment_distances(vertex_array[open_vertices], vertex_array[kept_vertices[intervals]], vertex_array[kept_vertices[intervals+1]])
+
+        # Farthest distance of every interval, open vertices are sorted so intervals are contiguous
+        interval_starts = np.flatnonzero(np.r_[True, intervals[1:] != intervals[:-1]])
+        farthest = np.maximum.reduceat(distances, interval_starts)
+        interval_index = np.repeat(np.arange(len(interval_starts)), np.diff(np.r_[interval_starts, len(intervals)]))
+        split = farthest[interval_index] > tolerance
+
+        # Keep the first farthest vertex of intervals that are too far, vertices of the others are left out
+        candidates = np.flatnonzero(split & (distances == farthest[interval_index]))
+        _, first_candidates = np.unique(interval_index[candidates], return_index=True)
+        kept[open_vertices[candidates[first_candidates]]] = True
+        open_vertices = open_vertices[split & ~kept[open_vertices]]
+    #end while
+    return kept
+#end def
 
-            else:
+def _simplify_arrays(
+    types: np.ndarray,
+    point_array: np.ndarray,
+    line_array: np.ndarray,
+    tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Simplify the chains of consecutive points and connected consecutive lines of a geometry list
+    Args:
+        types (np.ndarray): (N,) GEOMETRY_TYPES index of every geometry
+        point_array (np.ndarray): (P,3) points in order
+        line_array (np.ndarray): (L,2,3) lines in order
+        tolerance (float): Largest distance in microns between a left out vertex and the simplified chain
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (P,) True for kept points, (L,) True for kept lines and
+        the index of the last given line every kept line replaces
+    '''
 
-                # Calculate the slope using point slope form
-                slope = ((start_point[1]-end_point[1])/(start_point[0]-end_point[0]))
-            #end if
+    # Points next to each other in the list form a chain
+    point_positions = np.flatnonzero(types == GEOMETRY_TYPES.index('POINT'))
+    point_ends = np.zeros(len(point_positions), dtype=bool)
+    if len(point_positions):
+        point_breaks = np.flatnonzero(np.diff(point_positions) != 1)
+        point_ends[np.r_[0, point_breaks, point_breaks + 1, len(point_positions) - 1]] = True
+    #end if
+    kept_points = _simplify_mask(point_array, point_ends, tolerance)
+
+    # Lines next to each other in the list starting at the end of the line before them form a chain
+    line_positions = np.flatnonzero(types == GEOMETRY_TYPES.index('LINE'))
+    if not len(line_positions):
+        return kept_points, np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64)
+    line_breaks = (np.diff(line_positions) != 1) | np.any(line_array[1:, 0] != line_array[:-1, 1], axis=1)
+    first_lines = np.flatnonzero(np.r_[True, line_breaks])
+    last_lines = np.flatnonzero(np.r_[line_breaks, True])
+    chain_index = np.cumsum(np.r_[0, line_breaks])
+
+    # Chain vertices are the starts of its lines followed by the end of its last line
+    start_vertices = np.arange(len(line_positions)) + chain_index
+    vertex_array = np.zeros((len(line_positions) + len(last_lines), 3))
+    vertex_array[start_vertices] = line_array[:, 0]
+    vertex_array[start_vertices[last_lines] + 1] = line_array[last_lines, 1]
+    vertex_ends = np.zeros(len(vertex_array), dtype=bool)
+    vertex_ends[start_vertices[first_lines]] = True
+    vertex_ends[start_vertices[last_lines] + 1] = True
+    kept_vertices = _simplify_mask(vertex_array, vertex_ends, tolerance)
+
+    # A kept line ends at the next kept vertex, the end of the line before it
+    kept_lines = kept_vertices[start_vertices]
+    kept_vertex_index = np.flatnonzero(kept_vertices)
+    next_vertices = kept_vertex_index[np.searchsorted(kept_vertex_index, start_vertices[kept_lines]) + 1]
+    return kept_points, kept_lines, next_vertices - chain_index[kept_lines] - 1
+#end def
 
-            # Calculate y-intercept
-            y_intercept = start_point[1] - slope*start_point[0]
+def simplify(
+    given_geometry: TGeometryList,
+    tolerance: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Reduce the vertices of point and line chains with Douglas-Peucker, every left out vertex is within tolerance of the simplified chain
+        NOTE Consecutive points form a chain, as do consecutive lines starting at the end of the line before them.
+        The first and last vertex of every chain are kept, other geometries are passed through and names are not changed
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries
+        tolerance (float, optional): Largest distance in microns between a left out vertex and the simplified chain, 0 only leaves out
+        vertices on a straight line. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given geometry every returned geometry starts at is appended to it.
+    Returns:
+        TGeometryList: Simplified geometries, a GeometryBatch if one was given
+    '''
+
+    # Simplify columnar geometries directly
+    if isinstance(given_geometry, GeometryBatch):
+        kept_points, kept_lines, last_lines = _simplify_arrays(given_geometry.types, given_geometry.points, given_geometry.lines, tolerance)
+        kept = np.ones(len(given_geometry.types), dtype=bool)
+        kept[given_geometry.types == GEOMETRY_TYPES.index('POINT')] = kept_points
+        kept[given_geometry.types == GEOMETRY_TYPES.index('LINE')] = kept_lines
+
+        batch = GeometryBatch()
+        for array_name in ARRAY_NAMES:
+            setattr(batch, array_name, getattr(given_geometry, array_name))
+        batch.types = given_geometry.types[kept]
+        batch.points = given_geometry.points[kept_points]
+        batch.point_formats = given_geometry.point_formats[kept_points]
+        batch.point_ids = given_geometry.point_ids[kept_points]
+        batch.lines = np.stack([given_geometry.lines[kept_lines, 0], given_geometry.lines[last_lines, 1]], axis=1).reshape(-1, 2, 3)
+        if len(given_geometry.line_dimensions):
+            batch.line_dimensions = np.stack([given_geometry.line_dimensions[kept_lines, 0], given_geometry.line_dimensions[last_lines, 1]], axis=1).reshape(-1, 2)
+        batch.line_ids = given_geometry.line_ids[kept_lines]
+
+        # Record which geometries remain
+        if sources is not None:
+            sources.extend(np.flatnonzero(kept).tolist())
+        return batch
+    #end if
+
+    # Geometry types, points and lines, TXT points are a bare tuple
+    names = [geometry[0].split(':')[0].upper() for geometry in given_geometry]
+    types = np.array([GEOMETRY_TYPES.index(name) if name in GEOMETRY_TYPES else len(GEOMETRY_TYPES) for name in names], dtype=np.int64)
+    point_array = _xyz_array(
+        geometry[1] if not isinstance(geometry[1][0], (tuple, list)) else geometry[1][0]
+        for geometry, name in zip(given_geometry, names) if name == 'POINT'
+    )
+    line_array = _xyz_array(point for geometry, name in zip(given_geometry, names) if name == 'LINE' for point in geometry[1][:2]).reshape(-1, 2, 3)
+    kept_points, kept_lines, last_lines = _simplify_arrays(types, point_array, line_array, tolerance)
+
+    # Kept lines end where the last line they replace ended
+    point_positions = np.flatnonzero(types == GEOMETRY_TYPES.index('POINT'))
+    line_positions = np.flatnonzero(types == GEOMETRY_TYPES.index('LINE'))
+    line_ends = dict(zip(line_positions[kept_lines].tolist(), line_positions[last_lines].tolist()))
+    left_out = set(point_positions[~kept_points].tolist()) | set(line_positions[~kept_lines].tolist())
+
+    simplified: TGeometryList = []
+    for position, geometry in enumerate(given_geometry):
+        if position in left_out:
+            continue
+        if position in line_ends and line_ends[position] != position:
+            geometry = (geometry[0], [geometry[1][0], given_geometry[line_ends[position]][1][1]])
+        simplified.append(geometry)
+
+        # Record which geometries remain
+        if sources is not None:
+            sources.append(position)
+    #end for
+    return simplified
+#end def
 
-            # Generate points based on x-values
-            for index in range(0,int(num_segments)):
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _unit_arc_template(count: int, segment_angle: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Cosines and sines of the vertex angles of a unit arc starting at 0 degrees, shared by all arcs with the same segments
+    Args:
+        count (int): Number of segments
+        segment_angle (float): Angle of each segment in degrees
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Cosines and sines of the count+1 vertex angles
+    '''
 
-                if slope_type == 'NONE':
+    angles = np.radians(segment_angle*np.arange(count+1))
+    return np.cos(angles), np.sin(angles)
+#end def
 
-                    # Calculate next point for a normal slope
-                    x = start_point[0] + x_difference*index
-                    y = x*slope + y_intercept
+def _arc_segments(
+    radius: np.ndarray,
+    degree: np.ndarray,
+    num_segments: float = 0,
+    segment_length: float = 0,
+    conversion_factor: float = 1,
+    max_deviation: float = 0) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Number of segments and segment angle of every arc
+    Args:
+        radius (np.ndarray): Radius of every arc
+        degree (np.ndarray): Sweep of every arc in degrees
+        num_segments (float, optional): Number of lines per arc, used if larger than 2. Defaults to 0.
+        segment_length (float, optional): Length of the lines. Defaults to 0.
+        conversion_factor (float, optional): Factor to convert segment_length to microns. Defaults to 1.
+        max_deviation (float, optional): Largest distance in microns between a line and its arc, overrides num_segments and segment_length. Defaults to 0.
+    Raises:
+        Warning: segment_length is too large - check units
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Possibly fractional number of segments and segment angle in degrees
+    '''
 
-                elif slope_type == 'HORIZONTAL':
+    # Create the fewest lines whose sagitta r*(1-cos(angle/2)) stays within max_deviation
+    if max_deviation > 0:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            max_angle = np.degrees(2*np.arccos(np.clip(1 - max_deviation/radius, -1, 1)))
+        max_angle = np.minimum(np.nan_to_num(max_angle, nan=MAX_DEVIATION_ANGLE), MAX_DEVIATION_ANGLE)
+        arc_segments = np.maximum(np.ceil(np.abs(degree)/max_angle), 1)
+        return arc_segments, degree/arc_segments
 
-                    # Calculate next point for a horizontal slope
-                    x = start_point[0] + x_difference*index
-                    y = start_point[1]
+    # Create lines based on number of segments desired
+    elif num_segments > 2:
+        arc_segments = np.full(len(radius), float(num_segments))
 
-                elif slope_type == 'VERTICAL':
+    # Create lines based on minimum line length
+    elif segment_length > 0:
 
-                    # Calculate next point for vertical slope
-                    x = start_point[0]
-                    y = start_point[1] + y_difference*index
+        # Calculate arc lengths
+        arc_length = 2*math.pi*radius*(degree/360)
 
-                # Create point entry: ('POINT:#': [(X,Y,Z)])
-                point = (
-                    f'POINT:{point_index}',
-                        [
-                            tuple([x,y,0.0]),
-                        ]
-                )
+        # Catch too large segment_length
+        too_large = segment_length*conversion_factor > arc_length
+        if np.any(too_large):
 
-                # Update point_index
-                point_index += 1
+            # Let user know about error
+            warning ('segment_length is too large - check units')
+        #end if
 
-                # Add point to points
-                points.append(point)
-        else:
-            # Same start and end point
-            # Create point entry: ('POINT:#': [(X,Y,Z)])
-            point = (
-                f'POINT:{point_index}',
-                    [
-                        tuple([start_point[0],start_point[1],0.0]),
-                    ]
-            )
+        # Calc num_segments from segment angle, default param for too large segment_length
+        with np.errstate(divide='ignore', invalid='ignore'):
+            segment_angle = (segment_length*conversion_factor/(radius*2*math.pi))*360
+            arc_segments = np.where(too_large, NUM_SEGMENTS, degree/segment_angle)
+        return arc_segments, np.where(too_large, degree/NUM_SEGMENTS, segment_angle)
+    else:
+        # Default param
+        arc_segments = np.full(len(radius), float(NUM_SEGMENTS))
+    #end if
 
-            # Add point to points
-            points.append(point)
+    return arc_segments, degree/arc_segments
+#end def
 
-        # end if
+def _arcs_to_line_array(
+    arcs: np.ndarray,
+    num_segments: float = 0,
+    segment_length: float = 0,
+    conversion_factor: float = 1,
+    max_deviation: float = 0) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Tessellate all arcs at once, arcs with the same segments are placed from one shared unit arc template
+    Args:
+        arcs (np.ndarray): (N,6) arcs [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE]
+        num_segments (float, optional): Number of lines per arc. Defaults to 0.
+        segment_length (float, optional): Length of the lines. Defaults to 0.
+        conversion_factor (float, optional): Factor to convert segment_length to microns. Defaults to 1.
+        max_deviation (float, optional): Largest distance in microns between a line and its arc. Defaults to 0.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (M,2,3) lines [START, END] and the index of the arc of every line
+    '''
+
+    centers = arcs[:, 0:3]
+    radius = arcs[:, 3]
+    start_angle = arcs[:, 4]
+    end_angle = arcs[:, 5]
+
+    # Arcs run counterclockwise, so an end angle below the start angle wraps around
+    sweep = end_angle - start_angle
+    sweep = np.where(sweep < 0, sweep + 360, sweep)
+
+    # Segments of every arc
+    arc_segments, segment_angle = _arc_segments(radius, sweep, num_segments, segment_length, conversion_factor, max_deviation)
+    counts = np.maximum(np.trunc(np.nan_to_num(arc_segments)), 0).astype(np.int64)
+
+    # Connect last line to the end point if the segments do not reach it
+    tails = (np.mod(arc_segments, 1) != 0) & (counts > 0)
+    lines_per_arc = counts + tails
+    offsets = np.cumsum(lines_per_arc) - lines_per_arc
+    lines = np.empty((int(lines_per_arc.sum()), 2, 3))
+
+    # Rotate start of every arc
+    start_cos = np.cos(np.radians(start_angle))
+    start_sin = np.sin(np.radians(start_angle))
+
+    # Place the arcs of every group of equal segments
+    groups, group_index = np.unique(np.stack([counts, segment_angle], axis=1), axis=0, return_inverse=True)
+    group_index = group_index.reshape(-1)
+    for group_number, (count, angle) in enumerate(groups):
+        count = int(count)
+        if count == 0:
+            continue
+        members = np.flatnonzero(group_index == group_number)
+
+        # Rotate, scale and translate template
+        template_cos, template_sin = _unit_arc_template(count, float(angle))
+        cos = start_cos[members, None]*template_cos - start_sin[members, None]*template_sin
+        sin = start_sin[members, None]*template_cos + start_cos[members, None]*template_sin
+        points = np.empty((len(members), count+1, 3))
+        points[:, :, 0] = centers[members, None, 0] + radius[members, None]*cos
+        points[:, :, 1] = centers[members, None, 1] + radius[members, None]*sin
+        points[:, :, 2] = centers[members, None, 2]
+
+        # Make each pair of points into a line
+        positions = offsets[members, None] + np.arange(count)
+        lines[positions, 0] = points[:, :-1]
+        lines[positions, 1] = points[:, 1:]
+
+        # Last point is the start of a tail
+        lines[(offsets + counts)[members[tails[members]]], 0] = points[tails[members], -1]
     #end for
 
-    return points
+    # End points of tails
+    tail_arcs = np.flatnonzero(tails)
+    tail_positions = offsets[tail_arcs] + counts[tail_arcs]
+    lines[tail_positions, 1, 0] = centers[tail_arcs, 0] + radius[tail_arcs]*np.cos(np.radians(end_angle[tail_arcs]))
+    lines[tail_positions, 1, 1] = centers[tail_arcs, 1] + radius[tail_arcs]*np.sin(np.radians(end_angle[tail_arcs]))
+    lines[tail_positions, 1, 2] = centers[tail_arcs, 2]
+
+    return lines, np.repeat(np.arange(len(arcs)), lines_per_arc)
 #end def
 
 def arc_to_lines(
     given_arcs: TGeometryList, 
     num_segments: float = 0, 
     segment_length: float = 0, 
-    units: str = 'um') -> TGeometryList:
+    units: str = 'um',
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
     '''
     Summary:
-        Converts arcs to a series of line geometries
+        Converts arcs to a series of line geometries, all arcs are tessellated at once with NumPy
+        NOTE Lines of full circles end at the start point, if the segments do not reach the end angle a last shorter line is added
     Args:
-        given_arcs (TGeometryList): Given arc to convert
+        given_arcs (TGeometryList or GeometryBatch): Given arc to convert
         num_segments (float, optional): Number of lines to convert the given arc into. Defaults to 0.
         segment_length (float, optional): Length of the lines to convert the given arc into. Defaults to 0.
         units (str, optional): Units of segment_length. Defaults to 'um'.
+        max_deviation (float, optional): Largest distance in microns between a line and its arc, picks the fewest lines per arc
+        and overrides num_segments and segment_length. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given arc each line was generated from is appended to it.
     Raises:
-        Warning: Invalid units
+        Exception: Invalid units
         Warning: segment_length is too large - check units
     Returns:
-        TGeometryList: List of lines generated from given arcs
+        TGeometryList: List of lines generated from given arcs, a GeometryBatch if one was given
     '''
-    
-    # Generated Lines
-    lines: TGeometryList = [] 
-
-    # Line index
-    line_index: int = 0
-    
-    # Run through all given arcs
-    for arc in given_arcs:
-
-        # If an arc
-        if arc[0].__contains__('ARC'):
-
-            # Define arc values
-            values = arc[1]
-            center = values[0]
-            radius = values[1][0]
-            start_angle = values[1][1]
-            end_angle = values[1][2]
-            degree = end_angle - start_angle
-
-            # Points
-            points: List[Tuple[float, ...]] = []
-
-            # Set conversion factor
-            if units in UNIT_TABLE:
-                # Set units to passed units
-                conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
-            else:
-                conversion_factor = 1
-                raise Exception('Invalid Units {}', units) from None
-
-            # Create lines based on number of segments desired
-            if num_segments > 2:
-
-                # Calc segment angle based on num_segments
-                segment_angle = degree/(num_segments)  
-
-            # Create lines based on minimum line length 
-            elif segment_length > 0:
 
-                # Calculate arc length
-                arc_length = 2*math.pi*radius*(degree/360)
+    # Set conversion factor
+    if units in UNIT_TABLE:
+        # Set units to passed units
+        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
+    else:
+        raise Exception('Invalid Units {}', units) from None
 
-                # Catch too large segment_length
-                if segment_length*conversion_factor > arc_length:
-                    
-                    # Let user know about error
-                    warning ('segment_length is too large - check units')
-                    
-                    # Default param
-                    num_segments = NUM_SEGMENTS
-    
-                    # Calc segment angle based on num_segments
-                    segment_angle = degree/(num_segments) 
-
-                else:
+    # Tessellate arcs of columnar batches directly
+    if isinstance(given_arcs, GeometryBatch):
+        if len(given_arcs.arcs) != len(given_arcs):
+            # Keep non-arcs in place
+            return GeometryBatch.from_list(arc_to_lines(given_arcs.to_list(), num_segments, segment_length, units, max_deviation, sources))
 
-                    # Calc segment angle based on min_length
-                    segment_angle = (segment_length*conversion_factor/(radius*2*math.pi))*360
-
-                    # Calc num_segments from segment_angle
-                    num_segments = degree/segment_angle
-            else:
+        line_array, arc_index = _arcs_to_line_array(given_arcs.arcs, num_segments, segment_length, conversion_factor, max_deviation)
 
-                # Default param
-                num_segments = NUM_SEGMENTS
+        # Record which arc each line came from
+        if sources is not None:
+            sources.extend(arc_index.tolist())
 
-                # Calc segment angle based on num_segments
-                segment_angle = degree/(num_segments)  
-
-            #end if
+        return GeometryBatch.from_lines(line_array)
+    #end if
 
-            # For each point on the arc
-            for index in range(0, int(num_segments)+1):
+    # Arcs in the given list
+    arc_numbers = [arc_number for arc_number, arc in enumerate(given_arcs) if 'ARC' in arc[0]]
+    arcs = np.array(
+        [tuple(given_arcs[arc_number][1][0][:3]) + tuple(given_arcs[arc_number][1][1][:3]) for arc_number in arc_numbers],
+        dtype=np.float64).reshape(-1, 6)
+
+    # Tessellate all arcs
+    line_array, arc_index = _arcs_to_line_array(arcs, num_segments, segment_length, conversion_factor, max_deviation)
+    lines: TGeometryList = _line_items(line_array)
+    if len(arc_numbers) == len(given_arcs):
+
+        # Record which arc each line came from
+        if sources is not None:
+            sources.extend(arc_index.tolist())
+        return lines
+    #end if
 
-                # Calc point's angle
-                angle = start_angle + (segment_angle * index) 
+    # Put lines of every arc in place, if not an arc just add
+    line_ranges = dict(zip(arc_numbers, np.cumsum(np.bincount(arc_index, minlength=len(arcs))).tolist()))
+    mixed: TGeometryList = []
+    first_line = 0
+    for arc_number, arc in enumerate(given_arcs):
+        if arc_number in line_ranges:
+            last_line = line_ranges[arc_number]
+            mixed.extend(lines[first_line:last_line])
+            count = last_line - first_line
+            first_line = last_line
+        else:
+            mixed.append(arc)
+            count = 1
+        #end if
 
-                # Convert to cartesian
-                x = radius*math.cos(math.radians(angle))/conversion_factor  
-                y = radius*math.sin(math.radians(angle))/conversion_factor 
+        # Record which arc the lines came from
+        if sources is not None:
+            sources.extend([arc_number]*count)
+    #end for
+    return mixed
+#end def
 
-                # Add point with center offset
-                points.append([x+center[0], y+center[1], center[2]]) 
-            #end for
+def arc_to_points(
+    given_arcs: TGeometryList, 
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    units: str = 'um',
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Converts arcs straight to the points arc_to_lines would connect, the points lie on the arcs and no lines are created
+        NOTE Full circles do not repeat their start point, lines mixed in with the arcs are converted like lines_to_points
+        NOTE A full circle gives num_segments points (NUM_SEGMENTS by default), the lines between them are not sampled again
+    Args:
+        given_arcs (TGeometryList or GeometryBatch): Given arcs to convert
+        num_segments (float, optional): Number of lines between the points of every arc. Defaults to 0.
+        segment_length (float, optional): Length of the lines between the points of every arc. Defaults to 0.
+        units (str, optional): Units of segment_length. Defaults to 'um'.
+        max_deviation (float, optional): Largest distance in microns between the lines through the points and their arc,
+        overrides num_segments and segment_length. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given arc each point was generated from is appended to it.
+    Raises:
+        Exception: Invalid units
+        Warning: segment_length is too large - check units
+    Returns:
+        TGeometryList: List of points generated from given arcs, a GeometryBatch if one was given
+    '''
 
-            # Make each point into a line
-            for index in range(0, int(num_segments)):
+    # Set conversion factor
+    if units in UNIT_TABLE:
+        # Set units to passed units
+        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
+    else:
+        raise Exception('Invalid Units {}', units) from None
+
+    # Arcs [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE] and lines with the index of their given geometry
+    if isinstance(given_arcs, GeometryBatch):
+        arcs = given_arcs.arcs
+        arc_numbers = np.flatnonzero(given_arcs.types == GEOMETRY_TYPES.index('ARC'))
+        lines = given_arcs.lines
+        line_numbers = np.flatnonzero(given_arcs.types == GEOMETRY_TYPES.index('LINE'))
+    else:
+        arc_numbers = np.array([arc_number for arc_number, arc in enumerate(given_arcs) if 'ARC' in arc[0]], dtype=np.int64)
+        arcs = np.array([tuple(given_arcs[arc_number][1][0][:3]) + tuple(given_arcs[arc_number][1][1][:3]) for arc_number in arc_numbers], dtype=np.float64).reshape(-1, 6)
+        line_numbers = np.array([line_number for line_number, line in enumerate(given_arcs) if 'LINE' in line[0]], dtype=np.int64)
+        lines = np.array([(given_arcs[line_number][1][0], given_arcs[line_number][1][1]) for line_number in line_numbers], dtype=np.float64).reshape(-1, 2, 3)
+    #end if
 
-                # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-                line = (
-                        f'LINE:{line_index}',
-                        [
-                            tuple([conversion_factor * x for x in points[index]]),
-                            tuple([conversion_factor * x for x in points[index+1]])
-                        ]
-                )
+    # Start of every line and the end of the last line of arcs that are not full circles
+    line_array, arc_index = _arcs_to_line_array(arcs, num_segments, segment_length, conversion_factor, max_deviation)
+    last_lines = np.flatnonzero(np.append(arc_index[1:] != arc_index[:-1], True)) if len(arc_index) else np.zeros(0, dtype=np.int64)
+    open_arcs = (arcs[arc_index[last_lines], 5] - arcs[arc_index[last_lines], 4]) % 360 != 0
+    arc_points = np.concatenate([line_array[:, 0], line_array[last_lines[open_arcs], 1]])
+    arc_index = np.concatenate([arc_index, arc_index[last_lines[open_arcs]]])
 
-                # Update line_index
-                line_index += 1
+    # Points of mixed in lines
+    line_points, line_index = _lines_to_point_array(lines[:, 0], lines[:, 1], num_segments, segment_length, conversion_factor)
 
-                # Add line to lines
-                lines.append(line)
-            #end for
+    # Keep points in the order of their given geometries
+    point_sources = np.concatenate([arc_numbers[arc_index], line_numbers[line_index]]).astype(np.int64)
+    order = np.argsort(point_sources, kind='stable')
+    point_array = np.concatenate([arc_points, line_points])[order]
 
-            # Connect ends
-            if end_angle - start_angle == 360:
+    # Record which arc each point came from
+    if sources is not None:
+        sources.extend(point_sources[order].tolist())
 
-                # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-                line = (
-                        f'LINE:{line_index}',
-                        [
-                            tuple([conversion_factor * x for x in points[num_segments]]),
-                            tuple([conversion_factor * x for x in points[0]])
-                        ]
-                )
+    # Return columnar batches for batches
+    if isinstance(given_arcs, GeometryBatch):
+        return GeometryBatch.from_points(point_array)
+    #end if
 
-                # Update line_index
-                line_index += 1
+    return _point_items(point_array)
+#end def
 
-                # Add line to lines
-                lines.append(line)
+def _ellipse_key_points(major_radius: float, minor_radius: float, num_segments: int) -> np.ndarray:
+    '''
+    Summary:
+        Arc start and mid points of an ellipse at the origin, evenly spaced by polar angle
+    Args:
+        major_radius (float): Major radius
+        minor_radius (float): Minor radius
+        num_segments (int): Number of arcs
+    Returns:
+        np.ndarray: (2*num_segments,2) points
+    '''
 
-            # Create line to connect last line to end
-            # Meant for using segment_length where the last line does not connect to end point
-            elif num_segments%1 != 0:
-                
-                # Find end point
-                x = radius*math.cos(math.radians(end_angle))/conversion_factor
-                y = radius*math.sin(math.radians(end_angle))/conversion_factor 
+    theta = np.radians(np.arange(2*num_segments)*(360/num_segments)/2)
+    radius = major_radius*minor_radius / np.hypot(minor_radius*np.cos(theta), major_radius*np.sin(theta))
+    return np.stack([radius*np.cos(theta), radius*np.sin(theta)], axis=1)
+#end def
 
-                 # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-                line = (
-                        f'LINE:{line_index}',
-                        [
-                            points[-1],
-                            tuple([x*conversion_factor,y*conversion_factor,0.0])
-                        ]
-                )
+def _ellipse_arc_deviation(major_radius: float, minor_radius: float, num_segments: int) -> float:
+    '''
+    Summary:
+        Largest distance between an ellipse at the origin and the arcs ellipse_to_arcs creates for it
+    Args:
+        major_radius (float): Major radius
+        minor_radius (float): Minor radius
+        num_segments (int): Number of arcs
+    Returns:
+        float: Largest distance, sampled at 8 points per arc
+    '''
 
-                # Update line_index
-                line_index += 1
+    # Start, mid and end point of every arc
+    points = _ellipse_key_points(major_radius, minor_radius, num_segments)
+    p1, p2, p3 = points[0::2], points[1::2], np.roll(points[0::2], -1, axis=0)
+
+    # Circumcenter and radius of the 3 points
+    d = 2*(p1[:, 0]*(p2[:, 1]-p3[:, 1]) + p2[:, 0]*(p3[:, 1]-p1[:, 1]) + p3[:, 0]*(p1[:, 1]-p2[:, 1]))
+    if np.any(d == 0):
+        return math.inf
+    s1, s2, s3 = (p1**2).sum(axis=1), (p2**2).sum(axis=1), (p3**2).sum(axis=1)
+    cx = (s1*(p2[:, 1]-p3[:, 1]) + s2*(p3[:, 1]-p1[:, 1]) + s3*(p1[:, 1]-p2[:, 1]))/d
+    cy = (s1*(p3[:, 0]-p2[:, 0]) + s2*(p1[:, 0]-p3[:, 0]) + s3*(p2[:, 0]-p1[:, 0]))/d
+    radius = np.hypot(p1[:, 0]-cx, p1[:, 1]-cy)
+
+    # Ellipse points between the arc ends
+    theta = np.radians((np.arange(num_segments)[:, None] + np.linspace(0, 1, 9)[None, 1:-1])*(360/num_segments))
+    ellipse_radius = major_radius*minor_radius / np.hypot(minor_radius*np.cos(theta), major_radius*np.sin(theta))
+    x = ellipse_radius*np.cos(theta)
+    y = ellipse_radius*np.sin(theta)
+    return float(np.max(np.abs(np.hypot(x-cx[:, None], y-cy[:, None]) - radius[:, None])))
+#end def
 
-                # Add line to lines
-                lines.append(line)
+def _ellipse_segments(major_radius: float, minor_radius: float, max_deviation: float) -> int:
+    '''
+    Summary:
+        Fewest arcs for which ellipse_to_arcs stays within max_deviation of an ellipse
+    Args:
+        major_radius (float): Major radius
+        minor_radius (float): Minor radius
+        max_deviation (float): Largest distance in microns
+    Returns:
+        int: Number of arcs, at most MAX_ELLIPSE_SEGMENTS
+    '''
 
+    # Double the number of arcs until the ellipse is close enough
+    low, high = 2, 4
+    while high < MAX_ELLIPSE_SEGMENTS and _ellipse_arc_deviation(major_radius, minor_radius, high) > max_deviation:
+        low, high = high, high*2
+    #end while
+    high = min(high, MAX_ELLIPSE_SEGMENTS)
+
+    # Bisect between the last failing and the first passing number of arcs
+    while high - low > 1:
+        middle = (low + high)//2
+        if _ellipse_arc_deviation(major_radius, minor_radius, middle) > max_deviation:
+            low = middle
         else:
-
-            # If not an arc just add
-            lines.append(arc)
-
-        #end if
-    #end if
-    return lines
+            high = middle
+    #end while
+    return high
 #end def
 
 def ellipse_to_arcs(
     given_ellipsis: TGeometryList, 
-    num_segments: float = 0) -> TGeometryList:
+    num_segments: float = 0,
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
     '''
     Summary:
         Converts ellipsis into a series of arcs
     Args:
-        given_ellipsis (TGeometryList): Given ellipses to convert
+        given_ellipsis (TGeometryList or GeometryBatch): Given ellipses to convert
         num_segments (float, optional): Number of arcs to convert the given ellipse into. Defaults to 0.
+        max_deviation (float, optional): Largest distance in microns between the arcs and their ellipse, picks the fewest arcs per ellipse
+        and overrides num_segments. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given ellipse each arc was generated from is appended to it.
     Raises:
         Warning: Divide by zero error
         Warning: Invalid units
     Returns:
-        TGeometryList: List of arcs generated from given ellipse
+        TGeometryList: List of arcs generated from given ellipse, a GeometryBatch if one was given
     '''
 
+    # Accept columnar batches and return the same format
+    if isinstance(given_ellipsis, GeometryBatch):
+        return GeometryBatch.from_list(ellipse_to_arcs(given_ellipsis.to_list(), num_segments, max_deviation, sources))
+
     # List of arcs that will be generated
     arcs: TGeometryList = []
 
@@ -435,41 +1072,56 @@ def ellipse_to_arcs(
     arc_index: int = 0
 
     # Run through all given ellipses
-    for ellipse in given_ellipsis:
+    for ellipse_number, ellipse in enumerate(given_ellipsis):
 
         # Define ellipse values
         values = ellipse[1]
         center = values[0]
-        major_radius = values[1][0] # a
+        center_z: float = center[2] if len(center) > 2 else 0
+        major_radius = math.hypot(values[1][0], values[1][1]) # a
         minor_radius = values[2][0] * major_radius # b
 
+        # Direction of the major axis, the arcs are fitted along the axes and rotated after
+        rotation: float = math.atan2(values[1][1], values[1][0])
+        cos_rotation: float = math.cos(rotation)
+        sin_rotation: float = math.sin(rotation)
+
+        # Skip ellipses without an area
+        if not minor_radius:
+            warning('Divide by zero error')
+            continue
+        #end if
+
         # Define points list for arc mid and end points
         points: List[Tuple[float, ...]] = []
 
         # Define angle to create points list from
         angle: float = []
 
-        if num_segments:
+        # Number of arcs for this ellipse
+        ellipse_segments: float = num_segments
 
-            # Calculate angle length from num_segments
-            angle = (360/num_segments)/2 
+        if max_deviation > 0:
 
-        else:
+            # Fewest arcs within max_deviation
+            ellipse_segments = _ellipse_segments(major_radius, minor_radius, max_deviation)
+
+        elif not ellipse_segments:
 
             # Default param
-            num_segments = NUM_SEGMENTS
-            
-            # Calculate angle length from num_segments
-            angle = (360/num_segments)/2 
+            ellipse_segments = NUM_SEGMENTS
         
         #end if
 
+        # Calculate angle length from num_segments
+        angle = (360/ellipse_segments)/2 
+
         # Define as start angle
         theta = 0
 
         # Generate key points to define arcs by
         # Need to generate 2x number of points to account for midpoints
-        for index in range(0,2*int(num_segments)):  
+        for index in range(0,2*int(ellipse_segments)):  
 
             # Calculate current angle and radius
             theta = index*angle
@@ -482,13 +1134,13 @@ def ellipse_to_arcs(
             x:float = radius*math.cos(math.radians(theta))
             y:float = radius*math.sin(math.radians(theta))
 
-            # Add point with center offset
-            points.append([x+center[0], y+center[1], center[2]])  
+            # Add point relative to the center
+            points.append([x, y])
         
         #end for
 
         # Find arc that encompasses 3 points
-        for index in range(0,int(num_segments)):
+        for index in range(0,int(ellipse_segments)):
 
             # Define 3 points to create arc from
             p1x: float = points[2*index][0]
@@ -498,25 +1150,34 @@ def ellipse_to_arcs(
             p3x: float = points[((2*index+2)%(len(points)))][0]
             p3y: float = points[((2*index+2)%(len(points)))][1]
 
-            try:
-                # Derived formula for calculating the arc's center
-                cx: float = ((p1x*p1x + p1y*p1y - p2x*p2x - p2y*p2y) - (((2*p1y - 2*p2y)*(p1x*p1x + p1y*p1y -p3x*p3x - p3y*p3y))/(2*p1y -2*p3y)))/((2*p1x - 2*p2x) - ((2*p1y-2*p2y)*(2*p1x-2*p3x))/(2*p1y-2*p3y))
-                cy: float = ((p1x*p1x + p1y*p1y - p3x*p3x - p3y*p3y)/(2*p1y - 2*p3y))-(cx*((2*p1x-2*p3x)/(2*p1y - 2*p3y)))
-            except ZeroDivisionError:
-                warning ('Divide by zero error')
+            # Center of the circle through the 3 points, only zero for a degenerate ellipse
+            determinant: float = 2*(p1x*(p2y - p3y) + p2x*(p3y - p1y) + p3x*(p1y - p2y))
+            if not determinant:
+                warning('Divide by zero error')
+                continue
+            #end if
+            p1_squared: float = p1x*p1x + p1y*p1y
+            p2_squared: float = p2x*p2x + p2y*p2y
+            p3_squared: float = p3x*p3x + p3y*p3y
+            cx: float = (p1_squared*(p2y - p3y) + p2_squared*(p3y - p1y) + p3_squared*(p1y - p2y))/determinant
+            cy: float = (p1_squared*(p3x - p2x) + p2_squared*(p1x - p3x) + p3_squared*(p2x - p1x))/determinant
             
             # Calculate the radius of arc given the arc's center-point
             radius: float = math.sqrt(math.pow(p1x-cx,2) + math.pow(p1y-cy,2))
 
-            # Calculate angle range for arc
-            start_angle = (math.degrees(math.atan2((p1y-cy),(p1x-cx))))
-            end_angle = math.degrees(math.atan2((p3y-cy),(p3x-cx)))
+            # Calculate angle range for arc, rotated with the major axis
+            start_angle = math.degrees(math.atan2((p1y-cy),(p1x-cx)) + rotation)
+            end_angle = math.degrees(math.atan2((p3y-cy),(p3x-cx)) + rotation)
             
             # Create arc entry: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
             arc = (
                     f'ARC:{arc_index}',
                         [
-                            tuple([cx,cy,0]),
+                            tuple([
+                                center[0] + cx*cos_rotation - cy*sin_rotation,
+                                center[1] + cx*sin_rotation + cy*cos_rotation,
+                                center_z
+                            ]),
                             tuple([radius,start_angle,end_angle])
                         ]
             )
@@ -527,6 +1188,9 @@ def ellipse_to_arcs(
             # Add arc to list of arcs
             arcs.append(arc)
 
+            # Record which ellipse the arc came from
+            if sources is not None:
+                sources.append(ellipse_number)
         #end for
     #end for
 
@@ -534,211 +1198,639 @@ def ellipse_to_arcs(
     return arcs
 #end def
     
-def lwpolyline_to_arcs_lines(
-    given_lwpolylines: TGeometryList)-> TGeometryList:
+def _ellipse_vertex_array(
+    ellipses: np.ndarray,
+    num_segments: float = 0,
+    segment_length: float = 0,
+    conversion_factor: float = 1,
+    max_deviation: float = 0) -> Tuple[np.ndarray, np.ndarray]:
     '''
     Summary:
-        Convert lwpolyline into a list of arcs and lines
+        Sample all ellipses at evenly spaced parameters, the major axis may point in any direction in the XY plane
     Args:
-        given_lwpolylines (TGeometryList): Given polyline
+        ellipses (np.ndarray): (N,7) ellipses [CENTER X,Y,Z, MAJOR AXIS ENDPOINT X,Y,Z, RATIO]
+        num_segments (float, optional): Number of lines per ellipse. Defaults to 0.
+        segment_length (float, optional): Length of the lines. Defaults to 0.
+        conversion_factor (float, optional): Factor to convert segment_length to microns. Defaults to 1.
+        max_deviation (float, optional): Largest distance in microns between a line and its ellipse. Defaults to 0.
     Returns:
-        TGeometryList: List of arcs and lines that represent the given geometry
+        Tuple[np.ndarray, np.ndarray]: (M,3) vertices of every closed ellipse, without repeating the first, and the index of the ellipse of every vertex
     '''
 
-    # List of arcs and lines that will be generated
-    arcs_lines: TGeometryList = []
+    centers = ellipses[:, 0:3]
+    major_axes = ellipses[:, 3:6]
+    minor_axes = np.stack([-major_axes[:, 1], major_axes[:, 0], np.zeros(len(ellipses))], axis=1)*ellipses[:, 6:7]
+    major_radius = np.linalg.norm(major_axes, axis=1)
+
+    # Number of lines per ellipse
+    if max_deviation > 0:
+        # A chord over a parameter step h is within |curve''|*h^2/8 <= major_radius*h^2/8 of the ellipse
+        counts = np.ceil(2*math.pi/np.sqrt(8*max_deviation/np.maximum(major_radius, max_deviation)))
+    elif num_segments:
+        counts = np.full(len(ellipses), float(num_segments))
+    elif segment_length > 0:
+        # Ramanujan's approximation of the perimeter
+        a = major_radius
+        b = major_radius*ellipses[:, 6]
+        perimeter = math.pi*(3*(a + b) - np.sqrt((3*a + b)*(a + 3*b)))
+        counts = np.ceil(perimeter/(segment_length*conversion_factor))
+    else:
+        # Default param, as many lines as NUM_SEGMENTS arcs of NUM_SEGMENTS lines
+        counts = np.full(len(ellipses), float(NUM_SEGMENTS*NUM_SEGMENTS))
+    #end if
+    counts = np.maximum(counts, 3).astype(np.int64)
 
-    # Arc index
-    arcs_lines_index: int = 0
+    # Parameter of every vertex
+    ellipse_index = np.repeat(np.arange(len(ellipses)), counts)
+    offsets = np.cumsum(counts) - counts
+    parameters = 2*math.pi*(np.arange(len(ellipse_index)) - offsets[ellipse_index])/counts[ellipse_index]
 
-    # Run through all given lwpolylines 
-    for lwpolyline in given_lwpolylines:
+    vertices = (centers[ellipse_index]
+        + np.cos(parameters)[:, None]*major_axes[ellipse_index]
+        + np.sin(parameters)[:, None]*minor_axes[ellipse_index])
+    return vertices, ellipse_index
+#end def
 
-        # Create DXF file with given filename
-        dxf_drawing: Drawing = ezdxf.new('R2010')
+def _ellipse_arrays(given_ellipsis: TGeometryList) -> np.ndarray:
+    '''
+    Summary:
+        Stack ellipses into an array
+    Args:
+        given_ellipsis (TGeometryList or GeometryBatch): Given ellipses
+    Returns:
+        np.ndarray: (N,7) ellipses [CENTER X,Y,Z, MAJOR AXIS ENDPOINT X,Y,Z, RATIO]
+    '''
 
-        # Create modelspace
-        model_space: Modelspace = dxf_drawing.modelspace()
+    if isinstance(given_ellipsis, GeometryBatch):
+        return given_ellipsis.ellipses
 
-        # Polyline values
-        points = lwpolyline[1]
+    # ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+    centers = _xyz_array(ellipse[1][0] for ellipse in given_ellipsis)
+    major_axes = _xyz_array(ellipse[1][1] for ellipse in given_ellipsis)
+    ratios = np.array([ellipse[1][2][0] for ellipse in given_ellipsis], dtype=np.float64).reshape(-1, 1)
+    return np.concatenate([centers, major_axes, ratios], axis=1)
+#end def
 
-        # Create lwpolyline entity
-        # Get and remove closed boolean
-        closed: bool = points[-1]
-        del points[-1]
+def ellipse_to_lines(
+    given_ellipsis: TGeometryList, 
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    units: str = 'um',
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Converts ellipses straight to closed series of lines, sampling the ellipse without fitting arcs first
+    Args:
+        given_ellipsis (TGeometryList or GeometryBatch): Given ellipses to convert
+        num_segments (float, optional): Number of lines per ellipse, defaults to NUM_SEGMENTS*NUM_SEGMENTS. Defaults to 0.
+        segment_length (float, optional): Approximate length of the lines. Defaults to 0.
+        units (str, optional): Units of segment_length. Defaults to 'um'.
+        max_deviation (float, optional): Largest distance in microns between a line and its ellipse, overrides num_segments and segment_length. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given ellipse each line was generated from is appended to it.
+    Raises:
+        Exception: Invalid units
+    Returns:
+        TGeometryList: List of lines generated from given ellipses, a GeometryBatch if one was given
+    '''
 
-        # Convert points to proper units
-        values: List[Tuple[float, ...]] = []
-        for i in range(len(points)): values.append(tuple(points[i]))
+    # Set conversion factor
+    if units in UNIT_TABLE:
+        # Set units to passed units
+        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
+    else:
+        raise Exception('Invalid Units {}', units) from None
+
+    # Connect every vertex to the next vertex of its ellipse, the last one back to the first
+    vertices, ellipse_index = _ellipse_vertex_array(_ellipse_arrays(given_ellipsis), num_segments, segment_length, conversion_factor, max_deviation)
+    first_vertices = np.flatnonzero(np.insert(ellipse_index[1:] != ellipse_index[:-1], 0, True)) if len(vertices) else np.zeros(0, dtype=np.int64)
+    next_vertices = np.arange(1, len(vertices) + 1)
+    next_vertices[np.append(first_vertices[1:], len(vertices)) - 1] = first_vertices
+    line_array = np.stack([vertices, vertices[next_vertices]], axis=1)
+
+    # Record which ellipse each line came from
+    if sources is not None:
+        sources.extend(ellipse_index.tolist())
+
+    # Return columnar batches for batches
+    if isinstance(given_ellipsis, GeometryBatch):
+        return GeometryBatch.from_lines(line_array)
+    #end if
 
-        # Create lwpolyline from LWPOLYLINE: ('LWPOLYLINE:#:' POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
-        model_space.add_lwpolyline(
-            values, 
-            dxfattribs={
-                'closed': closed
-                }
-            )
+    return _line_items(line_array)
+#end def
 
-        # Use dxf explode method to create arc and lines from lwpolyline
-        dxf_lwpolyline = model_space.entity_space.entities[0]
-        converted_lwpolyline =  dxf_lwpolyline.explode()
+def ellipse_to_points(
+    given_ellipsis: TGeometryList, 
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    units: str = 'um',
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Converts ellipses straight to the points ellipse_to_lines would connect
+    Args:
+        given_ellipsis (TGeometryList or GeometryBatch): Given ellipses to convert
+        num_segments ... max_deviation: Same as ellipse_to_lines
+        sources (List[int], optional): If passed, the index of the given ellipse each point was generated from is appended to it.
+    Raises:
+        Exception: Invalid units
+    Returns:
+        TGeometryList: List of points generated from given ellipses, a GeometryBatch if one was given
+    '''
 
-        # Convert from ezdxf format to TGeometryList format
-        for entity in converted_lwpolyline.entities:
+    # Set conversion factor
+    if units in UNIT_TABLE:
+        # Set units to passed units
+        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(units)+1]
+    else:
+        raise Exception('Invalid Units {}', units) from None
 
-            # Get entity name
-            name: str = entity.DXFTYPE
+    point_array, ellipse_index = _ellipse_vertex_array(_ellipse_arrays(given_ellipsis), num_segments, segment_length, conversion_factor, max_deviation)
 
-            if name == 'LINE':
+    # Record which ellipse each point came from
+    if sources is not None:
+        sources.extend(ellipse_index.tolist())
 
-                # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-                line = (
-                        f'LINE:{arcs_lines_index}',
-                        [
-                            tuple([1 * x for x in entity.dxf.start.xyz]),
-                            tuple([1 * x for x in entity.dxf.end.xyz])
-                        ]
-                )
+    # Return columnar batches for batches
+    if isinstance(given_ellipsis, GeometryBatch):
+        return GeometryBatch.from_points(point_array)
+    #end if
 
-                # Add line to list of arcs and lines
-                arcs_lines.append(line)
-
-            elif name == 'ARC':
-                 
-                # Create arc entry: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
-                arc = (
-                        f'ARC:{arcs_lines_index}',
-                            [
-                                tuple([1 * x for x in entity.dxf.center.xyz]),
-                                tuple([entity.dxf.radius * 1, 
-                                    entity.dxf.start_angle, 
-                                    entity.dxf.end_angle
-                                ])
-                            ]
-                )
-                
-                # Add arc to list of arcs and lines
-                arcs_lines.append(arc)
-            #end if
-            
-            # Update index
-            arcs_lines_index += 1
+    return _point_items(point_array)
+#end def
 
-        #end for
+def _lwpolyline_segments(
+    vertices: np.ndarray,
+    offsets: np.ndarray,
+    closed: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Turn the vertex pairs of all polylines into lines and arcs at once, the same way ezdxf explodes polylines
+    Args:
+        vertices (np.ndarray): (M,5) vertices [X,Y,START WIDTH,END WIDTH,BULGE] of all polylines
+        offsets (np.ndarray): (N+1,) first vertex of every polyline
+        closed (np.ndarray): (N,) non-zero for closed polylines
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Whether every segment is an arc, (L,2,3) lines [START, END],
+        (A,6) arcs [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE] and the index of the polyline of every segment, all in polyline order
+    '''
 
+    counts = np.diff(offsets)
+    polyline_index = np.repeat(np.arange(len(counts)), counts)
+
+    # Segments to the next vertex of the same polyline
+    starts = np.flatnonzero(polyline_index[1:] == polyline_index[:-1]) if len(vertices) else np.zeros(0, dtype=np.int64)
+    ends = starts + 1
+
+    # Closing segments from the last to the first vertex
+    closing = np.flatnonzero((np.asarray(closed) != 0) & (counts > 1))
+    order = np.argsort(np.concatenate([polyline_index[starts], closing]), kind='stable')
+    starts = np.concatenate([starts, offsets[closing + 1] - 1])[order]
+    ends = np.concatenate([ends, offsets[closing]])[order]
+    segment_polylines = polyline_index[starts]
+
+    start_points = vertices[starts, 0:2]
+    end_points = vertices[ends, 0:2]
+    bulges = vertices[starts, 4]
+    chords = end_points - start_points
+    chord_lengths = np.hypot(chords[:, 0], chords[:, 1])
+
+    # Bulged segments of zero length have no arc
+    is_arc = bulges != 0
+    keep = ~is_arc | (chord_lengths > 0)
+    is_arc, start_points, end_points, bulges, chords, chord_lengths, segment_polylines = (
+        values[keep] for values in (is_arc, start_points, end_points, bulges, chords, chord_lengths, segment_polylines))
+
+    # Lines at zero elevation
+    lines = np.zeros((int(np.count_nonzero(~is_arc)), 2, 3))
+    lines[:, 0, 0:2] = start_points[~is_arc]
+    lines[:, 1, 0:2] = end_points[~is_arc]
+
+    # Arc center at the signed bulge radius from the start point, turned by the included angle
+    arc_bulges = bulges[is_arc]
+    arc_starts = start_points[is_arc]
+    arc_ends = end_points[is_arc]
+    signed_radius = chord_lengths[is_arc]*(1 + arc_bulges*arc_bulges)/4/arc_bulges
+    direction = np.arctan2(chords[is_arc, 1], chords[is_arc, 0]) + (math.pi/2 - np.arctan(arc_bulges)*2)
+    centers = arc_starts + signed_radius[:, None]*np.stack([np.cos(direction), np.sin(direction)], axis=1)
+    start_angles = np.degrees(np.arctan2(arc_starts[:, 1] - centers[:, 1], arc_starts[:, 0] - centers[:, 0]))
+    end_angles = np.degrees(np.arctan2(arc_ends[:, 1] - centers[:, 1], arc_ends[:, 0] - centers[:, 0]))
+
+    # Arcs run counterclockwise, clockwise bulges swap start and end
+    clockwise = arc_bulges < 0
+    arcs = np.zeros((len(arc_bulges), 6))
+    arcs[:, 0:2] = centers
+    arcs[:, 3] = np.abs(signed_radius)
+    arcs[:, 4] = np.where(clockwise, end_angles, start_angles)
+    arcs[:, 5] = np.where(clockwise, start_angles, end_angles)
+
+    return is_arc, lines, arcs, segment_polylines
+#end def
+
+def lwpolyline_to_arcs_lines(
+    given_lwpolylines: TGeometryList,
+    sources: Optional[List[int]] = None)-> TGeometryList:
+    '''
+    Summary:
+        Convert lwpolyline into a list of arcs and lines, every vertex pair becomes a line or, if it has a bulge, an arc
+        NOTE The given polylines are not changed
+    Args:
+        given_lwpolylines (TGeometryList or GeometryBatch): Given polyline
+        sources (List[int], optional): If passed, the index of the given polyline each arc/line was generated from is appended to it.
+    Returns:
+        TGeometryList: List of arcs and lines that represent the given geometry, a GeometryBatch if one was given
+    '''
+
+    # Vertices of all polylines
+    if isinstance(given_lwpolylines, GeometryBatch):
+        if len(given_lwpolylines.lwpolyline_closed) != len(given_lwpolylines):
+            # Only polylines can be converted
+            return GeometryBatch.from_list(lwpolyline_to_arcs_lines(given_lwpolylines.to_list(), sources))
+        vertices = given_lwpolylines.lwpolyline_vertices
+        offsets = given_lwpolylines.lwpolyline_offsets
+        closed = given_lwpolylines.lwpolyline_closed
+    else:
+        # LWPOLYLINE: ('LWPOLYLINE:#:' POINT VALUES [X,Y,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+        vertices = np.array([vertex for lwpolyline in given_lwpolylines for vertex in lwpolyline[1][:-1]], dtype=np.float64).reshape(-1, 5)
+        offsets = np.cumsum([0] + [len(lwpolyline[1]) - 1 for lwpolyline in given_lwpolylines])
+        closed = np.array([lwpolyline[1][-1] for lwpolyline in given_lwpolylines], dtype=np.float64)
+    #end if
+
+    # Lines and arcs of all polylines
+    is_arc, lines, arcs, segment_polylines = _lwpolyline_segments(vertices, offsets, closed)
+
+    # Record which polyline the arcs and lines came from
+    if sources is not None:
+        sources.extend(segment_polylines.tolist())
+
+    # Return columnar batches for batches
+    if isinstance(given_lwpolylines, GeometryBatch):
+        batch = GeometryBatch()
+        batch.types = np.where(is_arc, 2, 1).astype(np.uint8)
+        batch.lines = lines
+        batch.line_ids = np.flatnonzero(~is_arc)
+        batch.arcs = arcs
+        batch.arc_ids = np.flatnonzero(is_arc)
+        return batch
+    #end if
+
+    # Create line and arc entries in order, sharing one index
+    line_items = iter(_line_items(lines))
+    arc_items = iter(_arc_items(arcs))
+    return [
+        (f'ARC:{index}', next(arc_items)[1]) if arc else (f'LINE:{index}', next(line_items)[1])
+        for index, arc in enumerate(is_arc.tolist())
+    ]
+#end def
+
+def _nurbs_points(
+    homogeneous: np.ndarray,
+    knots: np.ndarray,
+    degree: int,
+    parameters: np.ndarray,
+    control_spans: np.ndarray,
+    knot_spans: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Evaluate rational B-splines at many parameters at once with de Boor's algorithm in homogeneous coordinates
+    Args:
+        homogeneous (np.ndarray): (N,4) weighted control points (X*W,Y*W,Z*W,W) of all splines
+        knots (np.ndarray): Knots of all splines
+        degree (int): Degree of all splines
+        parameters (np.ndarray): (T,) parameters
+        control_spans (np.ndarray): (T,) index into homogeneous of the last control point affecting each parameter
+        knot_spans (np.ndarray): (T,) index into knots of the knot span of each parameter
+    Returns:
+        np.ndarray: (T,3) points on the splines
+    '''
+
+    # Control points affecting every parameter
+    points = homogeneous[control_spans[:, None] - degree + np.arange(degree + 1)]
+
+    # Repeated linear interpolation
+    for level in range(1, degree + 1):
+        for index in range(degree, level - 1, -1):
+            knot_index = knot_spans - degree + index
+            left = knots[knot_index]
+            denominator = knots[knot_index + degree + 1 - level] - left
+            alpha = np.divide(parameters - left, denominator, out=np.zeros_like(parameters), where=denominator != 0)[:, None]
+            points[:, index] = (1 - alpha)*points[:, index - 1] + alpha*points[:, index]
+        #end for
     #end for
 
-    # Return list of arcs and lines
-    return arcs_lines
+    return points[:, degree, :3]/points[:, degree, 3:]
 #end def
 
-def spline_to_lines(
-    given_spline: TGeometryList)-> TGeometryList:
+def _flatten_splines(
+    splines: List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]],
+    distance: float) -> Tuple[np.ndarray, np.ndarray]:
     '''
     Summary:
-        Convert spline into a list of lines
+        Adaptive flattening of rational B-splines like ezdxf's flattening, evaluating all splines of a degree together.
+        Every knot span is split into SPLINE_MIN_SEGMENTS parts and parts are halved while a curve point at a quarter,
+        half or three quarters of the part is distance or further from its chord
     Args:
-        given_spline (TGeometryList): Given spline
+        splines (List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]): Degree, (N,3) control points,
+        weights (NaN or empty for a non-rational spline) and knots (empty for a clamped uniform spline) of every spline
+        distance (float): Largest distance between the lines and the splines
     Returns:
-        TGeometryList: List of lines that represent the given geometry
+        Tuple[np.ndarray, np.ndarray]: (P,3) points along all splines in order and the index of the spline of every point
     '''
 
-    # List of lines that will be generated
-    lines: TGeometryList = []
+    # Points and parameters of all splines
+    all_points: List[np.ndarray] = []
+    all_splines: List[np.ndarray] = []
+    all_parameters: List[np.ndarray] = []
 
-    # Arc index
-    lines_index: int = 0
+    # Group splines by degree
+    degrees: Dict[int, List[int]] = {}
+    for spline_index, spline in enumerate(splines):
+        if len(spline[1]):
+            degrees.setdefault(int(spline[0]), []).append(spline_index)
+    #end for
 
-    # Run through all given spline
-    for spline in given_spline:
+    for degree, spline_indices in degrees.items():
+
+        # Concatenated control points and knots with the first parts of every knot span
+        homogeneous: List[np.ndarray] = []
+        knots: List[np.ndarray] = []
+        parameters: List[np.ndarray] = []
+        ends: List[np.ndarray] = []
+        control_spans: List[np.ndarray] = []
+        knot_spans: List[np.ndarray] = []
+        part_splines: List[np.ndarray] = []
+        control_offset = 0
+        knot_offset = 0
+        for spline_index in spline_indices:
+            _, control_points, weights, spline_knots = splines[spline_index]
+            count = len(control_points)
+
+            # Defaults for non-rational splines and missing knots
+            if len(weights) != count or np.isnan(weights).any():
+                weights = np.ones(count)
+            if len(spline_knots) != count + degree + 1:
+                spline_knots = np.concatenate([np.zeros(degree), np.linspace(0, 1, count - degree + 1), np.ones(degree)])
+            homogeneous.append(np.concatenate([control_points*weights[:, None], weights[:, None]], axis=1))
+            knots.append(spline_knots)
+
+            # Non-empty knot spans of the domain
+            spans = np.arange(degree, count)
+            spans = spans[spline_knots[spans + 1] > spline_knots[spans]]
+            if len(spans) == 0:
+                # Single point
+                spans = np.array([degree])
+                starts = spline_knots[spans]
+                stops = starts
+            else:
+                starts = spline_knots[spans]
+                stops = spline_knots[spans + 1]
+            #end if
 
-        # Create DXF file with given filename
-        dxf_drawing: Drawing = ezdxf.new('R2010')
+            # Split every knot span into SPLINE_MIN_SEGMENTS parts
+            fractions = np.arange(SPLINE_MIN_SEGMENTS + 1)/SPLINE_MIN_SEGMENTS
+            breaks = starts[:, None] + (stops - starts)[:, None]*fractions
+            parameters.append(breaks[:, :-1].reshape(-1))
+            ends.append(breaks[:, 1:].reshape(-1))
+            control_spans.append(np.repeat(spans + control_offset, SPLINE_MIN_SEGMENTS))
+            knot_spans.append(np.repeat(spans + knot_offset, SPLINE_MIN_SEGMENTS))
+            part_splines.append(np.full(len(spans)*SPLINE_MIN_SEGMENTS, spline_index))
+            control_offset += count
+            knot_offset += len(spline_knots)
+        #end for
 
-        # Create modelspace
-        model_space: Modelspace = dxf_drawing.modelspace()
+        homogeneous_array = np.concatenate(homogeneous)
+        knot_array = np.concatenate(knots)
+        part_starts = np.concatenate(parameters)
+        part_ends = np.concatenate(ends)
+        part_control_spans = np.concatenate(control_spans)
+        part_knot_spans = np.concatenate(knot_spans)
+        part_spline = np.concatenate(part_splines)
+
+        # Every part start is a point, the last part end of each spline too
+        last_parts = np.flatnonzero(np.append(part_spline[1:] != part_spline[:-1], True))
+        accepted = [
+            (part_starts, part_control_spans, part_knot_spans, part_spline),
+            (part_ends[last_parts], part_control_spans[last_parts], part_knot_spans[last_parts], part_spline[last_parts])
+        ]
+
+        # Halve parts whose curve is too far from their chord
+        def evaluate(values):
+            return _nurbs_points(homogeneous_array, knot_array, degree, values, part_control_spans, part_knot_spans)
+        start_points = evaluate(part_starts)
+        end_points = evaluate(part_ends)
+        for depth in range(SPLINE_MAX_DEPTH):
+            if len(part_starts) == 0:
+                break
+
+            # Distance of quarter points to the chord line
+            chords = end_points - start_points
+            chord_lengths = np.linalg.norm(chords, axis=1)
+            deviation = np.zeros(len(part_starts))
+            middle_points = None
+            for fraction in (0.5, 0.25, 0.75):
+                curve_points = evaluate(part_starts + (part_ends - part_starts)*fraction)
+                if middle_points is None:
+                    middle_points = curve_points
+                offsets = np.linalg.norm(np.cross(curve_points - start_points, chords), axis=1)
+                deviation = np.maximum(deviation, np.divide(offsets, chord_lengths, out=np.zeros_like(offsets), where=chord_lengths != 0))
+            #end for
+            split = deviation >= distance
+
+            # Keep middles of split parts and check both halves
+            middles = (part_starts + part_ends)/2
+            accepted.append((middles[split], part_control_spans[split], part_knot_spans[split], part_spline[split]))
+            part_starts, part_ends = np.concatenate([part_starts[split], middles[split]]), np.concatenate([middles[split], part_ends[split]])
+            start_points = np.concatenate([start_points[split], middle_points[split]])
+            end_points = np.concatenate([middle_points[split], end_points[split]])
+            part_control_spans = np.tile(part_control_spans[split], 2)
+            part_knot_spans = np.tile(part_knot_spans[split], 2)
+            part_spline = np.tile(part_spline[split], 2)
+        #end for
 
-        # Spline values
-        points = spline[1]
+        # Evaluate all accepted parameters in order
+        point_parameters, point_control_spans, point_knot_spans, point_splines = (np.concatenate(values) for values in zip(*accepted))
+        order = np.lexsort((point_parameters, point_splines))
+        all_points.append(_nurbs_points(homogeneous_array, knot_array, degree, point_parameters[order], point_control_spans[order], point_knot_spans[order]))
+        all_splines.append(point_splines[order])
+        all_parameters.append(point_parameters[order])
+    #end for
 
-        # Create spline entity
-        control_points: Iterable[Vertex] = []
+    if not all_points:
+        return np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
 
-        # Convert tuple to iterable of vertices
-        for i in range(points[0][2]): control_points.append(tuple(points[i+1]))
+    # Put splines of all degrees back in order
+    point_splines = np.concatenate(all_splines)
+    order = np.lexsort((np.concatenate(all_parameters), point_splines))
+    return np.concatenate(all_points)[order], point_splines[order]
+#end def
 
-        # Determine if the spline is open or closed
-        if points[0][1] == 1:  
+def _spline_arrays(given_spline: TGeometryList) -> Tuple[List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]], np.ndarray]:
+    '''
+    Summary:
+        Split splines into the arrays _flatten_splines takes
+    Args:
+        given_spline (TGeometryList or GeometryBatch): Given splines, a GeometryBatch must only hold splines
+    Returns:
+        Tuple[List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]], np.ndarray]: Degree, control points, weights and knots of every spline and whether each spline gets a closing line
+    '''
 
-            # Create spline from ('SPLINE:#': [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
-            model_space.add_rational_spline(
-                control_points, 
-                points[points[0][2]+2], 
-                points[0][0], 
-                points[points[0][2]+1]
-                )
-        else:
+    if isinstance(given_spline, GeometryBatch):
+        batch = given_spline
+        control_offsets = batch.spline_control_offsets
+        knot_offsets = batch.spline_knot_offsets
+        splines = [
+            (
+                batch.spline_headers[index, 0],
+                batch.spline_control_points[control_offsets[index]:control_offsets[index+1]],
+                batch.spline_weights[control_offsets[index]:control_offsets[index+1]],
+                batch.spline_knots[knot_offsets[index]:knot_offsets[index+1]]
+            )
+            for index in range(len(batch.spline_headers))
+        ]
+        closed = batch.spline_headers[:, 1] != 1
+    else:
+        # ('SPLINE:#': [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
+        splines = [
+            (
+                spline[1][0][0],
+                _xyz_array(spline[1][1:spline[1][0][2]+1]),
+                np.array(spline[1][spline[1][0][2]+2], dtype=np.float64),
+                np.array(spline[1][spline[1][0][2]+1], dtype=np.float64)
+            )
+            for spline in given_spline
+        ]
+        closed = np.array([spline[1][0][1] != 1 for spline in given_spline], dtype=bool)
+    #end if
+    return splines, closed
+#end def
 
-            # Create spline from ('SPLINE:#': [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
-            model_space.add_closed_rational_spline(
-                control_points, 
-                points[points[0][2]+2], 
-                points[0][0], 
-                points[points[0][2]+1]
-                )
+def spline_to_lines(
+    given_spline: TGeometryList,
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None)-> TGeometryList:
+    '''
+    Summary:
+        Convert spline into a list of lines, splines are flattened by a built-in vectorized rational B-spline evaluator
+        NOTE Splines whose CLOSED value is not 1 get a line from their last point back to their first
+    Args:
+        given_spline (TGeometryList or GeometryBatch): Given spline
+        max_deviation (float, optional): Largest distance in microns between the lines and their spline, 0 uses SPLINE_PRECISION. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given spline each line was generated from is appended to it.
+    Returns:
+        TGeometryList: List of lines that represent the given geometry, a GeometryBatch if one was given
+    '''
 
+    # Largest distance between the lines and their spline
+    distance: float = max_deviation if max_deviation > 0 else SPLINE_PRECISION
 
-        # Use dxf explode method to create arc and lines from lwpolyline
-        dxf_spline = model_space.entity_space.entities[0]
-        spline_iter =  dxf_spline.flattening(SPLINE_PRECISION)
-        spline_points: TGeometryList = []
+    # Only splines can be flattened
+    if isinstance(given_spline, GeometryBatch) and len(given_spline.spline_headers) != len(given_spline):
+        return GeometryBatch.from_list(spline_to_lines(given_spline.to_list(), max_deviation, sources))
+    #end if
 
-        # Convert from iter[Vec] to tuple[float,...]
-        for entity in spline_iter: spline_points.append(tuple(entity.xyz))
+    # Degree, control points, weights and knots of every spline
+    splines, closed = _spline_arrays(given_spline)
+
+    # Points of all splines
+    points, point_splines = _flatten_splines(splines, distance)
+
+    # Lines between consecutive points of the same spline
+    line_starts = np.flatnonzero(point_splines[1:] == point_splines[:-1])
+    line_ends = line_starts + 1
+    line_splines = point_splines[line_starts]
+
+    # Connect last point to first point
+    first_points = np.flatnonzero(np.insert(point_splines[1:] != point_splines[:-1], 0, True)) if len(points) else np.zeros(0, dtype=np.int64)
+    last_points = np.append(first_points[1:] - 1, len(points) - 1) if len(points) else np.zeros(0, dtype=np.int64)
+    closing = closed[point_splines[first_points]] & (last_points > first_points)
+    order = np.argsort(np.concatenate([line_splines, point_splines[first_points][closing]]), kind='stable')
+    line_starts = np.concatenate([line_starts, last_points[closing]])[order]
+    line_ends = np.concatenate([line_ends, first_points[closing]])[order]
+    line_array = np.stack([points[line_starts], points[line_ends]], axis=1)
+
+    # Record which spline the lines came from
+    if sources is not None:
+        sources.extend(point_splines[line_starts].tolist())
+
+    # Return columnar batches for batches
+    if isinstance(given_spline, GeometryBatch):
+        return GeometryBatch.from_lines(line_array)
+    #end if
 
-        # Convert from ezdxf format to TGeometryList format
-        for index in range(len(spline_points)-1):
+    return _line_items(line_array)
+#end def
 
-            # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-            line = (
-                    f'LINE:{lines_index}',
-                    [
-                        tuple(spline_points[index]),
-                        tuple(spline_points[index+1])
-                    ]
-            )
+def spline_to_points(
+    given_spline: TGeometryList,
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None)-> TGeometryList:
+    '''
+    Summary:
+        Convert splines straight to the points spline_to_lines would connect, without creating lines
+    Args:
+        given_spline (TGeometryList or GeometryBatch): Given spline
+        max_deviation (float, optional): Largest distance in microns between the lines through the points and their spline, 0 uses SPLINE_PRECISION. Defaults to 0.
+        sources (List[int], optional): If passed, the index of the given spline each point was generated from is appended to it.
+    Returns:
+        TGeometryList: List of points on the given splines, a GeometryBatch if one was given
+    '''
 
-            # Add line to list of lines
-            lines.append(line)
-            
-            # Update index
-            lines_index += 1
+    # Largest distance between the lines and their spline
+    distance: float = max_deviation if max_deviation > 0 else SPLINE_PRECISION
 
-        #end for
+    # Only splines can be flattened
+    if isinstance(given_spline, GeometryBatch) and len(given_spline.spline_headers) != len(given_spline):
+        return GeometryBatch.from_list(spline_to_points(given_spline.to_list(), max_deviation, sources))
+    #end if
 
-        # if spline is closed
-        if dxf_spline.closed:
-            # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-            line = (
-                    f'LINE:{lines_index}',
-                    [
-                        tuple(spline_points[-1]),
-                        tuple(spline_points[0])
-                    ]
-            )
+    # Points of all splines
+    splines, _ = _spline_arrays(given_spline)
+    point_array, point_splines = _flatten_splines(splines, distance)
 
-            # Add line to list of lines
-            lines.append(line)
-            
-            # Update index
-            lines_index += 1
-        #end if
+    # Record which spline the points came from
+    if sources is not None:
+        sources.extend(point_splines.tolist())
 
-    #end for
+    # Return columnar batches for batches
+    if isinstance(given_spline, GeometryBatch):
+        return GeometryBatch.from_points(point_array)
+    #end if
 
-    # Return list of lines
-    return lines
+    return _point_items(point_array)
+#end def
+
+def _convert_next(
+    given_geometry_type: str, 
+    return_geometry_type: str, 
+    given_geometry: TGeometryList, 
+    given_sources: Optional[List[int]],
+    sources: Optional[List[int]],
+    max_deviation: float = 0) -> TGeometryList:
+    '''
+    Summary:
+        Continue converting an intermediate geometry list, composing the source indices of both steps
+    Args:
+        given_geometry_type (str): Geometry type of the intermediate values
+        return_geometry_type (str): Desired geometry type
+        given_geometry (TGeometryList): Intermediate geometry
+        given_sources (List[int], optional): Source index of every intermediate geometry
+        sources (List[int], optional): Source index of every returned geometry is appended to it
+        max_deviation (float, optional): Largest distance in microns left for the remaining conversions. Defaults to 0.
+    Returns:
+        TGeometryList: Desired geometry type return values
+    '''
+
+    # Source indices are not tracked
+    if sources is None:
+        return convert_to(given_geometry_type, return_geometry_type, given_geometry, max_deviation=max_deviation)
+
+    # Map returned geometries to the intermediate geometries and those to the original sources
+    next_sources: List[int] = []
+    converted = convert_to(given_geometry_type, return_geometry_type, given_geometry, max_deviation=max_deviation, sources=next_sources)
+    sources.extend(given_sources[index] for index in next_sources)
+    return converted
 #end def
 
 def convert_to(
@@ -747,51 +1839,571 @@ def convert_to(
     given_geometry: TGeometryList, 
     num_segments: float = 0, 
     segment_length: float = 0, 
-    units: str = 'um') -> TGeometryList:
+    units: str = 'um',
+    max_deviation: float = 0,
+    sources: Optional[List[int]] = None,
+    cache: Optional['ConversionCache'] = None,
+    workers: int = 0,
+    connected: bool = False) -> TGeometryList:
     '''
     Summary:
         Wrapper function to down convert any given geometry to a sub-geometry type
     Args:
         given_geometry_type (str): Geometry type of passed values
         return_geometry_type (str): Desired geometry type
-        given_geometry (TGeometryList): Geometry to be converted values
+        given_geometry (TGeometryList or GeometryBatch): Geometry to be converted values
         num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
         segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
         units (str, optional): Units for segment length. Defaults to 'um'.
+        max_deviation (float, optional): Largest distance in microns between the converted and the given curves (arcs, ellipses, splines),
+        picks the fewest segments per geometry and overrides num_segments and segment_length for curves. Defaults to 0.
+        NOTE Arcs, ellipses and splines converted to points and ellipses converted to lines are sampled directly without
+        intermediate geometries, their points lie on the given curves
+        NOTE Converting curves to points, num_segments and segment_length space the points along the curve itself and the
+        lines between them are not sampled again, eg. a full circle gives NUM_SEGMENTS (10) points by default where it gave
+        110 when it was converted to lines first. Pass a larger num_segments, a shorter segment_length or a max_deviation for
+        denser points
+        sources (List[int], optional): If passed, the index of the given geometry each returned geometry was generated from is appended to it.
+        cache (ConversionCache, optional): Reuse the conversions of shapes that were converted before at another position. Defaults to None.
+        workers (int, optional): Number of worker processes to split the given geometry across, 0 or 1 converts in this process.
+        Each worker gets at least PARALLEL_MIN_GEOMETRIES geometries. Defaults to 0.
+        connected (bool, optional): Converting to points, leave out points equal to the point before them so vertices shared by
+        consecutive lines, arcs and polyline segments are stored once. Defaults to False.
     Returns:
-        TGeometryList: Desired geometry type return values
+        TGeometryList: Desired geometry type return values, a GeometryBatch if one was given
     '''
 
+    # Store every shared vertex once
+    if connected and return_geometry_type == 'POINT' and given_geometry_type != 'POINT':
+        point_sources: List[int] = []
+        converted = convert_to(given_geometry_type, return_geometry_type, given_geometry, num_segments, segment_length, units, max_deviation, point_sources, cache, workers)
+        if converted is None:
+            return None
+        point_array = converted.points if isinstance(converted, GeometryBatch) else _xyz_array(point[1][0] for point in converted)
+        kept = ~_repeated_points(point_array)
+
+        # Record which geometry the remaining points came from
+        if sources is not None:
+            sources.extend(np.array(point_sources, dtype=np.int64)[kept].tolist())
+
+        if isinstance(converted, GeometryBatch):
+            return GeometryBatch.from_points(point_array[kept])
+        return _point_items(point_array[kept])
+    #end if
+
+    # Convert repeated shapes once
+    if cache is not None:
+        return cache.convert_to(given_geometry_type, return_geometry_type, given_geometry, num_segments, segment_length, units, max_deviation, sources, workers)
+
+    # Split large conversions across worker processes
+    if workers > 1 and given_geometry_type != return_geometry_type and len(given_geometry) >= 2*PARALLEL_MIN_GEOMETRIES:
+        return _parallel_convert_to(given_geometry_type, return_geometry_type, given_geometry, num_segments, segment_length, units, max_deviation, sources, workers)
+
+    # Fused kernels sample the given curves straight to the return type, in lists or columnar batches
+    if given_geometry_type == 'ARC' and return_geometry_type == 'POINT':
+        return arc_to_points(given_geometry, num_segments, segment_length, units, max_deviation, sources)
+    elif given_geometry_type == 'ELLIPSE' and return_geometry_type == 'LINE':
+        return ellipse_to_lines(given_geometry, num_segments, segment_length, units, max_deviation, sources)
+    elif given_geometry_type == 'ELLIPSE' and return_geometry_type == 'POINT':
+        return ellipse_to_points(given_geometry, num_segments, segment_length, units, max_deviation, sources)
+    elif given_geometry_type == 'SPLINE' and return_geometry_type == 'POINT':
+        return spline_to_points(given_geometry, max_deviation, sources)
+    #end if
+
+    # Accept columnar batches and return the same format
+    if isinstance(given_geometry, GeometryBatch):
+        return GeometryBatch.from_list(convert_to(given_geometry_type, return_geometry_type, given_geometry.to_list(), num_segments, segment_length, units, max_deviation, sources))
+
+    # Source index of every intermediate geometry
+    given_sources: Optional[List[int]] = None if sources is None else []
+
     if given_geometry_type == return_geometry_type:
 
         # No need to convert
+        if sources is not None:
+            sources.extend(range(len(given_geometry)))
         return given_geometry
 
     elif given_geometry_type == 'LINE': 
         
         # Lines can only be directly converted into points
-        return convert_to('POINT', return_geometry_type, lines_to_points(given_geometry, num_segments, segment_length, units))
+        return _convert_next('POINT', return_geometry_type, lines_to_points(given_geometry, num_segments, segment_length, units, given_sources), given_sources, sources)
 
     elif given_geometry_type == 'ARC':  
         
         # Arcs can only be directly converted into lines
-        return convert_to('LINE', return_geometry_type, arc_to_lines(given_geometry, num_segments, segment_length, units))
+        return _convert_next('LINE', return_geometry_type, arc_to_lines(given_geometry, num_segments, segment_length, units, max_deviation, given_sources), given_sources, sources)
 
     elif given_geometry_type == 'ELLIPSE':  
         
-        # Ellipses can only be directly converted into arcs
-        return convert_to('ARC', return_geometry_type, ellipse_to_arcs(given_geometry, num_segments))
+        # Ellipses are otherwise converted into arcs
+        return _convert_next('ARC', return_geometry_type, ellipse_to_arcs(given_geometry, num_segments, max_deviation, given_sources), given_sources, sources)
 
     elif given_geometry_type == 'LWPOLYLINE':
 
         # LWPolylines are directly converted to arcs and lines
-        return convert_to('ARC', return_geometry_type, lwpolyline_to_arcs_lines(given_geometry))
+        return _convert_next('ARC', return_geometry_type, lwpolyline_to_arcs_lines(given_geometry, given_sources), given_sources, sources, max_deviation)
 
     elif given_geometry_type == 'SPLINE':
 
         # LWPolylines are directly converted to arcs and lines
-        return convert_to('LINE', return_geometry_type, spline_to_lines(given_geometry))
+        return _convert_next('LINE', return_geometry_type, spline_to_lines(given_geometry, max_deviation, given_sources), given_sources, sources)
+
+    #end if
+#end def
+
+def _batch_items(batch: GeometryBatch) -> TGeometryList:
+    '''
+    Summary:
+        Create entries of the points, lines and arcs of a batch, numbered by their position
+    Args:
+        batch (GeometryBatch): Batch of points, lines and arcs
+    Returns:
+        TGeometryList: Geometries in the order of the batch
+    '''
+
+    items = (_point_items(batch.points), _line_items(batch.lines), _arc_items(batch.arcs))
+
+    # A single type is already numbered by position
+    for type_items in items:
+        if len(type_items) == len(batch.types):
+            return type_items
+    #end for
+
+    # Put mixed geometries in place
+    result: TGeometryList = [None]*len(batch.types)
+    for (geometry_type, _, id_name), type_items in zip(CONVERTED_ARRAYS, items):
+        for position, (_, values) in zip(getattr(batch, id_name).tolist(), type_items):
+            result[position] = (f'{geometry_type}:{position}', values)
+    #end for
+    return result
+#end def
+
+def _convert_chunk(
+    given_geometry_type: str, 
+    return_geometry_type: str, 
+    given_geometry: GeometryBatch, 
+    num_segments: float,
+    segment_length: float,
+    units: str,
+    max_deviation: float) -> Tuple[Optional[GeometryBatch], List[int]]:
+    '''
+    Summary:
+        Convert one chunk of geometries inside a worker process
+    Args:
+        given_geometry_type ... max_deviation: Same as convert_to
+    Returns:
+        Tuple[Optional[GeometryBatch], List[int]]: Converted geometries and the index in the chunk each was generated from
+    '''
+
+    sources: List[int] = []
+    return convert_to(given_geometry_type, return_geometry_type, given_geometry, num_segments, segment_length, units, max_deviation, sources), sources
+#end def
+
+def _concatenate_converted(batches: List[GeometryBatch]) -> GeometryBatch:
+    '''
+    Summary:
+        Join batches of converted points, lines and arcs, IDs are renumbered by position
+    Args:
+        batches (List[GeometryBatch]): Batches in order
+    Returns:
+        GeometryBatch: Batch holding all geometries
+    '''
+
+    batch = GeometryBatch()
+    batch.types = np.concatenate([batch.types] + [part.types for part in batches])
+    for geometry_type, array_name, id_name in CONVERTED_ARRAYS:
+        setattr(batch, array_name, np.concatenate([getattr(batch, array_name)] + [getattr(part, array_name) for part in batches]))
+        setattr(batch, id_name, np.flatnonzero(batch.types == GEOMETRY_TYPES.index(geometry_type)))
+    #end for
+    batch.point_formats = np.zeros(len(batch.points), dtype=np.uint8)
+    return batch
+#end def
 
+def _parallel_convert_to(
+    given_geometry_type: str, 
+    return_geometry_type: str, 
+    given_geometry: TGeometryList, 
+    num_segments: float,
+    segment_length: float,
+    units: str,
+    max_deviation: float,
+    sources: Optional[List[int]],
+    workers: int) -> TGeometryList:
+    '''
+    Summary:
+        Convert contiguous chunks of the given geometry in a pool of worker processes and join the results in order
+        NOTE Chunks are sent to and from the workers as GeometryBatch arrays
+    Args:
+        given_geometry_type ... workers: Same as convert_to
+    Returns:
+        TGeometryList: Desired geometry type return values numbered by position, a GeometryBatch if one was given
+    '''
+
+    # Contiguous chunks of at least PARALLEL_MIN_GEOMETRIES geometries
+    geometries: TGeometryList = to_geometry_list(given_geometry)
+    num_chunks: int = max(1, min(workers, len(geometries)//PARALLEL_MIN_GEOMETRIES))
+    bounds: List[int] = [len(geometries)*chunk_index//num_chunks for chunk_index in range(num_chunks + 1)]
+
+    with ProcessPoolExecutor(max_workers=num_chunks) as executor:
+        futures = [
+            executor.submit(_convert_chunk, given_geometry_type, return_geometry_type,
+                GeometryBatch.from_list(geometries[bounds[chunk_index]:bounds[chunk_index+1]]),
+                num_segments, segment_length, units, max_deviation)
+            for chunk_index in range(num_chunks)
+        ]
+        results = [future.result() for future in futures]
+    #end with
+
+    # No conversion between these types
+    if any(converted is None for converted, _ in results):
+        return None
+
+    # Offset the source indices of every chunk by its start
+    if sources is not None:
+        for chunk_start, (_, chunk_sources) in zip(bounds, results):
+            sources.extend(chunk_start + source for source in chunk_sources)
     #end if
+
+    converted = _concatenate_converted([converted for converted, _ in results])
+    if isinstance(given_geometry, GeometryBatch):
+        return converted
+    return _batch_items(converted)
 #end def
 
+def iter_convert_to(
+    given_geometry_type: str, 
+    return_geometry_type: str, 
+    given_geometry: Iterable[TGeometryItem], 
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    units: str = 'um',
+    max_deviation: float = 0,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    cache: Optional['ConversionCache'] = None) -> Iterator[TGeometryItem]:
+    '''
+    Summary:
+        Lazily down convert any iterable of geometries, only chunk_size given geometries and their converted geometries are held at once
+        NOTE Converted geometries are numbered consecutively over the whole stream
+    Args:
+        given_geometry_type (str): Geometry type of passed values
+        return_geometry_type (str): Desired geometry type
+        given_geometry (Iterable[TGeometryItem]): Geometry to be converted values, may be a generator
+        num_segments ... max_deviation: Same as convert_to
+        chunk_size (int, optional): Number of given geometries converted together. Defaults to STREAM_CHUNK_SIZE.
+        cache (ConversionCache, optional): Reuse the conversions of shapes repeated anywhere in the stream. Defaults to None.
+    Returns:
+        Iterator[TGeometryItem]: Desired geometry type return values
+    '''
+
+    given_iterator = iter(given_geometry)
+
+    # Index of the next converted geometry
+    geometry_index: int = 0
+
+    # Convert one chunk at a time
+    while True:
+        chunk: TGeometryList = list(islice(given_iterator, max(chunk_size, 1)))
+        if not chunk:
+            break
+
+        for name, values in convert_to(given_geometry_type, return_geometry_type, chunk, num_segments, segment_length, units, max_deviation, cache=cache):
+            # Renumber so IDs stay unique across chunks
+            yield (f'{name.split(":")[0]}:{geometry_index}', values)
+            geometry_index += 1
+        #end for
+    #end while
+#end def
+
+def _item_anchor(geometry: TGeometryItem) -> Tuple[float, float, float]:
+    '''
+    Summary:
+        First position of a geometry, conversions are cached relative to it
+    Args:
+        geometry (TGeometryItem): Given geometry
+    Returns:
+        Tuple[float, float, float]: Start point, center, first control point or first vertex
+    '''
+
+    name: str = geometry[0].split(':')[0]
+    values = geometry[1]
+    if name == 'SPLINE':
+        anchor = values[1]
+    elif name == 'LWPOLYLINE':
+        anchor = values[0][:2]
+    else:
+        anchor = values[0]
+    #end if
+    return tuple(anchor[:3]) + (0.0,)*(3-len(anchor[:3]))
+#end def
+
+def _translate_point(point: Tuple[float, ...], offset: Tuple[float, ...]) -> Tuple[float, ...]:
+    '''
+    Summary:
+        Move a point, 2D points stay 2D
+    Args:
+        point (Tuple[float, ...]): Point (X,Y) or (X,Y,Z)
+        offset (Tuple[float, ...]): Offset (X,Y,Z)
+    Returns:
+        Tuple[float, ...]: Moved point
+    '''
+
+    return tuple(coordinate + shift for coordinate, shift in zip(point, offset))
+#end def
+
+def _translate_item(name: str, values: list, offset: Tuple[float, ...]) -> list:
+    '''
+    Summary:
+        Move the positions of a geometry, directions, radii, angles and weights are kept
+    Args:
+        name (str): Geometry type
+        values (list): Values of the geometry, or a bare (X,Y,Z) tuple for TXT points
+        offset (Tuple[float, ...]): Offset (X,Y,Z)
+    Returns:
+        list: Moved values, a tuple for a bare TXT point
+    '''
+
+    if name == 'POINT' and values and not isinstance(values[0], (list, tuple)):
+        # TXT points are a bare (X,Y,Z) tuple
+        return _translate_point(values, offset)
+    elif name in ('POINT', 'LINE'):
+        return [_translate_point(point, offset) for point in values]
+    elif name in ('ARC', 'ELLIPSE'):
+        return [_translate_point(values[0], offset)] + list(values[1:])
+    elif name == 'SPLINE':
+        num_control_points = values[0][2]
+        return [values[0]] + [_translate_point(point, offset) for point in values[1:num_control_points+1]] + list(values[num_control_points+1:])
+    elif name == 'LWPOLYLINE':
+        return [_translate_point(vertex[:2], offset) + tuple(vertex[2:]) for vertex in values[:-1]] + [values[-1]]
+    #end if
+    return list(values)
+#end def
+
+def _flatten_values(values, decimals: int) -> Tuple:
+    '''
+    Summary:
+        Round and flatten nested geometry values into a hashable key
+    Args:
+        values: Numbers, tuples and lists of geometry values
+        decimals (int): Decimal places to round to
+    Returns:
+        Tuple: Flat tuple of rounded numbers, nested lists are delimited by their length
+    '''
+
+    if isinstance(values, (list, tuple)):
+        key: list = [len(values)]
+        for value in values:
+            key.extend(_flatten_values(value, decimals))
+        return tuple(key)
+    #end if
+    # Avoid separate keys for 0.0 and -0.0
+    return (round(float(values), decimals) + 0.0,)
+#end def
+
+def _shape_key(name: str, values: list, anchor: Tuple[float, float, float], decimals: int) -> Tuple:
+    '''
+    Summary:
+        Key of the shape of a geometry, the same for every copy of it at another position
+    Args:
+        name (str): Geometry type
+        values (list): Values of the geometry
+        anchor (Tuple[float, float, float]): First position of the geometry, see _item_anchor
+        decimals (int): Decimal places to round to
+    Returns:
+        Tuple: Hashable key
+    '''
+
+    # Only the anchor of arcs and ellipses is a position, their other values are the same for every copy
+    if name in ('ARC', 'ELLIPSE'):
+        return (name,) + tuple(tuple(value) for value in values[1:])
+    return (name,) + _flatten_values(_translate_item(name, values, tuple(-coordinate for coordinate in anchor)), decimals)
+#end def
+
+def _gather_rows(shape_index: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Rows of concatenated per shape arrays for every instance of the shapes
+    Args:
+        shape_index (np.ndarray): (N,) shape of every instance
+        counts (np.ndarray): (U,) number of rows of every shape
+    Returns:
+        np.ndarray: Row indices, all rows of the first instance first
+    '''
+
+    offsets = np.cumsum(counts) - counts
+    instance_counts = counts[shape_index]
+    instance_offsets = np.cumsum(instance_counts) - instance_counts
+    return np.repeat(offsets[shape_index] - instance_offsets, instance_counts) + np.arange(int(instance_counts.sum()))
+#end def
+
+class ConversionCache:
+    '''
+    Summary:
+        Least recently used cache of converted shapes, shared by every convert_to call it is passed to
+        Every given geometry is moved to its first position (see _item_anchor), repeated shapes at other positions
+        are converted once and their cached conversion is moved back to each position
+        NOTE Results match convert_to up to floating point rounding of the moves
+    '''
+
+    def __init__(
+        self,
+        max_entries: int = CONVERSION_CACHE_SIZE,
+        decimals: int = CONVERSION_CACHE_DECIMALS):
+        '''
+        Summary:
+            Create an empty cache
+        Args:
+            max_entries (int, optional): Number of shapes to keep, least recently used shapes are evicted beyond it. Defaults to CONVERSION_CACHE_SIZE.
+            decimals (int, optional): Decimal places of the microns shapes must match to. Defaults to CONVERSION_CACHE_DECIMALS.
+        '''
+
+        self.max_entries: int = max_entries
+        self.decimals: int = decimals
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()
+    #end def
+
+    def __len__(self) -> int:
+        '''
+        Summary:
+            Number of cached shapes
+        Returns:
+            int: Number of cached shapes
+        '''
+
+        return len(self._entries)
+    #end def
+
+    def clear(self):
+        '''
+        Summary:
+            Remove all cached shapes and reset the counters
+        '''
+
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+    #end def
+
+    def convert_to(
+        self,
+        given_geometry_type: str, 
+        return_geometry_type: str, 
+        given_geometry: TGeometryList, 
+        num_segments: float = 0, 
+        segment_length: float = 0, 
+        units: str = 'um',
+        max_deviation: float = 0,
+        sources: Optional[List[int]] = None,
+        workers: int = 0) -> TGeometryList:
+        '''
+        Summary:
+            Same as convert_to, converting every distinct shape once
+        Args:
+            given_geometry_type ... workers: Same as convert_to, workers split the missing shapes
+        Returns:
+            TGeometryList: Desired geometry type return values numbered in order, a GeometryBatch if one was given
+        '''
+
+        # No need to convert
+        if given_geometry_type == return_geometry_type:
+            return convert_to(given_geometry_type, return_geometry_type, given_geometry, sources=sources)
+
+        # Every setting that changes the conversion
+        settings = (given_geometry_type, return_geometry_type, num_segments, segment_length, units, max_deviation)
+
+        # Find the shape of every geometry relative to its anchor
+        geometries: TGeometryList = to_geometry_list(given_geometry)
+        anchors = np.array([_item_anchor(geometry) for geometry in geometries], dtype=np.float64).reshape(-1, 3)
+        shape_numbers: Dict[Tuple, int] = {}
+        shape_index = np.zeros(len(geometries), dtype=np.int64)
+        shapes: TGeometryList = []
+        for geometry_index, (geometry, anchor) in enumerate(zip(geometries, anchors.tolist())):
+            name: str = geometry[0].split(':')[0]
+            key = (settings, _shape_key(name, geometry[1], anchor, self.decimals))
+            shape_number = shape_numbers.get(key)
+            if shape_number is None:
+                shape_number = shape_numbers[key] = len(shapes)
+                shapes.append((geometry[0], _translate_item(name, geometry[1], tuple(-coordinate for coordinate in anchor))))
+            shape_index[geometry_index] = shape_number
+        #end for
+        keys: List[Tuple] = list(shape_numbers)
+
+        # Look up shapes, convert all missing shapes together
+        entries: List = [self._entries.get(key) for key in keys]
+        missing: List[int] = [shape_number for shape_number, entry in enumerate(entries) if entry is None]
+        for shape_number, key in enumerate(keys):
+            if entries[shape_number] is not None:
+                self._entries.move_to_end(key)
+        #end for
+        if missing:
+            missing_sources: List[int] = []
+            converted: GeometryBatch = convert_to(given_geometry_type, return_geometry_type, GeometryBatch.from_list([shapes[shape_number] for shape_number in missing]), num_segments, segment_length, units, max_deviation, missing_sources, workers=workers)
+            if converted is None:
+                # No conversion between these types
+                return None
+
+            # Row of every converted geometry in the array of its type
+            rows = np.zeros(len(converted.types), dtype=np.int64)
+            for geometry_type, _, _ in CONVERTED_ARRAYS:
+                of_type = converted.types == GEOMETRY_TYPES.index(geometry_type)
+                rows[of_type] = np.arange(np.count_nonzero(of_type))
+            #end for
+
+            # Split converted geometries by shape, cache entries are (type codes, points, lines, arcs) in local coordinates
+            missing_sources = np.array(missing_sources, dtype=np.int64)
+            order = np.argsort(missing_sources, kind='stable')
+            bounds = np.searchsorted(missing_sources[order], np.arange(len(missing) + 1))
+            for missing_index, shape_number in enumerate(missing):
+                selected = order[bounds[missing_index]:bounds[missing_index+1]]
+                codes = converted.types[selected]
+                entries[shape_number] = (codes,) + tuple(
+                    getattr(converted, array_name)[rows[selected[codes == GEOMETRY_TYPES.index(geometry_type)]]]
+                    for geometry_type, array_name, _ in CONVERTED_ARRAYS
+                )
+                self._entries[keys[shape_number]] = entries[shape_number]
+            #end for
+
+            # Evict least recently used shapes
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        #end if
+
+        # Count every given geometry whose shape was already cached
+        self.misses += len(missing)
+        self.hits += len(geometries) - len(missing)
+
+        # Type of every returned geometry
+        type_counts = np.array([len(entry[0]) for entry in entries], dtype=np.int64)
+        all_codes = np.concatenate([entry[0] for entry in entries]) if entries else np.zeros(0, dtype=np.uint8)
+        types = all_codes[_gather_rows(shape_index, type_counts)]
+
+        # Move the cached geometries of every type to the anchor of every instance
+        batch = GeometryBatch()
+        batch.types = types
+        for array_index, (geometry_type, array_name, id_name) in enumerate(CONVERTED_ARRAYS, 1):
+            counts = np.array([len(entry[array_index]) for entry in entries], dtype=np.int64)
+            arrays = np.concatenate([entry[array_index] for entry in entries]) if entries else getattr(batch, array_name)
+            instances = np.repeat(np.arange(len(geometries)), counts[shape_index])
+            moved = arrays[_gather_rows(shape_index, counts)]
+            if geometry_type == 'LINE':
+                moved += anchors[instances][:, None, :]
+            else:
+                # Only the center of arcs is a position
+                moved[:, 0:3] += anchors[instances]
+            setattr(batch, array_name, moved)
+            setattr(batch, id_name, np.flatnonzero(types == GEOMETRY_TYPES.index(geometry_type)))
+        #end for
+        batch.point_formats = np.zeros(len(batch.points), dtype=np.uint8)
+
+        # Record which geometry the converted geometries came from
+        if sources is not None:
+            sources.extend(np.repeat(np.arange(len(geometries)), type_counts[shape_index]).tolist())
+
+        # Return the same format as given
+        if isinstance(given_geometry, GeometryBatch):
+            return batch
+        return _batch_items(batch)
+    #end def
+#end class
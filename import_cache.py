@@ -0,0 +1,273 @@
+'''
+Persistent on-disk cache of imported geometries
+
+Every entry is a GeometryBatch saved as an .npz file, named after the source file and a key of the file
+contents and all import options, so a repeated import of an unchanged file only loads a few arrays.
+'''
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional
+from geometry_batch import GeometryBatch
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+# Default maximum size of all cache entries in bytes
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Extension of cache entries
+CACHE_EXTENSION = '.npz'
+
+# Size of the blocks read while hashing a file
+HASH_BLOCK_SIZE = 1 << 20
+
+# Version of the cache entries, part of every key and bumped whenever imported geometries or the stored arrays change
+# 2: 2D coordinates and geometries without an ID are stored as given, CSV polyline widths are not scaled
+CACHE_VERSION = 2
+
+class ImportCache:
+    '''
+    Summary:
+        Size-bounded least recently used cache of imported geometries in a directory
+        NOTE Entries are written to a temporary file and then moved in place, so several processes may share a directory
+    '''
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        hash_contents: bool = False):
+        '''
+        Summary:
+            Create a cache in a directory, creating the directory if needed
+        Args:
+            directory (str): Cache directory
+            max_bytes (int, optional): Maximum size of all entries, least recently used entries are evicted beyond it. Defaults to 1 GiB.
+            hash_contents (bool, optional): Key files by a SHA-256 of their contents instead of their size and modification time. Defaults to False.
+        '''
+
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.hash_contents: bool = hash_contents
+        self.hits: int = 0
+        self.misses: int = 0
+        os.makedirs(directory, exist_ok=True)
+    #end def
+
+    def _file_prefix(self, filename: str) -> str:
+        '''
+        Summary:
+            Name prefix shared by all entries of a source file
+        Args:
+            filename (str): Source filename with path
+        Returns:
+            str: Hash of the absolute path of the file
+        '''
+
+        return hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()[:16]
+    #end def
+
+    def _file_signature(self, filename: str) -> str:
+        '''
+        Summary:
+            Identify the current contents of a source file
+        Args:
+            filename (str): Source filename with path
+        Raises:
+            Exception: Passed file name is not found or can not be read
+        Returns:
+            str: SHA-256 of the contents or the size and modification time of the file
+        '''
+
+        try:
+            # Cheap signature from the file status
+            if not self.hash_contents:
+                status = os.stat(filename)
+                return f'{status.st_size}:{status.st_mtime_ns}'
+
+            # Hash file contents in blocks
+            file_hash = hashlib.sha256()
+            with open(filename, 'rb') as file:
+                for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                    file_hash.update(block)
+            #end with
+        except OSError as error:
+            # Reraise error
+            raise Exception('Invalid/Corrupt/Missing File') from error
+        #end try
+        return file_hash.hexdigest()
+    #end def
+
+    def entry_path(self, filename: str, options: Dict) -> str:
+        '''
+        Summary:
+            Path of the cache entry for a file imported with a set of options
+        Args:
+            filename (str): Source filename with path
+            options (Dict): All options that change the imported geometries, including the library version
+        Raises:
+            Exception: Passed file name is not found or can not be read
+        Returns:
+            str: Path of the entry, which may not exist
+        '''
+
+        # Options are sorted so the key does not depend on their order
+        key = repr((CACHE_VERSION, self._file_signature(filename), sorted(options.items())))
+        key_hash = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f'{self._file_prefix(filename)}_{key_hash}{CACHE_EXTENSION}')
+    #end def
+
+    def get(self, filename: str, options: Dict) -> Optional[GeometryBatch]:
+        '''
+        Summary:
+            Load the geometries of a file from the cache
+        Args:
+            filename (str): Source filename with path
+            options (Dict): Import options, see entry_path
+        Raises:
+            Exception: Passed file name is not found or can not be read
+        Returns:
+            Optional[GeometryBatch]: Cached geometries or None if there is no entry
+        '''
+
+        path = self.entry_path(filename, options)
+        try:
+            batch = GeometryBatch.load(path)
+        except Exception:
+            # Missing or unreadable entry
+            self.misses += 1
+            return None
+        #end try
+
+        # Mark entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return batch
+    #end def
+
+    def put(self, filename: str, options: Dict, batch: GeometryBatch) -> str:
+        '''
+        Summary:
+            Store the geometries of a file and evict least recently used entries beyond max_bytes
+        Args:
+            filename (str): Source filename with path
+            options (Dict): Import options, see entry_path
+            batch (GeometryBatch): Imported geometries
+        Raises:
+            Exception: Passed file name is not found or can not be read
+        Returns:
+            str: Path of the entry
+        '''
+
+        path = self.entry_path(filename, options)
+
+        # Write to a temporary file first so readers never see a partial entry
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                batch.save(file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        #end try
+
+        self.evict()
+        return path
+    #end def
+
+    def _entries(self) -> List[str]:
+        '''
+        Summary:
+            All entry paths in the cache directory
+        Returns:
+            List[str]: Entry paths
+        '''
+
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(CACHE_EXTENSION)]
+    #end def
+
+    def size(self) -> int:
+        '''
+        Summary:
+            Total size of all entries
+        Returns:
+            int: Size in bytes
+        '''
+
+        total = 0
+        for path in self._entries():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        #end for
+        return total
+    #end def
+
+    def evict(self) -> int:
+        '''
+        Summary:
+            Remove least recently used entries until all entries fit in max_bytes
+        Returns:
+            int: Number of removed entries
+        '''
+
+        # Entries by last use
+        entries = []
+        for path in self._entries():
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime_ns, status.st_size, path))
+        #end for
+        entries.sort()
+
+        # Remove oldest entries first
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        #end for
+        return removed
+    #end def
+
+    def invalidate(self, filename: Optional[str] = None) -> int:
+        '''
+        Summary:
+            Remove the entries of a file or the whole cache
+        Args:
+            filename (str, optional): Source filename with path, None removes all entries. Defaults to None.
+        Returns:
+            int: Number of removed entries
+        '''
+
+        # Entries of one file share a name prefix
+        prefix = '' if filename is None else self._file_prefix(filename) + '_'
+
+        removed = 0
+        for path in self._entries():
+            if os.path.basename(path).startswith(prefix):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            #end if
+        #end for
+        return removed
+    #end def
+#end class
@@ -3,19 +3,29 @@ Module for importing and exporting DXF/CSV/TXT files
 '''
 
 import csv
+import gc
 import re
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain, islice, zip_longest
 from logging import warning
-from typing import Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import geometry_to_line
+from geometry_batch import GEOMETRY_TYPES, POINT_FORMAT_LIST, POINT_FORMAT_LIST_2D, GeometryBatch, to_geometry_list
+from import_cache import ImportCache
 
 import ezdxf
+from ezdxf.addons import iterdxf
 from ezdxf.document import Drawing
+from ezdxf.entities import DXFGraphic
 from ezdxf.entitydb import EntitySpace
 from ezdxf.layouts.layout import Modelspace
+from ezdxf.lldxf.tagger import ascii_tags_loader
 from ezdxf.math import Vertex
+import numpy as np
 
 __author__ = 'Joseph Lawler'
-__version__ = '1.2.0'
+__version__ = '1.3.0'
 
 CONVERSION_FACTORS = (
     1.0,  # 0 = Unitless (NO CONVERION USED)
@@ -76,6 +86,47 @@ UNIT_TABLE = (
 TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
 TGeometryList = List[TGeometryItem]
 
+# DXF entities read by the fast import engine
+FAST_DXF_TYPES = ('POINT', 'LINE', 'ARC', 'CIRCLE', 'LWPOLYLINE')
+
+# LWPOLYLINE vertex group codes and their index in (X,Y,START WIDTH,END WIDTH,BULGE)
+LWPOLYLINE_VERTEX_CODES = {20: 1, 40: 2, 41: 3, 42: 4}
+
+# TXT point lines: X,Y or X,Y,Z with optional signs, exponents and blanks around the commas, other lines are skipped, lines end in LF, CRLF or CR
+TXT_NUMBER = rb'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+TXT_POINT_PATTERN = re.compile(rb'(?:^|(?<=\r))[ \t]*(%s)[ \t]*,[ \t]*(%s)(?:[ \t]*,[ \t]*(%s))?[ \t]*(?=[\r\n]|\Z)' % (TXT_NUMBER, TXT_NUMBER, TXT_NUMBER), re.MULTILINE)
+
+# Bytes read from TXT files at once
+TXT_CHUNK_SIZE = 1 << 24
+
+# Points per block yielded by iter_txt_points
+TXT_BLOCK_SIZE = 1 << 20
+
+# Points formatted at once by export_txt_file
+TXT_WRITE_POINTS = 1 << 16
+
+# Rows read or written at once by iter_csv_geometries and CSVWriter
+CSV_CHUNK_ROWS = 1 << 16
+
+# Numbers of CSV cells that are not plain comma separated numbers (eg. "(1.0, 2.0, 3.0)" or "1.0, 2.0, 3.0 um"), anything else is skipped
+CSV_NUMBER_PATTERN = re.compile(TXT_NUMBER.decode())
+
+# CSV scantypes and their columns: coordinate cells "X,Y,Z", number cells and list cells "#,#,..." of any length
+# POINT: X,Y,Z
+# LINE: START X,Y,Z | END X,Y,Z
+# ARC: CENTER X,Y,Z | RADIUS | START ANGLE | END ANGLE
+# ELLIPSE: CENTER X,Y,Z | MAJOR AXIS LENGTH | RATIO OF MINOR TO MAJOR AXIS
+# SPLINE: CONTROL POINTS X,Y,Z,X,Y,Z,... | KNOTS #,... | WEIGHTS #,... (EMPTY IF NON-RATIONAL) | DEGREE,CLOSED
+# LWPOLYLINE: VERTICES X,Y,START WIDTH,END WIDTH,BULGE,... | CLOSED
+CSV_COLUMNS: Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]] = {
+    'POINT': ((2,), (), ()),
+    'LINE': ((2, 3), (), ()),
+    'ARC': ((2,), (3, 4, 5), ()),
+    'ELLIPSE': ((2,), (3, 4), ()),
+    'SPLINE': ((), (), (2, 3, 4, 5)),
+    'LWPOLYLINE': ((), (3,), (2,)),
+}
+
 def get_hifi_geometry(
     geometry: str,
     allowedtypes: List[str]) -> str:
@@ -136,288 +187,615 @@ def get_hifi_geometry(
     return []
 #end def
 
-def import_dxf_file(
-    filename: str,
+def read_dxf_units(filename: str) -> int:
+    '''
+    Summary:
+        Read the $INSUNITS header variable of a DXF file without loading the drawing
+    Args:
+        filename (str): filename of DXF file to read
+    Raises:
+        Exception: Passed file name is not found
+    Returns:
+        int: DXF units code (index into CONVERSION_FACTORS), 0 = Unitless if not set
+    '''
+
+    try:
+        with open(filename, mode='rt', encoding='utf-8', errors='ignore') as file:
+
+            # Read group code/value pairs until the end of the HEADER section
+            tags = ascii_tags_loader(file)
+            for tag in tags:
+                if tag == (0, 'ENDSEC'):
+                    break
+                if tag == (9, '$INSUNITS'):
+                    return int(next(tags).value)
+            #end for
+    except OSError as error:
+        # Reraise error
+        raise Exception('Invalid/Corrupt/Missing DXF File') from error
+    except (ezdxf.DXFStructureError, StopIteration, ValueError):
+        # Missing or corrupt header, handled by later processing
+        pass
+    #end try
+
+    # Unitless
+    return 0
+#end def
+
+def _dxf_entity_to_geometry(
+    entity: DXFGraphic,
+    entity_index: int,
+    conversion_factor: float) -> Optional[TGeometryItem]:
+    '''
+    Summary:
+        Create the TGeometryItem for a single DXF entity
+    Args:
+        entity (DXFGraphic): DXF entity to format
+        entity_index (int): Unique ID # of the entity
+        conversion_factor (float): Conversion factor from DXF units to microns
+    Raises:
+        Warning: Unknown Geometry is found
+    Returns:
+        Optional[TGeometryItem]: Formatted geometry, None for unknown geometries
+    '''
+
+    # Entity name
+    name: str = entity.DXFTYPE
+
+    if name == 'POINT':
+        # Create point entry: ('POINT:#': [(X,Y,Z)])
+        return (
+            f'POINT:{entity_index}',
+                [
+                    tuple([conversion_factor * x for x in entity.dxf.location]),
+                ]
+        )
+
+    elif name == 'LINE': 
+        # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
+        return (
+                f'LINE:{entity_index}',
+                [
+                    tuple([conversion_factor * x for x in entity.dxf.start.xyz]),
+                    tuple([conversion_factor * x for x in entity.dxf.end.xyz])
+                ]
+        )
+
+    elif name == 'ARC' or name == 'CIRCLE':  # NOTE Arc and Cirlces from dxf into one type internally
+        
+        # Set angles
+        if name == 'CIRCLE':  # CIRCLE
+            start_angle = 0.0
+            end_angle = 360.0
+        else:  # ARC
+            start_angle = entity.dxf.start_angle
+            end_angle = entity.dxf.end_angle
+        #end if
+
+        # Create arc entry: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
+        return (
+                f'ARC:{entity_index}',
+                    [
+                        tuple([conversion_factor * x for x in entity.dxf.center.xyz]),
+                        tuple([entity.dxf.radius * conversion_factor, start_angle, end_angle])
+                    ]
+        )
+
+    elif name == 'ELLIPSE':
+
+        # Create ellipse entry: ('ELLIPSE:#': [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+        return (
+            f'{name}:{entity_index}',
+                    [
+                        tuple([conversion_factor * x for x in entity.dxf.center.xyz]),
+                        tuple([conversion_factor * x for x in entity.dxf.major_axis.xyz]),
+                        (entity.dxf.ratio, )
+                    ]
+        )
+
+    elif name == 'SPLINE':
+
+        # Create variables
+        points: List[Tuple[float, ...]] = []
+        knots: Tuple[float, ...] = []
+        weights: Tuple[float, ...] = []
+
+        # Add degree,closed,#control points
+        points.append(tuple([entity.dxf.degree, entity.CLOSED, len(entity.control_points)]))
+
+        # Convert control points
+        for index,point in enumerate(entity.control_points):
+            points.append(tuple(conversion_factor*x for x in point))
+        
+        # Convert knots
+        for knot in entity.knots:
+            knots += (knot,)
+        points.append(knots)
+
+        # Create weights if necessary
+        if len(entity.weights) == 0:
+            for point in range(len(entity.control_points)):
+                weights += (1.0,)
+        else:
+            for point in range(len(entity.control_points)):
+                weights += (entity.weights[point],)
+        points.append(weights)
+
+        # Create spline entry: ('SPLINE:#': [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
+        return (
+            f'{name}:{entity_index}',points
+        )
+
+    elif name == 'LWPOLYLINE':
+        points: List[Tuple[float, ...]] = []
+        
+        # Create points
+        for index in range(int(len(entity.lwpoints.values)/5)):  # Format points
+            value = entity.lwpoints.values
+            value_index = 5*index
+            points.append((conversion_factor*value[value_index],
+                conversion_factor*value[value_index+1],
+                value[value_index+2],
+                value[value_index+3],
+                value[value_index+4],))
+        #end for
+
+        # Add closed/open
+        points.append((1.0 if entity.closed else 0.0))
+
+        # Create lwpolyline entry: ('LWPOLYLINE:#:' POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+        return (
+            f'{name}:{entity_index}', points
+        )
+
+    # Unsupported geometries
+    else:
+        # Throw a warning when entity is not accounted for
+        warning(f'UNKNOWN GEOMETRY: {name}')
+        return None
+    # end if
+#end def
+
+def _filter_geometries(
+    geometries: Iterable[TGeometryItem],
     allowedtypes: List[str] = [],
     convert: Optional[bool] = False,
     num_segments: float = 0, 
     segment_length: float = 0, 
-    segment_units: str = 'um') -> TGeometryList:
+    segment_units: str = 'um',
+    preserve_order: bool = True,
+    max_deviation: float = 0,
+    workers: int = 0,
+    id_offsets: Optional[Dict[str, int]] = None) -> TGeometryList:
     '''
     Summary:
-        Import a DXF file and returning a list of entities
+        Filter geometries by allowedtypes, down-converting non-allowed geometries when convert is set
+        NOTE Non-allowed geometries are grouped by type and each group is converted with one convert_to call
     Args:
-        filename (str): filename of DXF file to read
+        geometries (Iterable[TGeometryItem]): Geometries to filter
         allowedtypes (List[str]): list of allowed geometry types (eg. POINT, LINE, ...)
-        NOTE If the list is empty then all types will be imported.
+        NOTE If the list is empty then all types are allowed.
         convert (bool, optional): flag for whether to convert non-allowed geometry types to allowable geometry types
         num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
         segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
-        units (str, optional): Units for segment length. Defaults to 'um'.
+        segment_units (str, optional): Units for segment length. Defaults to 'um'.
+        preserve_order (bool, optional): Keep converted geometries in the place of their source geometry,
+        otherwise they are added after all allowed geometries grouped by type. Defaults to True.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves, overrides num_segments and segment_length for curves. Defaults to 0.
+        workers (int, optional): Number of worker processes to split every conversion across, see geometry_to_line.convert_to. Defaults to 0.
+        id_offsets (Dict[str, int], optional): Number of geometries converted from each type in earlier chunks of the same stream,
+        converted geometries are numbered on from it and it is updated so IDs stay unique across chunks. Defaults to None.
+    Returns:
+        TGeometryList: Allowed and down-converted geometries
+    '''
+
+    # All geometries are allowed
+    if not allowedtypes:
+        return list(geometries)
+
+    # Allowed geometries and, if order is preserved, place holders for converted geometries
+    filtered: List = []
+
+    # Non-allowed geometries grouped by type, their place holder indices and the type to convert them to
+    groups: Dict[str, TGeometryList] = {}
+    positions: Dict[str, List[int]] = {}
+    return_types: Dict[str, str] = {}
+
+    for geometry in geometries:
+
+        # Truncate name to just include the geometry
+        name: str = geometry[0].split(':')[0]
+
+        # If geometry is an allowed type
+        if name in allowedtypes:
+            filtered.append(geometry)
+            continue
+
+        # Skip geometries that can not be converted
+        if not convert:
+            continue
+        if name not in return_types:
+            return_types[name] = get_hifi_geometry(name,allowedtypes)
+        if not return_types[name]:
+            continue
+
+        # Add to group of its type
+        groups.setdefault(name, []).append(geometry)
+        if preserve_order:
+            positions.setdefault(name, []).append(len(filtered))
+            filtered.append(None)
+    #end for
+
+    # Down-convert each group to its next highest fidelity geometry
+    for name, group in groups.items():
+
+        sources: List[int] = []
+        converted = geometry_to_line.convert_to(name,return_types[name],group,num_segments,segment_length,segment_units,max_deviation,sources,workers=workers)
+
+        # Number on from the geometries converted in earlier chunks
+        if id_offsets is not None:
+            id_offset: int = id_offsets.get(name, 0)
+            converted = [(f'{geometry[0].split(":")[0]}:{id_offset + index}', geometry[1]) for index, geometry in enumerate(converted)]
+            id_offsets[name] = id_offset + len(converted)
+        #end if
+
+        if not preserve_order:
+            filtered.extend(converted)
+            continue
+
+        # Split converted geometries by source geometry
+        converted_by_source: List[TGeometryList] = [[] for geometry in group]
+        for geometry, source in zip(converted, sources):
+            converted_by_source[source].append(geometry)
+
+        # Fill place holders
+        for position, source_converted in zip(positions[name], converted_by_source):
+            filtered[position] = source_converted
+    #end for
+
+    if not preserve_order:
+        return filtered
+
+    # Flatten place holders
+    result: TGeometryList = []
+    for entry in filtered:
+        if isinstance(entry, list):
+            result.extend(entry)
+        else:
+            result.append(entry)
+    #end for
+
+    return result
+#end def
+
+def _fast_scan_dxf(
+    filename: str,
+    conversion_factor: float) -> Optional[TGeometryList]:
+    '''
+    Summary:
+        Read POINT, LINE, ARC, CIRCLE and LWPOLYLINE entities straight from the group code/value pairs of the ENTITIES section
+    Args:
+        filename (str): filename of DXF file to read
+        conversion_factor (float): Conversion factor from DXF units to microns
     Raises:
-        Exception: Passed file name is not found, corrupt, or not a DXF file
-        Warning: Unknown Geometry is found
+        Exception: Passed file name is not found
     Returns:
-        TGeometryList: A list of all geometry names followed by a unique ID # and a list of associated points in 2D/3D, represented in microns and degrees
-        List of supported geometries and their associated values
-            POINT: ('POINT:#', [(X,Y,Z)])
-            LINE: ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
-            ARC: ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)]) NOTE Includes circles
-            ELLIPSE: ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
-            SPLINE: ('SPLINE:#', [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
-            LWPOLYLINE: ('LWPOLYLINE:#', POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+        Optional[TGeometryList]: Geometries in the same format as import_dxf_file, None if the file holds anything else
     '''
-    
-    # Import file
+
+    # Read group code/value pairs
     try:
-        dxf_drawing: Drawing = ezdxf.readfile(filename)
+        with open(filename, mode='rt', encoding='utf-8', errors='ignore') as file:
+            lines: List[str] = file.read().splitlines()
     except OSError as error:
         # Reraise error
         raise Exception('Invalid/Corrupt/Missing DXF File') from error
-    except ezdxf.DXFStructureError:
-        # Catch errors
-        warning('Invalid/Corrupted DXF Structures')
-        return []
     #end try
+    codes: List[str] = lines[0::2]
+    values: List[str] = lines[1::2]
+
+    # Find start of ENTITIES section
+    try:
+        index: int = values.index('ENTITIES')
+    except ValueError:
+        return None
+    if codes[index].strip() != '2':
+        return None
+
+    # Collect the tags of every entity
+    entities: List[Tuple[str, List[Tuple[int, str]]]] = []
+    tags: List[Tuple[int, str]] = []
+    try:
+        for code, value in zip(codes[index+1:], values[index+1:]):
+            code = int(code)
+            value = value.strip()
+
+            # Start of next entity
+            if code == 0:
+
+                # End of ENTITIES section
+                if value == 'ENDSEC':
+                    break
 
-    # Get all entities from dxf
-    modelspace: Modelspace = dxf_drawing.modelspace()
-    entities: EntitySpace = modelspace.entity_space
+                # Entity can not be handled
+                if value not in FAST_DXF_TYPES:
+                    return None
 
-    # Get conversion factor to nanometers
-    units = dxf_drawing.units
-    conversion_factor: float = CONVERSION_FACTORS[units]
+                tags = []
+                entities.append((value, tags))
+            else:
+                tags.append((code, value))
+            #end if
+        #end for
+    except ValueError:
+        # Corrupt group code
+        return None
+    #end try
 
     # Create empty list of geometries
     geometries: TGeometryList = []
+    entity_index: int = 0
 
-    # Cycle through all entities
-    for entity_index, entity in enumerate(entities):
+    # Format all entities in the same way as _dxf_entity_to_geometry
+    for name, tags in entities:
+        entity_tags = dict(tags)
 
-        # Entity name
-        name: str = entity.DXFTYPE
+        # Skip paperspace entities
+        if entity_tags.get(67, '0') != '0':
+            continue
 
-        # # Check if this is an allowed geometry type
-        # if allowedtypes and name not in allowedtypes:
-        #     continue
-
-        if name == 'POINT' and (allowedtypes == [] or name in allowedtypes):
+        if name == 'POINT':
             # Create point entry: ('POINT:#': [(X,Y,Z)])
-            point = (
+            geometries.append((
                 f'POINT:{entity_index}',
                     [
-                        tuple([conversion_factor * x for x in entity.dxf.location]),
+                        tuple([conversion_factor * float(entity_tags.get(code, 0.0)) for code in (10, 20, 30)]),
                     ]
-            )
-
-            # Add point to geometries
-            geometries.append(point)
+            ))
 
-        elif name == 'LINE': 
+        elif name == 'LINE':
             # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-            line = (
-                    f'LINE:{entity_index}',
+            geometries.append((
+                f'LINE:{entity_index}',
                     [
-                        tuple([conversion_factor * x for x in entity.dxf.start.xyz]),
-                        tuple([conversion_factor * x for x in entity.dxf.end.xyz])
+                        tuple([conversion_factor * float(entity_tags.get(code, 0.0)) for code in (10, 20, 30)]),
+                        tuple([conversion_factor * float(entity_tags.get(code, 0.0)) for code in (11, 21, 31)])
                     ]
-            )
-
-            # If line is an allowed type or allowedtypes was not set
-            if name in allowedtypes or not allowedtypes:
-
-                # Add line to geometries
-                geometries.append(line)
-
-             # If convert flag is set and point is a valid type to be converted to
-            elif convert and 'POINT' in allowedtypes:
-
-                # Convert ellipse geometry to a TGeometryList
-                given_geometry_list: TGeometryList = []
-                given_geometry_list.append(line)
-
-                # Down-convert line geometry to point
-                line_converted = geometry_to_line.convert_to('LINE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
-
-                # Add converted geometry to geometries
-                for geometry in line_converted:
-                    geometries.append(geometry)
+            ))
 
         elif name == 'ARC' or name == 'CIRCLE':  # NOTE Arc and Cirlces from dxf into one type internally
-            
+
             # Set angles
             if name == 'CIRCLE':  # CIRCLE
                 start_angle = 0.0
                 end_angle = 360.0
             else:  # ARC
-                start_angle = entity.dxf.start_angle
-                end_angle = entity.dxf.end_angle
+                start_angle = float(entity_tags.get(50, 0.0))
+                end_angle = float(entity_tags.get(51, 360.0))
             #end if
 
             # Create arc entry: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
-            arc = (
-                    f'ARC:{entity_index}',
-                        [
-                            tuple([conversion_factor * x for x in entity.dxf.center.xyz]),
-                            tuple([entity.dxf.radius * conversion_factor, start_angle, end_angle])
-                        ]
-            )
-
-            # If arc is an allowed type or allowedtypes was not set
-            if name in allowedtypes or not allowedtypes:
-
-                # Add line to geometries
-                geometries.append(arc)
-
-             # If convert flag is set and point is a valid type to be converted to
-            elif convert and get_hifi_geometry(name,allowedtypes):
+            geometries.append((
+                f'ARC:{entity_index}',
+                    [
+                        tuple([conversion_factor * float(entity_tags.get(code, 0.0)) for code in (10, 20, 30)]),
+                        tuple([float(entity_tags.get(40, 1.0)) * conversion_factor, start_angle, end_angle])
+                    ]
+            ))
 
-                # Convert arc geometry to a TGeometryList
-                given_geometry_list: TGeometryList = []
-                given_geometry_list.append(arc)
+        else:  # LWPOLYLINE
+            points: List[Tuple[float, ...]] = []
+            vertex: List[float] = []
+
+            # Vertices start at group code 10 followed by Y, start width, end width and bulge
+            for code, value in tags:
+                if code == 10:
+                    vertex = [float(value), 0.0, 0.0, 0.0, 0.0]
+                    points.append(vertex)
+                elif code in LWPOLYLINE_VERTEX_CODES and vertex:
+                    vertex[LWPOLYLINE_VERTEX_CODES[code]] = float(value)
+            #end for
 
-                # Down-convert arc geometry
-                arc_converted = geometry_to_line.convert_to('ARC',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
+            # Format points
+            points = [(conversion_factor*x, conversion_factor*y, start_width, end_width, bulge)
+                for x, y, start_width, end_width, bulge in points]
 
-                # Add converted geometry to geometries
-                for geometry in arc_converted:
-                    geometries.append(geometry)
+            # Add closed/open
+            points.append((1.0 if int(entity_tags.get(70, 0)) & 1 else 0.0))
 
-        elif name == 'ELLIPSE':
+            # Create lwpolyline entry: ('LWPOLYLINE:#:' POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+            geometries.append((f'LWPOLYLINE:{entity_index}', points))
+        #end if
 
-            # Create ellipse entry: ('ELLIPSE:#': [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
-            ellipse = (
-                f'{name}:{entity_index}',
-                        [
-                            tuple([conversion_factor * x for x in entity.dxf.center.xyz]),
-                            tuple([conversion_factor * x for x in entity.dxf.major_axis.xyz]),
-                            (entity.dxf.ratio, )
-                        ]
-            )
+        # Update index
+        entity_index += 1
+    #end for
 
-            # If ellipse is an allowed type or allowedtypes was not set
-            if name in allowedtypes or not allowedtypes:
-                
-                # Add ellipse to geometries
-                geometries.append(ellipse) 
+    return geometries
+#end def
 
-            # If convert flag is set and there exists a geometry for ellipse to be converted to
-            elif convert and get_hifi_geometry(name,allowedtypes):
+def import_dxf_file(
+    filename: str,
+    allowedtypes: List[str] = [],
+    convert: Optional[bool] = False,
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    segment_units: str = 'um',
+    as_batch: bool = False,
+    engine: str = 'ezdxf',
+    preserve_order: bool = True,
+    max_deviation: float = 0,
+    workers: int = 0) -> TGeometryList:
+    '''
+    Summary:
+        Import a DXF file and returning a list of entities
+    Args:
+        filename (str): filename of DXF file to read
+        allowedtypes (List[str]): list of allowed geometry types (eg. POINT, LINE, ...)
+        NOTE If the list is empty then all types will be imported.
+        convert (bool, optional): flag for whether to convert non-allowed geometry types to allowable geometry types
+        num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
+        segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
+        units (str, optional): Units for segment length. Defaults to 'um'.
+        as_batch (bool, optional): Return a columnar GeometryBatch instead of a TGeometryList. Defaults to False.
+        engine (str, optional): 'ezdxf' to load the full drawing or 'fast' to read POINT/LINE/ARC/CIRCLE/LWPOLYLINE
+        entities straight from the ENTITIES section, falling back to 'ezdxf' for any other entity. Defaults to 'ezdxf'.
+        preserve_order (bool, optional): Keep converted geometries in the place of their source entity,
+        otherwise they are added after all allowed geometries grouped by type. Defaults to True.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves, overrides num_segments and segment_length for curves. Defaults to 0.
+        workers (int, optional): Number of worker processes to split every conversion across, see geometry_to_line.convert_to. Defaults to 0.
+    Raises:
+        Exception: Passed file name is not found, corrupt, or not a DXF file
+        Exception: Unknown engine
+        Warning: Unknown Geometry is found
+    Returns:
+        TGeometryList: A list of all geometry names followed by a unique ID # and a list of associated points in 2D/3D, represented in microns and degrees
+        List of supported geometries and their associated values
+            POINT: ('POINT:#', [(X,Y,Z)])
+            LINE: ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
+            ARC: ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)]) NOTE Includes circles
+            ELLIPSE: ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+            SPLINE: ('SPLINE:#', [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
+            LWPOLYLINE: ('LWPOLYLINE:#', POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+    '''
+    
+    # Unknown engine
+    if engine not in ('ezdxf', 'fast'):
+        raise Exception('Unknown engine {}', engine) from None
 
-                # Convert ellipse geometry to a TGeometryList
-                given_geometry_list: TGeometryList = []
-                given_geometry_list.append(ellipse)
+    # Read geometries without building a drawing
+    formatted_geometries: Optional[TGeometryList] = None
+    if engine == 'fast':
+        formatted_geometries = _fast_scan_dxf(filename, CONVERSION_FACTORS[read_dxf_units(filename)])
 
-                # Down-convert ellipse geometry to next highest fidelity geometry
-                ellipse_converted = geometry_to_line.convert_to('ELLIPSE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
+    # Use ezdxf, also if the fast engine found other entities
+    if formatted_geometries is None:
 
-                # Add converted geometry to geometries
-                for geometry in ellipse_converted:
-                    geometries.append(geometry)
+        # Import file
+        try:
+            dxf_drawing: Drawing = ezdxf.readfile(filename)
+        except OSError as error:
+            # Reraise error
+            raise Exception('Invalid/Corrupt/Missing DXF File') from error
+        except ezdxf.DXFStructureError:
+            # Catch errors
+            warning('Invalid/Corrupted DXF Structures')
+            return GeometryBatch() if as_batch else []
+        #end try
+
+        # Get all entities from dxf
+        modelspace: Modelspace = dxf_drawing.modelspace()
+        entities: EntitySpace = modelspace.entity_space
+
+        # Get conversion factor to nanometers
+        units = dxf_drawing.units
+        conversion_factor: float = CONVERSION_FACTORS[units]
+
+        # Format all entities, skip unknown geometries
+        formatted_geometries = []
+        for entity_index, entity in enumerate(entities):
+            geometry = _dxf_entity_to_geometry(entity, entity_index, conversion_factor)
+            if geometry is not None:
+                formatted_geometries.append(geometry)
+        #end for
+    #end if
 
-        elif name == 'SPLINE':
+    # Keep allowed geometries and down-convert the rest by type
+    geometries: TGeometryList = _filter_geometries(formatted_geometries,allowedtypes,convert,num_segments,segment_length,segment_units,preserve_order,max_deviation,workers)
 
-            # Create variables
-            points: List[Tuple[float, ...]] = []
-            knots: Tuple[float, ...] = []
-            weights: Tuple[float, ...] = []
-
-            # Add degree,closed,#control points
-            points.append(tuple([entity.dxf.degree, entity.CLOSED, len(entity.control_points)]))
-
-            # Convert control points
-            for index,point in enumerate(entity.control_points):
-                points.append(tuple(conversion_factor*x for x in point))
-            
-            # Convert knots
-            for knot in entity.knots:
-                knots += (knot,)
-            points.append(knots)
-
-            # Create weights if necessary
-            if len(entity.weights) == 0:
-                for point in range(len(entity.control_points)):
-                    weights += (1.0,)
-            else:
-                for point in range(len(entity.control_points)):
-                    weights += (entity.weights[point],)
-            points.append(weights)
-
-            # Create spline entry: ('SPLINE:#': [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
-            spline = (
-                f'{name}:{entity_index}',points
-            )
-            
-            # If spline is an allowed type or allowedtypes was not set
-            if name in allowedtypes or not allowedtypes:
-                
-                # Add spline to geometries
-                geometries.append(spline) 
-
-            # If convert flag is set and there exists a geometry for ellipse to be converted to
-            elif convert and get_hifi_geometry(name,allowedtypes):
-
-                # Convert ellipse geometry to a TGeometryList
-                given_geometry_list: TGeometryList = []
-                given_geometry_list.append(spline)
-
-                # Down-convert ellipse geometry to next highest fidelity geometry
-                spline_converted = geometry_to_line.convert_to('SPLINE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
-
-                # Add converted geometry to geometries
-                for geometry in spline_converted:
-                    geometries.append(geometry)
-
-        elif name == 'LWPOLYLINE':
-            points: List[Tuple[float, ...]] = []
-            
-            # Create points
-            for index in range(int(len(entity.lwpoints.values)/5)):  # Format points
-                value = entity.lwpoints.values
-                value_index = 5*index
-                points.append((conversion_factor*value[value_index],
-                    conversion_factor*value[value_index+1],
-                    value[value_index+2],
-                    value[value_index+3],
-                    value[value_index+4],))
-            #end for
+    # Return columnar batch if requested
+    if as_batch:
+        return GeometryBatch.from_list(geometries)
 
-            # Add closed/open
-            points.append((1.0 if entity.closed else 0.0))
+    return geometries
+#end def
 
-            # Create lwpolyline entry: ('LWPOLYLINE:#:' POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
-            lwpolyline = (
-                f'{name}:{entity_index}', points
-            )
+def iter_dxf_geometries(
+    filename: str,
+    allowedtypes: List[str] = [],
+    convert: Optional[bool] = False,
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    segment_units: str = 'um',
+    chunk_size: int = 0,
+    max_deviation: float = 0) -> Iterator[TGeometryItem]:
+    '''
+    Summary:
+        Stream the geometries of a DXF file as its modelspace is read, without loading the whole drawing
+        NOTE Entities are filtered geometry_to_line.STREAM_CHUNK_SIZE at a time, converted geometries are numbered over the whole file
+    Args:
+        filename (str): filename of DXF file to read
+        allowedtypes (List[str]): list of allowed geometry types (eg. POINT, LINE, ...)
+        NOTE If the list is empty then all types will be imported.
+        convert (bool, optional): flag for whether to convert non-allowed geometry types to allowable geometry types
+        num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
+        segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
+        segment_units (str, optional): Units for segment length. Defaults to 'um'.
+        chunk_size (int, optional): Yield lists of up to chunk_size geometries instead of single geometries. Defaults to 0.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves, overrides num_segments and segment_length for curves. Defaults to 0.
+    Raises:
+        Exception: Passed file name is not found, corrupt, or not a DXF file
+        Warning: Unknown Geometry is found
+    Returns:
+        Iterator[TGeometryItem]: Geometries in the same format as import_dxf_file, or TGeometryList chunks if chunk_size is set
+    '''
 
-             # If ellipse is an allowed type or allowedtypes was not set
-            if name in allowedtypes or not allowedtypes:
-                
-                # Add ellipse to geometries
-                geometries.append(lwpolyline) 
+    # Get conversion factor to microns from the header
+    conversion_factor: float = CONVERSION_FACTORS[read_dxf_units(filename)]
 
-            # If convert flag is set and there exists a geometry for ellipse to be converted to
-            elif convert and get_hifi_geometry(name,allowedtypes):
+    # Open file for streaming
+    try:
+        dxf_iterator: iterdxf.IterDXF = iterdxf.opendxf(filename)
+    except OSError as error:
+        # Reraise error
+        raise Exception('Invalid/Corrupt/Missing DXF File') from error
+    except ezdxf.DXFStructureError:
+        # Catch errors
+        warning('Invalid/Corrupted DXF Structures')
+        return
+    #end try
 
-                # Convert ellipse geometry to a TGeometryList
-                given_geometry_list: TGeometryList = []
-                given_geometry_list.append(lwpolyline)
+    # Formatted entities waiting to be filtered and allowed geometries waiting to be yielded
+    entities: TGeometryList = []
+    chunk: TGeometryList = []
 
-                # Down-convert ellipse geometry to next highest fidelity geometry
-                lwpolyline_converted = geometry_to_line.convert_to('LWPOLYLINE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
+    # Number of geometries converted from each type so far
+    id_offsets: Dict[str, int] = {}
 
-                # Add converted geometry to geometries
-                for geometry in lwpolyline_converted:
-                    geometries.append(geometry)
+    try:
+        # Cycle through all entities as they are read, the last pass flushes the remaining entities
+        for entity_index, entity in enumerate(chain(dxf_iterator.modelspace(), [None])):
+
+            # Format entity, skip unknown geometries
+            if entity is not None:
+                geometry = _dxf_entity_to_geometry(entity, entity_index, conversion_factor)
+                if geometry is None:
+                    continue
+                entities.append(geometry)
+                if len(entities) < geometry_to_line.STREAM_CHUNK_SIZE:
+                    continue
+            #end if
 
-        # Unsupported geometries
-        else:
-            # Throw a warning when entity is not accounted for
-            warning(f'UNKNOWN GEOMETRY: {name}')
-        # end if
-    #end for
+            # Yield allowed and converted geometries a chunk of entities at a time
+            for allowed_geometry in _filter_geometries(entities,allowedtypes,convert,num_segments,segment_length,segment_units,max_deviation=max_deviation,id_offsets=id_offsets):
+                if chunk_size:
+                    chunk.append(allowed_geometry)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                else:
+                    yield allowed_geometry
+            #end for
+            entities = []
+        #end for
+    finally:
+        # Close file even if the generator is not exhausted
+        dxf_iterator.close()
+    #end try
 
-    return geometries
+    # Yield remaining geometries
+    if chunk:
+        yield chunk
 #end def
 
 def export_dxf_file(
@@ -429,7 +807,7 @@ def export_dxf_file(
         Export/create a DXF file from a list of entities
     Args:
         filename (str): DXF filename with path
-        scans (TGeometryList): List of geometries to write to DXF file
+        scans (TGeometryList or GeometryBatch): List of geometries to write to DXF file
         exportunits (str, optional): Units to export DXF in, defaults 'um'=Microns.
         List of exportable geometries:
             POINT: ('POINT:#', [(X,Y,Z)])
@@ -447,6 +825,9 @@ def export_dxf_file(
         bool: True upon successful completion
     '''
 
+    # Accept columnar batches
+    scans = to_geometry_list(scans)
+
     # Create DXF file
     dxf_drawing: Drawing = ezdxf.new('R2010')
 
@@ -585,83 +966,253 @@ def export_dxf_file(
     return True
 #end def
 
-def import_txt_file(
-    filename: str,
-    units: Optional[str] = 'um') -> TGeometryList:
+@contextmanager
+def _gc_paused() -> Iterator[None]:
     '''
     Summary:
-        Imports a list of points from a textfile
-    Args:
-        filname (str): TXT filename with path
-        units (str, optional): Units to import TXT in, defaults to Microns.
-    Raises:
-        Exception: Passed file name is not found
+        Pause garbage collection while millions of tuples are created, collections would rescan them all
     Returns:
-        TGeometryList: A list of points followed by a unique ID # and a list of associated values in 2D/3D
-        List of supported geometries and how they are stored
-            POINT: ('POINT:#', [(X,Y,Z)])
+        Iterator[None]: Context in which garbage collection is disabled
     '''
-    
-    # Import text file
-    with open(filename, newline='') as file:
-        points: List[str] = file.readlines()
-
-        # Create empty list for geometries and index
-        geometries: TGeometryList = []
-        geometries_index = 0
-
-        # Get conversion factor
-        unit_index = UNIT_TABLE.index(units)
-        conversion_factor = CONVERSION_FACTORS[unit_index + 1]
-
-        # Loop through all points
-        for point in points:
-
-            # Remove newline character
-            point = point.rstrip('\n')
-            point = point.rstrip('\r')
-
-            # Determine if line is a valid point
-            valid_3d_point = re.fullmatch(r'\d+.\d+,\d+.\d+,\d+.\d+', point)
-            valid_2d_point = re.fullmatch(r'\d+.\d+,\d+.\d+', point)
-
-            if valid_3d_point or valid_2d_point:
 
-                # Get points, convert to float, multiply by conversion factor
-                points: Tuple[float] = tuple(
-                    point*conversion_factor for point in map(float, re.findall(r'\d+.\d+', point))
-                )
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
+    #end try
+#end def
 
-                # Create point entry: ('POINT:#', [(X,Y,Z)])
-                point_entry = (f'POINT:{geometries_index}',points)
+def _parse_txt_points(chunk: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Parse all point lines of a block of TXT lines at once
+    Args:
+        chunk (bytes): Whole lines of a TXT file
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N,3) points [X,Y,Z] and (N,) number of coordinates (2 or 3) of every point
+    '''
 
-                # Add point to geometries
-                geometries.append(point_entry)
+    # Coordinate strings of every point line, missing Z is empty
+    coordinates = np.array(TXT_POINT_PATTERN.findall(chunk), dtype=bytes).reshape(-1, 3)
+    dimensions = np.where(coordinates[:, 2] == b'', 2, 3).astype(np.uint8)
+    coordinates[:, 2][dimensions == 2] = b'0'
+    return coordinates.astype(np.float64), dimensions
+#end def
 
-                # Increase index
-                geometries_index += 1
-            #end if
+def _txt_batch(points: np.ndarray, dimensions: np.ndarray, first_id: int) -> GeometryBatch:
+    '''
+    Summary:
+        Create a batch of TXT points
+    Args:
+        points (np.ndarray): (N,3) points [X,Y,Z]
+        dimensions (np.ndarray): (N,) number of coordinates (2 or 3) of every point
+        first_id (int): ID # of the first point
+    Returns:
+        GeometryBatch: Batch of ('POINT:#', (X,Y)) and ('POINT:#', (X,Y,Z)) points
+    '''
 
-        # Return list of geometries
-        return geometries
+    batch = GeometryBatch.from_points(points)
+    batch.point_formats = dimensions
+    batch.point_ids = np.arange(first_id, first_id + len(points), dtype=np.int64)
+    return batch
 #end def
 
-def export_txt_file(
-    filename: str,
-    scans: TGeometryList,
-    exportunits: Optional[str] = 'um') -> bool:
+def _iter_txt_chunks(filename: str, conversion_factor: float) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
     '''
     Summary:
-        Creates/Overrides a TXT file with a list of points passed
+        Parse the whole lines of a TXT file TXT_CHUNK_SIZE bytes at a time
+        NOTE Lines are parsed with one compiled regular expression and converted to floats by NumPy
     Args:
         filename (str): TXT filename with path
-        scans (TGeometryList): List of geometries to write to TXT file
-        exportunits (str, optional): Units to export TXT in, defaults to Microns.
-        List of Exportable Geometries:
-            List of supported geometries and the format
-            POINT: #.#,#.#,#.#
+        conversion_factor (float): Factor from the file units to microns
     Raises:
-        Warning: Unknown/Unsupported Geometry is passed
+        Exception: Passed file name is not found
+    Returns:
+        Iterator[Tuple[np.ndarray, np.ndarray]]: (N,3) points in microns and (N,) number of coordinates of every point, per chunk
+    '''
+
+    with open(filename, 'rb') as file:
+        remainder = b''
+        while True:
+            chunk = file.read(TXT_CHUNK_SIZE)
+
+            # Parse whole lines ending in LF, CRLF or CR, the partial last line is parsed with the next chunk
+            if chunk:
+                last_newline = max(chunk.rfind(b'\n'), chunk.rfind(b'\r'))
+                if last_newline < 0:
+                    remainder += chunk
+                    continue
+                lines, remainder = remainder + chunk[:last_newline + 1], chunk[last_newline + 1:]
+            else:
+                lines, remainder = remainder, b''
+            #end if
+            points, dimensions = _parse_txt_points(lines)
+            yield points*conversion_factor, dimensions
+
+            if not chunk:
+                break
+        #end while
+    #end with
+#end def
+
+def _read_txt_points(filename: str, conversion_factor: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Parse all points of a TXT file, see _iter_txt_chunks
+    Args:
+        filename (str): TXT filename with path
+        conversion_factor (float): Factor from the file units to microns
+    Raises:
+        Exception: Passed file name is not found
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N,3) points in microns and (N,) number of coordinates of every point
+    '''
+
+    chunks = list(_iter_txt_chunks(filename, conversion_factor))
+    return np.concatenate([points for points, _ in chunks]), np.concatenate([dimensions for _, dimensions in chunks])
+#end def
+
+def iter_txt_points(
+    filename: str,
+    units: Optional[str] = 'um',
+    block_size: int = TXT_BLOCK_SIZE) -> Iterator[GeometryBatch]:
+    '''
+    Summary:
+        Read the points of a TXT file in blocks, memory use is bounded by TXT_CHUNK_SIZE and block_size
+        NOTE Lines are parsed TXT_CHUNK_SIZE bytes at a time with one compiled regular expression and converted to floats by NumPy
+    Args:
+        filename (str): TXT filename with path
+        units (str, optional): Units to import TXT in, defaults to Microns.
+        block_size (int, optional): Number of points in every block, the last block may hold fewer. Defaults to TXT_BLOCK_SIZE.
+    Raises:
+        Exception: Passed file name is not found
+    Returns:
+        Iterator[GeometryBatch]: Blocks of points numbered across blocks
+    '''
+
+    # Get conversion factor
+    unit_index = UNIT_TABLE.index(units)
+    conversion_factor = CONVERSION_FACTORS[unit_index + 1]
+
+    # Parsed points not yet yielded
+    pending_points: List[np.ndarray] = []
+    pending_dimensions: List[np.ndarray] = []
+    num_pending = 0
+    num_yielded = 0
+
+    for points, dimensions in _iter_txt_chunks(filename, conversion_factor):
+        pending_points.append(points)
+        pending_dimensions.append(dimensions)
+        num_pending += len(points)
+
+        # Yield full blocks
+        if num_pending >= block_size:
+            points = np.concatenate(pending_points)
+            dimensions = np.concatenate(pending_dimensions)
+            last_block = len(points) - len(points)%block_size
+            for block_start in range(0, last_block, block_size):
+                yield _txt_batch(points[block_start:block_start + block_size], dimensions[block_start:block_start + block_size], num_yielded)
+                num_yielded += block_size
+            #end for
+            pending_points, pending_dimensions = [points[last_block:]], [dimensions[last_block:]]
+            num_pending = len(points) - last_block
+        #end if
+    #end for
+
+    # Yield the rest at the end of the file
+    if num_pending:
+        yield _txt_batch(np.concatenate(pending_points), np.concatenate(pending_dimensions), num_yielded)
+#end def
+
+def import_txt_file(
+    filename: str,
+    units: Optional[str] = 'um',
+    as_batch: bool = False) -> TGeometryList:
+    '''
+    Summary:
+        Imports a list of points from a textfile
+        NOTE Lines that are not 2 or 3 comma separated numbers are skipped, numbers may have signs and exponents
+    Args:
+        filname (str): TXT filename with path
+        units (str, optional): Units to import TXT in, defaults to Microns.
+        as_batch (bool, optional): Return a columnar GeometryBatch instead of a TGeometryList. Defaults to False.
+    Raises:
+        Exception: Passed file name is not found
+    Returns:
+        TGeometryList: A list of points followed by a unique ID # and a list of associated values in 2D/3D
+        List of supported geometries and how they are stored
+            POINT: ('POINT:#', [(X,Y,Z)])
+    '''
+
+    # Get conversion factor
+    unit_index = UNIT_TABLE.index(units)
+    conversion_factor = CONVERSION_FACTORS[unit_index + 1]
+
+    # Read the whole file
+    points, dimensions = _read_txt_points(filename, conversion_factor)
+
+    # Return columnar batch if requested
+    if as_batch:
+        return _txt_batch(points, dimensions, 0)
+
+    # Create point entries: ('POINT:#', (X,Y)) or ('POINT:#', (X,Y,Z))
+    with _gc_paused():
+        point_tuples = zip(*points.T.tolist())
+        if np.all(dimensions == 3):
+            return [(f'POINT:{point_index}', point) for point_index, point in enumerate(point_tuples)]
+        return [(f'POINT:{point_index}', point[:point_dimensions]) for point_index, (point, point_dimensions) in enumerate(zip(point_tuples, dimensions.tolist()))]
+    #end with
+#end def
+
+def _format_txt_points(points: np.ndarray, dimensions: np.ndarray, float_format: str) -> str:
+    '''
+    Summary:
+        Format points as TXT lines in one pass
+    Args:
+        points (np.ndarray): (N,3) points [X,Y,Z]
+        dimensions (np.ndarray): (N,) number of coordinates (2 or 3) to write of every point
+        float_format (str): printf-style format of every coordinate
+    Returns:
+        str: One line per point, coordinates separated by commas
+    '''
+
+    line_2d = f'{float_format},{float_format}\n'
+    line_3d = f'{float_format},{float_format},{float_format}\n'
+
+    # Same format string for every line
+    if np.all(dimensions == 3):
+        return (line_3d*len(points)) % tuple(points.ravel().tolist())
+    if np.all(dimensions == 2):
+        return (line_2d*len(points)) % tuple(points[:, :2].ravel().tolist())
+
+    # Mixed 2D/3D points, Z is left out of the values of 2D points
+    values = points[np.stack([np.ones(len(points), dtype=bool)]*2 + [dimensions == 3], axis=1)]
+    return ''.join(np.where(dimensions == 3, line_3d, line_2d).tolist()) % tuple(values.tolist())
+#end def
+
+def export_txt_file(
+    filename: str,
+    scans: TGeometryList,
+    exportunits: Optional[str] = 'um',
+    float_format: str = '%r') -> bool:
+    '''
+    Summary:
+        Creates/Overrides a TXT file with a list of points passed
+        NOTE Points are converted and formatted TXT_WRITE_POINTS at a time, unsupported geometries are skipped
+    Args:
+        filename (str): TXT filename with path
+        scans (TGeometryList or GeometryBatch): List of geometries to write to TXT file, may be a generator
+        exportunits (str, optional): Units to export TXT in, defaults to Microns.
+        float_format (str, optional): printf-style format of every coordinate such as '%.4f', defaults to '%r' which round-trips every float.
+        List of Exportable Geometries:
+            List of supported geometries and the format
+            POINT: #.#,#.#,#.# or #.#,#.# for 2D TXT points
+    Raises:
+        Exception: Invalid units are passed
+        Warning: Unknown/Unsupported Geometry is passed
     Returns:
         bool: Returns true upon successful completion
     '''
@@ -671,37 +1222,388 @@ def export_txt_file(
         # Set units to passed units
         conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(exportunits)+1]
     else:
-        conversion_factor = 1
         raise Exception('Invalid Units {}', exportunits) from None
 
     # Create a new textfile if one does not already exist
     # NOTE will override existing files with the same name
-    text_file = open(filename, 'w+')
+    with open(filename, 'w', buffering=TXT_CHUNK_SIZE) as text_file:
+
+        # Columnar batches are written straight from their point array
+        if isinstance(scans, GeometryBatch):
+            num_unsupported = len(scans) - len(scans.points)
+            # 2D points are written with X and Y only, like the list path
+            dimensions = np.where(np.isin(scans.point_formats, (POINT_FORMAT_LIST_2D, 2)), 2, 3)
+            for block_start in range(0, len(scans.points), TXT_WRITE_POINTS):
+                block_end = block_start + TXT_WRITE_POINTS
+                text_file.write(_format_txt_points(
+                    scans.points[block_start:block_end]/conversion_factor, dimensions[block_start:block_end], float_format))
+            #end for
 
-    # Cycle through every geometry from the scans list
-    for entry in scans:
-        
-         # Get the point's values
-         name = (''.join([i for i in entry[0].lower() if i.isalpha()]))
-         point = entry[1]
-         output: str = ''
-        
-        # Point
-         if name == 'point':
+        else:
+            num_unsupported = 0
+            geometries = iter(scans)
+            while True:
+                block = list(islice(geometries, TXT_WRITE_POINTS))
+                if not block:
+                    break
+
+                # Gather point coordinates: [(X,Y,Z)] or a bare TXT tuple
+                points: List[Tuple[float, ...]] = []
+                dimensions: List[int] = []
+                for name, values in block:
+                    if name.split(':')[0].upper() == 'POINT':
+                        point = values if values and not isinstance(values[0], (tuple, list)) else values[0]
+                        points.append(tuple(point) + (0.0,)*(3 - len(point)))
+                        dimensions.append(len(point))
+                    else:
+                        num_unsupported += 1
+                    #end if
+                #end for
+
+                text_file.write(_format_txt_points(
+                    np.array(points, dtype=np.float64).reshape(-1, 3)/conversion_factor, np.array(dimensions, dtype=np.uint8), float_format))
+            #end while
+        #end if
+    #end with
+
+    # Warning on unsupported geometry
+    if num_unsupported:
+        warning(f'Unsupported geometry: {num_unsupported} skipped')
 
-             # Generate formatted string based on point
-             output = str(tuple(point/conversion_factor for point in point[0]))[1:-1]
+    # Return true upon successful completion
+    return True
+#end def
 
-         else:
+def _csv_cell_numbers(cell: str, row: int, min_count: int, max_count: Optional[int] = None) -> List[float]:
+    '''
+    Summary:
+        Leniently read the numbers of one CSV cell, plain comma separated numbers first, otherwise every signed number in it
+    Args:
+        cell (str): Cell of the row
+        row (int): Index of the row in its file, the ID # its geometry would get
+        min_count (int): Fewest numbers the cell may hold
+        max_count (int, optional): Most numbers the cell may hold, None for any number. Defaults to None.
+    Raises:
+        Exception: The cell holds too few or too many numbers
+    Returns:
+        List[float]: Numbers of the cell
+    '''
 
-             # Warning on unsupported geometry
-             warning('Unsupported geometry')
+    try:
+        numbers = [float(value) for value in cell.split(',')]
+    except ValueError:
+        numbers = [float(value) for value in CSV_NUMBER_PATTERN.findall(cell)]
+    #end try
 
-         # Write to text file with newline
-         text_file.write(output+'\n')
+    if len(numbers) < min_count or (max_count is not None and len(numbers) > max_count):
+        raise Exception(f'Invalid/Corrupt CSV row {row}: {cell!r}')
+    return numbers
+#end def
 
-    # Return true upon successful completion
-    return True
+def _parse_csv_coordinates(cells: List[str], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Parse "X,Y,Z" coordinate cells of a CSV column at once
+        NOTE If any cell is not plain numbers the cells are read one at a time with _csv_cell_numbers
+    Args:
+        cells (List[str]): Comma separated coordinates
+        rows (np.ndarray): (N,) index of the row of every cell in its file
+    Raises:
+        Exception: A cell holds no or more than 3 numbers
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N,3) coordinates padded with 0.0 and (N,) number of values in every cell
+    '''
+
+    try:
+        counts = np.fromiter(map(str.count, cells, [',']*len(cells)), dtype=np.int64, count=len(cells)) + 1
+        values = np.array(','.join(cells).split(',') if cells else [], dtype=np.float64)
+    except ValueError:
+        # Fall back to reading every cell on its own
+        cell_values = [_csv_cell_numbers(cell, row, 1, 3) for cell, row in zip(cells, rows.tolist())]
+        counts = np.fromiter(map(len, cell_values), dtype=np.int64, count=len(cells))
+        values = np.fromiter(chain.from_iterable(cell_values), dtype=np.float64)
+    #end try
+
+    # Cells holding more than 3 numbers are corrupt, as in the fallback
+    too_many = np.flatnonzero(counts > 3)
+    if len(too_many):
+        raise Exception(f'Invalid/Corrupt CSV row {rows[too_many[0]]}: {cells[too_many[0]]!r}')
+
+    # Every cell is 3D
+    if np.all(counts == 3):
+        return values.reshape(-1, 3), counts
+
+    # Place the values of every cell
+    coordinates = np.zeros((len(cells), 3))
+    starts = np.cumsum(counts) - counts
+    for axis in range(3):
+        has_axis = counts > axis
+        coordinates[has_axis, axis] = values[starts[has_axis] + axis]
+    #end for
+    return coordinates, counts
+#end def
+
+def _csv_tuples(coordinates: np.ndarray, counts: np.ndarray) -> List[Tuple[float, ...]]:
+    '''
+    Summary:
+        Coordinate tuples holding as many values as their CSV cells
+    Args:
+        coordinates (np.ndarray): (N,3) coordinates padded with 0.0
+        counts (np.ndarray): (N,) number of values in every cell
+    Returns:
+        List[Tuple[float, ...]]: Coordinate tuples
+    '''
+
+    tuples = list(map(tuple, coordinates.tolist()))
+    for index in np.flatnonzero(counts < 3).tolist():
+        tuples[index] = tuples[index][:counts[index]]
+    return tuples
+#end def
+
+def _csv_conversion_factor(units: Optional[str]) -> float:
+    '''
+    Summary:
+        Factor from CSV units to microns
+    Args:
+        units (str): Units of the CSV file
+    Raises:
+        Warning: Passed units are not valid
+    Returns:
+        float: Conversion factor, microns are used for invalid units
+    '''
+
+    # Attempt to read units param
+    try:
+        unit_index = UNIT_TABLE.index(units)
+    except ValueError:
+        Warning('Passed units are not valid')
+        # Use 'um'
+        unit_index = UNIT_TABLE.index('um')
+
+    return CONVERSION_FACTORS[unit_index + 1]
+#end def
+
+def _batch_dimensions(*counts: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Coordinate dimensions of a GeometryBatch from the value counts of CSV cells
+    Args:
+        counts (np.ndarray): (N,) number of values in every cell of each coordinate column
+    Returns:
+        np.ndarray: (N,C) uint8 dimensions, or an empty (0,C) array if every coordinate is 3D
+    '''
+
+    dimensions = np.minimum(np.column_stack(counts), 3).astype(np.uint8)
+    if np.all(dimensions == 3):
+        return dimensions[:0]
+    return dimensions
+#end def
+
+def _parse_csv_numbers(cells: List[str], rows: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Parse single number cells of a CSV column at once
+        NOTE If any cell is not a plain number the cells are read one at a time with _csv_cell_numbers
+    Args:
+        cells (List[str]): Numbers
+        rows (np.ndarray): (N,) index of the row of every cell in its file
+    Raises:
+        Exception: A cell holds no or more than one number
+    Returns:
+        np.ndarray: (N,) numbers
+    '''
+
+    try:
+        return np.array(cells, dtype=np.float64)
+    except ValueError:
+        # Fall back to reading every cell on its own
+        return np.array([_csv_cell_numbers(cell, row, 1, 1)[0] for cell, row in zip(cells, rows.tolist())], dtype=np.float64)
+    #end try
+#end def
+
+def _parse_csv_lists(cells: List[str], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Parse "#,#,..." list cells of any length of a CSV column at once
+        NOTE If any cell is not plain numbers the cells are read one at a time with _csv_cell_numbers
+    Args:
+        cells (List[str]): Comma separated numbers, empty cells are empty lists
+        rows (np.ndarray): (N,) index of the row of every cell in its file
+    Raises:
+        Exception: A cell that is not empty holds no numbers
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Values of all cells one after another and (N,) number of values in every cell
+    '''
+
+    try:
+        counts = np.fromiter((cell.count(',') + 1 if cell.strip() else 0 for cell in cells), dtype=np.int64, count=len(cells))
+        values = ','.join(cell for cell in cells if cell.strip())
+        return np.array(values.split(',') if values else [], dtype=np.float64), counts
+    except ValueError:
+        # Fall back to reading every cell on its own
+        cell_values = [_csv_cell_numbers(cell, row, 1) if cell.strip() else [] for cell, row in zip(cells, rows.tolist())]
+        counts = np.fromiter(map(len, cell_values), dtype=np.int64, count=len(cells))
+        return np.fromiter(chain.from_iterable(cell_values), dtype=np.float64), counts
+    #end try
+#end def
+
+def _csv_split(values: list, counts: np.ndarray) -> Iterator[list]:
+    '''
+    Summary:
+        Split values into consecutive lists
+    Args:
+        values (list): Values of all lists one after another
+        counts (np.ndarray): (N,) length of every list
+    Returns:
+        Iterator[list]: Lists of the given lengths
+    '''
+
+    end = 0
+    for count in counts.tolist():
+        start, end = end, end + count
+        yield values[start:end]
+    #end for
+#end def
+
+def _parse_csv_columns(
+    columns: List[Tuple[str, ...]],
+    first_row: int,
+    conversion_factor: float,
+    as_batch: bool = False) -> Union[TGeometryList, GeometryBatch]:
+    '''
+    Summary:
+        Create the geometries of CSV rows, the cells of every scantype are parsed together, see CSV_COLUMNS
+    Args:
+        columns (List[Tuple[str, ...]]): Columns of the rows, name, scantype, arg1, ...
+        first_row (int): Index of the first row in its file, the ID # of a geometry is the index of its row
+        conversion_factor (float): Factor from the file units to microns
+        as_batch (bool, optional): Return a columnar GeometryBatch instead of a TGeometryList. Defaults to False.
+    Raises:
+        Exception: A row holds a cell that can not be read, its row # is the ID # its geometry would get
+        Warning: Unknown scantype
+    Returns:
+        Union[TGeometryList, GeometryBatch]: Geometries of the rows in their order
+    '''
+
+    # Pad columns up to the last used column
+    num_rows = len(columns[0]) if columns else 0
+    columns = columns + [('',)*num_rows]*(6 - len(columns))
+
+    # Index of the scantype of every row in CSV_COLUMNS, unknown scantypes get len(CSV_COLUMNS)
+    scantype_names: List[str] = list(CSV_COLUMNS)
+    scantype_codes: Dict[str, int] = {
+        scantype: scantype_names.index(scantype.upper()) if scantype.upper() in CSV_COLUMNS else len(scantype_names)
+        for scantype in set(columns[1])
+    }
+    scantypes = np.fromiter(map(scantype_codes.__getitem__, columns[1]), dtype=np.uint8, count=num_rows)
+
+    # Throw a warning when entity is not accounted for
+    for index in np.flatnonzero(scantypes == len(scantype_names)).tolist():
+        warning(f'UNKNOWN GEOMETRY: {columns[1][index].upper()}')
+
+    # Parse the cells of every scantype together: row positions, coordinates (N,3) with value counts, numbers (N,), lists with value counts
+    positions: Dict[str, np.ndarray] = {}
+    coordinates: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+    numbers: Dict[str, List[np.ndarray]] = {}
+    lists: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+    for name, (coordinate_columns, number_columns, list_columns) in CSV_COLUMNS.items():
+        positions[name] = np.flatnonzero(scantypes == scantype_names.index(name))
+        selected = positions[name].tolist()
+        rows = positions[name] + first_row
+        coordinates[name] = []
+        for column in coordinate_columns:
+            cells = [columns[column][index] for index in selected]
+            group_coordinates, counts = _parse_csv_coordinates(cells, rows)
+            coordinates[name].append((group_coordinates*conversion_factor, counts))
+        #end for
+        numbers[name] = [_parse_csv_numbers([columns[column][index] for index in selected], rows) for column in number_columns]
+        lists[name] = [_parse_csv_lists([columns[column][index] for index in selected], rows) for column in list_columns]
+    #end for
+
+    # Split spline lists: control points (M,3), knots and weights with their counts, (N,2) degree and closed flag
+    (control_values, control_counts), (knots, knot_counts), (weights, weight_counts), (spline_flags, flag_counts) = lists['SPLINE']
+    invalid = (control_counts % 3 != 0) | (flag_counts != 2) | ((weight_counts != 0) & (weight_counts != control_counts//3))
+    if np.any(invalid):
+        raise Exception(f'Invalid/Corrupt CSV row {first_row + positions["SPLINE"][invalid][0]}: SPLINE')
+    control_counts = control_counts//3
+    control_points = control_values.reshape(-1, 3)*conversion_factor
+    spline_headers = np.column_stack([spline_flags.reshape(-1, 2).astype(np.int64), control_counts])
+
+    # Split polyline lists: (M,5) vertices with their counts, X and Y in microns, widths unscaled like DXF imports
+    (vertex_values, vertex_counts), = lists['LWPOLYLINE']
+    invalid = vertex_counts % 5 != 0
+    if np.any(invalid):
+        raise Exception(f'Invalid/Corrupt CSV row {first_row + positions["LWPOLYLINE"][invalid][0]}: LWPOLYLINE')
+    vertex_counts = vertex_counts//5
+    vertices = vertex_values.reshape(-1, 5)*[conversion_factor, conversion_factor, 1.0, 1.0, 1.0]
+
+    # Columnar batch straight from the parsed cells
+    if as_batch:
+        batch = GeometryBatch()
+        types = np.full(num_rows, len(GEOMETRY_TYPES), dtype=np.uint8)
+        for name in CSV_COLUMNS:
+            types[positions[name]] = GEOMETRY_TYPES.index(name)
+        batch.types = types[types < len(GEOMETRY_TYPES)]
+        batch.points = coordinates['POINT'][0][0]
+        batch.point_formats = np.where(coordinates['POINT'][0][1] == 2, POINT_FORMAT_LIST_2D, POINT_FORMAT_LIST).astype(np.uint8)
+        batch.point_ids = positions['POINT'] + first_row
+        batch.lines = np.stack([coordinates['LINE'][0][0], coordinates['LINE'][1][0]], axis=1)
+        batch.line_dimensions = _batch_dimensions(coordinates['LINE'][0][1], coordinates['LINE'][1][1])
+        batch.line_ids = positions['LINE'] + first_row
+        radii, start_angles, end_angles = numbers['ARC']
+        batch.arcs = np.column_stack([coordinates['ARC'][0][0], radii*conversion_factor, start_angles, end_angles])
+        batch.arc_dimensions = _batch_dimensions(coordinates['ARC'][0][1])[:, 0]
+        batch.arc_ids = positions['ARC'] + first_row
+        major_axes, ratios = numbers['ELLIPSE']
+        zeros = np.zeros(len(ratios))
+        batch.ellipses = np.column_stack([coordinates['ELLIPSE'][0][0], major_axes*conversion_factor, zeros, zeros, ratios])
+        batch.ellipse_dimensions = _batch_dimensions(coordinates['ELLIPSE'][0][1], np.full(len(ratios), 3))
+        batch.ellipse_ids = positions['ELLIPSE'] + first_row
+        batch.spline_headers = spline_headers
+        batch.spline_control_points = control_points
+        batch.spline_control_offsets = np.concatenate([[0], np.cumsum(control_counts)])
+        batch.spline_knots = knots
+        batch.spline_knot_offsets = np.concatenate([[0], np.cumsum(knot_counts)])
+        # Non-rational splines have no weights, stored as NaN
+        batch.spline_weights = np.full(len(control_points), np.nan)
+        batch.spline_weights[np.repeat(weight_counts > 0, control_counts)] = weights
+        batch.spline_ids = positions['SPLINE'] + first_row
+        batch.lwpolyline_vertices = vertices
+        batch.lwpolyline_offsets = np.concatenate([[0], np.cumsum(vertex_counts)])
+        batch.lwpolyline_closed = numbers['LWPOLYLINE'][0]
+        batch.lwpolyline_ids = positions['LWPOLYLINE'] + first_row
+        return batch
+    #end if
+
+    # Create entries of every scantype, placed at the index of their row
+    with _gc_paused():
+        entries: List[Optional[TGeometryItem]] = [None]*num_rows
+        groups: Dict[str, Iterable[list]] = {
+            # ('POINT:#', [(X,Y,Z)])
+            'POINT': ([center] for center in _csv_tuples(*coordinates['POINT'][0])),
+            # ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
+            'LINE': (list(line) for line in zip(_csv_tuples(*coordinates['LINE'][0]), _csv_tuples(*coordinates['LINE'][1]))),
+            # ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
+            'ARC': ([center, arc] for center, arc in zip(
+                _csv_tuples(*coordinates['ARC'][0]),
+                zip((numbers['ARC'][0]*conversion_factor).tolist(), numbers['ARC'][1].tolist(), numbers['ARC'][2].tolist()))),
+            # ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+            'ELLIPSE': ([center, (major_axis, 0.0, 0.0), (ratio,)] for center, major_axis, ratio in zip(
+                _csv_tuples(*coordinates['ELLIPSE'][0]), (numbers['ELLIPSE'][0]*conversion_factor).tolist(), numbers['ELLIPSE'][1].tolist())),
+            # ('SPLINE:#', [(DEGREE, CLOSED, #), CONTROL POINT(S)..., KNOT(S) [#,...], WEIGHT(S) [#,...]])
+            'SPLINE': ([tuple(header)] + control + [knot_list, weight_list] for header, control, knot_list, weight_list in zip(
+                spline_headers.tolist(), _csv_split(list(map(tuple, control_points.tolist())), control_counts),
+                _csv_split(knots.tolist(), knot_counts), _csv_split(weights.tolist(), weight_counts))),
+            # ('LWPOLYLINE:#', [(X,Y,START WIDTH,END WIDTH,BULGE)..., CLOSED])
+            'LWPOLYLINE': (polyline + [closed] for polyline, closed in zip(
+                _csv_split(list(map(tuple, vertices.tolist())), vertex_counts), numbers['LWPOLYLINE'][0].tolist())),
+        }
+        for name, values in groups.items():
+            for index, value in zip(positions[name].tolist(), values):
+                entries[index] = (f'{name}:{first_row + index}', value)
+        #end for
+        return [entry for entry in entries if entry is not None]
+    #end with
 #end def
 
 def import_csv_file(
@@ -712,10 +1614,15 @@ def import_csv_file(
     convert: Optional[bool] = False,
     num_segments: float = 0, 
     segment_length: float = 0, 
-    segment_units: str = 'um') -> TGeometryList:
+    segment_units: str = 'um',
+    as_batch: bool = False,
+    preserve_order: bool = True,
+    max_deviation: float = 0,
+    workers: int = 0) -> TGeometryList:
     '''
     Summary:
         Imports and formats geometries from a csv file
+        NOTE Rows are grouped by scantype and the cells of every group are parsed together, see CSV_COLUMNS for the columns of every scantype
     Args:
         filname (str): CSV filename with path
         allowedtypes (List[str]): List of allowed geometry types (eg. POINT, LINE...),
@@ -726,8 +1633,14 @@ def import_csv_file(
         num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
         segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
         units (str, optional): Units for segment length. Defaults to 'um'.
+        as_batch (bool, optional): Return a columnar GeometryBatch instead of a TGeometryList. Defaults to False.
+        preserve_order (bool, optional): Keep converted geometries in the place of their source row,
+        otherwise they are added after all allowed geometries grouped by type. Defaults to True.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves, overrides num_segments and segment_length for curves. Defaults to 0.
+        workers (int, optional): Number of worker processes to split every conversion across, see geometry_to_line.convert_to. Defaults to 0.
     Raises:
         Exception: Passed file name is not found
+        Exception: A row holds a cell that can not be read, its row # is the ID # its geometry would get
         Warning: Passed units are not valid
      Returns:
         TGeometryList: A list of all geometry names followed by a unique ID # and a list of associated points in 2D/3D, represented in microns and degrees
@@ -736,6 +1649,8 @@ def import_csv_file(
             LINE: ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
             ARC: ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)]) NOTE Includes circles
             ELLIPSE: ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+            SPLINE: ('SPLINE:#', [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
+            LWPOLYLINE: ('LWPOLYLINE:#', POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
     '''
     
     with open(filename, newline='') as file:
@@ -743,257 +1658,308 @@ def import_csv_file(
         # Read file as csv
         imported_csv: csv = csv.reader(file, delimiter=',')
 
-        # Attempt to read units param
-        try:
-            unit_index = UNIT_TABLE.index(units)
-        except ValueError:
-            Warning('Passed units are not valid')
-            # Use 'um'
-            unit_index = UNIT_TABLE.index('um')
-        
         # Use units to generate conversion factor
-        conversion_factor = CONVERSION_FACTORS[unit_index + 1]   
-
-        # Create empty list for geometries and index
-        geometries: TGeometryList = []
+        conversion_factor = _csv_conversion_factor(units)
 
         if header:
             # Skip first line (it should be a header line)
             next(imported_csv)
 
-        # Loop through all entries
-        for index,row in enumerate(imported_csv):
-
-            # Get geometry name
-            name = row[1].upper()
-
-            # Format arguments
-            if name == 'POINT' and (allowedtypes == [] or name in allowedtypes):
-                # Create point entry: ('POINT:#': [(X,Y,Z)])
-                point = (
-                    f'POINT:{index}',
-                        [
-                            tuple([point*conversion_factor for point in map(
-                                float, re.findall(r'\d+.\d+', row[2]))]),
-                        ]
-                )
-
-                # Add point to geometries
-                geometries.append(point)
-
-            elif name == 'LINE':
-                # Create line entry: ('LINE:#': [START (X,Y,Z), END (X,Y,Z)])
-                line = (
-                        f'LINE:{index}',
-                            [
-                            tuple([point*conversion_factor for point in map(
-                                float, re.findall(r'\d+.\d+', row[2]))]),
-                            tuple([point*conversion_factor for point in map(
-                                float, re.findall(r'\d+.\d+', row[3]))])
-                            ]
-                )
-
-                # If line is an allowed type or allowedtypes was not set
-                if name in allowedtypes or not allowedtypes:
-
-                    # Add line to geometries
-                    geometries.append(line)
-
-                 # If convert flag is set and point is a valid type to be converted to
-                elif convert and 'POINT' in allowedtypes:
-
-                    # Convert ellipse geometry to a TGeometryList
-                    given_geometry_list: TGeometryList = []
-                    given_geometry_list.append(line)
-
-                    # Down-convert line geometry to point
-                    line_converted = geometry_to_line.convert_to('LINE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
-
-                    # Add converted geometry to geometries
-                    for geometry in line_converted:
-                        geometries.append(geometry)
-
-            elif name == 'ARC':
-                
-                # Create arc entry: ('ARC:#': [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)])
-                arc = (
-                        f'ARC:{index}',
-                            [
-                                tuple([point*conversion_factor for point in map(
-                                    float, re.findall(r'\d+.\d+', row[2]))]),
-                                tuple([
-                                    conversion_factor*float(re.findall(r'\d+.\d+', row[3])[0]),
-                                    (float(row[4])),
-                                    (float(row[5])),
-                                ])
-                            ]
-                )
-
-                # If arc is an allowed type or allowedtypes was not set
-                if name in allowedtypes or not allowedtypes:
-
-                    # Add line to geometries
-                    geometries.append(arc)
-
-                 # If convert flag is set and point is a valid type to be converted to
-                elif convert and get_hifi_geometry(name,allowedtypes):
-
-                    # Convert arc geometry to a TGeometryList
-                    given_geometry_list: TGeometryList = []
-                    given_geometry_list.append(arc)
-
-                    # Down-convert arc geometry
-                    arc_converted = geometry_to_line.convert_to('ARC',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
-
-                    # Add converted geometry to geometries
-                    for geometry in arc_converted:
-                        geometries.append(geometry)
-
-            elif name == 'ELLIPSE':
-                # Create ellipse entry: ('ELLIPSE:#': [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
-                ellipse = (
-                    f'{name}:{index}',
-                            [
-                                tuple([point*conversion_factor for point in map(
-                                    float, re.findall(r'\d+.\d+', row[2]))]),
-                                tuple([(float(row[3])*conversion_factor), 0.0, 0.0]),
-                                tuple([float(row[4])]),
-                            ]
-                )
-
-                # If ellipse is an allowed type or allowedtypes was not set
-                if name in allowedtypes or not allowedtypes:
-
-                    # Add ellipse to geometries
-                    geometries.append(ellipse) 
-
-                # If convert flag is set and there exists a geometry for ellipse to be converted to
-                elif convert and get_hifi_geometry(name,allowedtypes):
-
-                    # Convert ellipse geometry to a TGeometryList
-                    given_geometry_list: TGeometryList = []
-                    given_geometry_list.append(ellipse)
-
-                    # Down-convert ellipse geometry to next highest fidelity geometry
-                    ellipse_converted = geometry_to_line.convert_to('ELLIPSE',get_hifi_geometry(name,allowedtypes),given_geometry_list,num_segments,segment_length,segment_units)
-
-                    # Add converted geometry to geometries
-                    for geometry in ellipse_converted:
-                        geometries.append(geometry)
-        
-            else:
-                # Throw a warning when entity is not accounted for
-                warning(f'UNKNOWN GEOMETRY: {name}') 
-            #end if
-        #end for
+        # Read all rows split into columns
+        with _gc_paused():
+            columns: List[Tuple[str, ...]] = list(zip_longest(*imported_csv, fillvalue=''))
+    #end with
+
+    # Columnar batch straight from the parsed cells
+    if as_batch and not allowedtypes:
+        return _parse_csv_columns(columns, 0, conversion_factor, as_batch=True)
+    geometries = _parse_csv_columns(columns, 0, conversion_factor)
+
+    # Keep allowed geometries and down-convert the rest by type
+    geometries = _filter_geometries(geometries,allowedtypes,convert,num_segments,segment_length,segment_units,preserve_order,max_deviation,workers)
+
+    # Return columnar batch if requested
+    if as_batch:
+        return GeometryBatch.from_list(geometries)
 
     return geometries
 # end def
 
-def export_csv_file(
+def iter_csv_geometries(
     filename: str,
-    scans: TGeometryList,
-    exportunits: Optional[str] = 'um',
-    header: Optional[bool] = True) -> bool:
+    units: Optional[str] = 'um',
+    header: Optional[bool] = True,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    as_batch: bool = False) -> Iterator[TGeometryList]:
     '''
     Summary:
-        Creates/Overrides a CSV file with a list of geometries passed
+        Read the geometries of a CSV file in chunks of rows, memory use is bounded by chunk_rows
     Args:
         filename (str): CSV filename with path
-        scans (TGeometryList): List of geometries to write to CSV file
-        exportunits (str, optional): Units to export CSV in, defaults 'um'=Microns.
-        header (bool, optional): Flag to add header line
-        List of Exportable Geometries:
-            List of supported geometries and the format
-            POINT: ('POINT:#', [(X,Y,Z)])
-            LINE: ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
-            ARC: ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)]) NOTE Includes circles
-            ELLIPSE: ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+        units (str, optional): Units to import CSV in, defaults to 'um'=Microns.
+        header (bool, optional): Flag to remove header line
+        chunk_rows (int, optional): Number of rows read and parsed together. Defaults to CSV_CHUNK_ROWS.
+        as_batch (bool, optional): Yield columnar GeometryBatches instead of TGeometryLists. Defaults to False.
     Raises:
-        Warning: Unknown/Unsupported Geometry is passed
+        Exception: Passed file name is not found
+        Exception: A row holds a cell that can not be read, its row # is the ID # its geometry would get
+        Warning: Passed units are not valid
     Returns:
-        bool: Returns true upon successful completion
+        Iterator[TGeometryList]: Geometries of every chunk in the same format as import_csv_file, the ID # is the index of the row in the file
     '''
-    
-    # Set conversion factor
-    if exportunits in UNIT_TABLE:
-        # Set units to passed units
-        conversion_factor = CONVERSION_FACTORS[UNIT_TABLE.index(exportunits)+1]
-    else:
-        conversion_factor = 1
-        raise Exception('Invalid Units {}', exportunits) from None
-    
-    # NOTE will override existing files with the same name
-    # Create a csv file if not already created
-    with open(filename, 'w', newline='') as file:
-        output_table: csv = csv.writer(file, delimiter=',')
+
+    # Use units to generate conversion factor
+    conversion_factor = _csv_conversion_factor(units)
+
+    with open(filename, newline='') as file:
+
+        # Read file as csv
+        imported_csv: csv = csv.reader(file, delimiter=',')
 
         if header:
-            # Create header
-            output_table.writerow(['name', 'scantype', 'arg1', 'arg2', 'arg3', 'arg4'])
+            # Skip first line (it should be a header line)
+            next(imported_csv, None)
 
-        # Cycle through every geometry from the scans list
-        for entry in scans:
+        first_row = 0
+        while True:
+
+            # Read the next rows split into columns
+            with _gc_paused():
+                columns: List[Tuple[str, ...]] = list(zip_longest(*islice(imported_csv, chunk_rows), fillvalue=''))
+            if not columns:
+                break
+
+            yield _parse_csv_columns(columns, first_row, conversion_factor, as_batch)
+            first_row += len(columns[0])
+        #end while
+    #end with
+#end def
+
+def _csv_row(entry: TGeometryItem, conversion_factor: float) -> List:
+    '''
+    Summary:
+        Format a geometry as a CSV row
+    Args:
+        entry (TGeometryItem): Geometry to format
+        conversion_factor (float): Factor from the export units to microns
+    Raises:
+        Warning: Unknown/Unsupported Geometry is passed
+    Returns:
+        List: Row of name, scantype and 4 arguments, unsupported geometries only have a name and scantype
+    '''
 
-                # Create an empty row
-                row = ['', '', '', '', '', '']
+    # Create an empty row
+    row = ['', '', '', '', '', '']
 
-                # Add name and scantype
-                row[0] = entry[0]
-                scantype: str = (''.join([i for i in entry[0].lower() if i.isalpha()]))
-                row[1] = scantype
+    # Add name and scantype
+    row[0] = entry[0]
+    scantype: str = (''.join([i for i in entry[0].lower() if i.isalpha()]))
+    row[1] = scantype
 
-                # Get list of args
-                args = entry[1]
+    # Get list of args
+    args = entry[1]
 
-                # Format according to geometry
-                if scantype == 'point':
+    # Format according to geometry
+    if scantype == 'point':
 
-                    # Add x,y,z coordinate
-                    row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
+        # Add x,y,z coordinate
+        row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
 
-                elif scantype == 'line':
+    elif scantype == 'line':
 
-                    # Add start point
-                    row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
+        # Add start point
+        row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
 
-                    # Add end point
-                    row[3] = str(tuple(arg/conversion_factor for arg in args[1]))[1:-1]
+        # Add end point
+        row[3] = str(tuple(arg/conversion_factor for arg in args[1]))[1:-1]
 
-                elif scantype == 'arc':
+    elif scantype == 'arc':
 
-                    # Add center point
-                    row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
+        # Add center point
+        row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
 
-                    # Add radius
-                    row[3] = str(args[1][0]/conversion_factor)
+        # Add radius
+        row[3] = str(args[1][0]/conversion_factor)
 
-                    # Add start angle
-                    row[4] = args[1][1]
+        # Add start angle
+        row[4] = args[1][1]
 
-                    # Add end angle
-                    row[5] = args[1][2]
+        # Add end angle
+        row[5] = args[1][2]
 
-                elif scantype == 'ellipse':
+    elif scantype == 'ellipse':
 
-                    # Add center point
-                    row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
+        # Add center point
+        row[2] = str(tuple(arg/conversion_factor for arg in args[0]))[1:-1]
 
-                    # Add length of major axis
-                    row[3] = str(args[1][0]/conversion_factor)
+        # Add length of major axis
+        row[3] = str(args[1][0]/conversion_factor)
 
-                    # Add ratio of minor to major
-                    row[4] = str(args[2])[1:-2]
+        # Add ratio of minor to major
+        row[4] = str(args[2])[1:-2]
 
-                else:
-                    # Throw a warning when entity is not accounted for
-                    warning('Unsupported geometry')
-                # end if
+    elif scantype == 'spline':
 
-                # Add row to the table
-                output_table.writerow(row)
+        # Add control points one after another
+        num_control_points: int = args[0][2]
+        row[2] = ', '.join(str(arg/conversion_factor) for point in args[1:num_control_points+1] for arg in tuple(point) + (0.0,)*(3 - len(point)))
 
-            # end for
+        # Add knots
+        row[3] = ', '.join(map(str, args[num_control_points+1]))
+
+        # Add weights, empty for non-rational splines
+        row[4] = ', '.join(map(str, args[num_control_points+2]))
+
+        # Add degree and closed flag
+        row[5] = f'{args[0][0]}, {int(args[0][1])}'
+
+    elif scantype == 'lwpolyline':
+
+        # Add vertices one after another, widths are not scaled like DXF exports and the bulge has no units
+        row[2] = ', '.join(str(arg) for vertex in args[:-1] for arg in tuple(value/conversion_factor for value in vertex[:2]) + tuple(vertex[2:5]))
+
+        # Add closed flag
+        row[3] = str(float(args[-1]))
+
+    else:
+        # Throw a warning when entity is not accounted for
+        warning('Unsupported geometry')
+    # end if
+
+    return row
+#end def
+
+class CSVWriter:
+    '''
+    Summary:
+        Write geometries to a CSV file as they are passed, rows are buffered and written batch_rows at a time
+        NOTE Use as a context manager or call close, rows still buffered are written on close
+    '''
+
+    def __init__(
+        self,
+        filename: str,
+        exportunits: Optional[str] = 'um',
+        header: Optional[bool] = True,
+        batch_rows: int = CSV_CHUNK_ROWS):
+        '''
+        Summary:
+            Create/Override a CSV file and write its header
+        Args:
+            filename (str): CSV filename with path
+            exportunits (str, optional): Units to export CSV in, defaults 'um'=Microns.
+            header (bool, optional): Flag to add header line
+            batch_rows (int, optional): Number of rows written together with csv.writer.writerows. Defaults to CSV_CHUNK_ROWS.
+        Raises:
+            Exception: Invalid units are passed
+        '''
+
+        # Set conversion factor
+        if exportunits in UNIT_TABLE:
+            # Set units to passed units
+            self.conversion_factor: float = CONVERSION_FACTORS[UNIT_TABLE.index(exportunits)+1]
+        else:
+            raise Exception('Invalid Units {}', exportunits) from None
+
+        self.batch_rows: int = batch_rows
+        self.num_rows: int = 0
+        self._rows: List[List] = []
+
+        # NOTE will override existing files with the same name
+        # Create a csv file if not already created
+        self._file = open(filename, 'w', newline='')
+        self._table: csv = csv.writer(self._file, delimiter=',')
+
+        if header:
+            # Create header
+            self._table.writerow(['name', 'scantype', 'arg1', 'arg2', 'arg3', 'arg4'])
+    #end def
+
+    def write(self, scans: Iterable[TGeometryItem]):
+        '''
+        Summary:
+            Add geometries to the file
+        Args:
+            scans (TGeometryList or GeometryBatch): Geometries to write, may be a generator
+        Raises:
+            Exception: The writer is closed
+            Warning: Unknown/Unsupported Geometry is passed
+        '''
+
+        if self._file.closed:
+            raise Exception('CSV writer is closed')
+
+        # Cycle through every geometry, batches are iterated lazily
+        for entry in scans:
+            self._rows.append(_csv_row(entry, self.conversion_factor))
+            if len(self._rows) >= self.batch_rows:
+                self.flush()
+        #end for
+    #end def
+
+    def flush(self):
+        '''
+        Summary:
+            Write all buffered rows to the file
+        '''
+
+        self._table.writerows(self._rows)
+        self.num_rows += len(self._rows)
+        self._rows = []
+    #end def
+
+    def close(self):
+        '''
+        Summary:
+            Write all buffered rows and close the file, closing again does nothing
+        '''
+
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+    #end def
+
+    def __enter__(self) -> 'CSVWriter':
+        return self
+    #end def
+
+    def __exit__(self, *exception):
+        self.close()
+    #end def
+#end class
+
+def export_csv_file(
+    filename: str,
+    scans: TGeometryList,
+    exportunits: Optional[str] = 'um',
+    header: Optional[bool] = True) -> bool:
+    '''
+    Summary:
+        Creates/Overrides a CSV file with a list of geometries passed
+        NOTE Geometries are written as they are read through a CSVWriter, so generators are never materialized
+        NOTE Columns of every scantype are listed at CSV_COLUMNS, splines and polylines are written as lists of numbers in one cell
+    Args:
+        filename (str): CSV filename with path
+        scans (TGeometryList or GeometryBatch): List of geometries to write to CSV file, may be a generator
+        exportunits (str, optional): Units to export CSV in, defaults 'um'=Microns.
+        header (bool, optional): Flag to add header line
+        List of Exportable Geometries:
+            List of supported geometries and the format
+            POINT: ('POINT:#', [(X,Y,Z)])
+            LINE: ('LINE:#', [START (X,Y,Z), END (X,Y,Z)])
+            ARC: ('ARC:#', [CENTER (X,Y,Z), RADIUS/START ANGLE/END ANGLE(#,#,#)]) NOTE Includes circles
+            ELLIPSE: ('ELLIPSE:#', [CENTER (X,Y,Z), MAJOR AXIS ENDPOINT(X,Y,Z), RATIO OF MINOR TO MAJOR AXIS (#)])
+            SPLINE: ('SPLINE:#', [DEGREE, CLOSED, # CONTROL POINT(S) (#,BOOLEAN,#)], CONTROL POINT(S) [(X,Y,Z)], KNOT(S) [#,...], WEIGHT(S) [#,...])
+            LWPOLYLINE: ('LWPOLYLINE:#', POINT VALUES [X,Y,Z,START WIDTH,END WIDTH,BULGE], CLOSED/OPEN [BOOLEAN])
+    Raises:
+        Exception: Invalid units are passed
+        Warning: Unknown/Unsupported Geometry is passed
+    Returns:
+        bool: Returns true upon successful completion
+    '''
+
+    with CSVWriter(filename, exportunits, header) as writer:
+        writer.write(scans)
 
     # Return true upon successful
     return True
@@ -1007,7 +1973,14 @@ def import_file(
     convert: Optional[bool] = False,
     num_segments: float = 0, 
     segment_length: float = 0, 
-    segment_units: str = 'um') -> TGeometryList:
+    segment_units: str = 'um',
+    as_batch: bool = False,
+    engine: str = 'ezdxf',
+    preserve_order: bool = True,
+    cache: Optional[Union[str, ImportCache]] = None,
+    max_deviation: float = 0,
+    workers: int = 0,
+    simplify_tolerance: Optional[float] = None) -> TGeometryList:
     '''
     Summary:
         Wrapper function for importing all filetypes
@@ -1021,30 +1994,325 @@ def import_file(
         num_segments (float, optional): Number of segments to divide given geometry into to produce the return geometry. Defaults to 0.
         segment_length (float, optional): Length of segments to divide given geometry into to produce return geometry. Defaults to 0.
         units (str, optional): Units for segment length. Defaults to 'um'.
+        as_batch (bool, optional): Return a columnar GeometryBatch instead of a TGeometryList. Defaults to False.
+        engine (str, optional): DXF import engine, 'ezdxf' or 'fast'. Defaults to 'ezdxf'.
+        preserve_order (bool, optional): Keep converted geometries in the place of their source geometry. Defaults to True.
+        cache (ImportCache or str, optional): On-disk cache or cache directory to reuse earlier imports of the same file and options. Defaults to None.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves, overrides num_segments and segment_length for curves. Defaults to 0.
+        workers (int, optional): Number of worker processes to split every conversion across, see geometry_to_line.convert_to. Defaults to 0.
+        simplify_tolerance (float, optional): If set, simplify point and line chains after conversion so every left out vertex
+        is within this many microns of the result, see geometry_to_line.simplify. Defaults to None.
     Raises:
         Exception: Unknown filetype
     Returns:
         TGeometryList: List of geometries
     '''
 
+    # Look up file in the cache
+    if cache is not None:
+        if isinstance(cache, str):
+            cache = ImportCache(cache)
+
+        # Every option that changes the imported geometries
+        options: Dict = {
+            'allowedtypes': list(allowedtypes),
+            'units': units,
+            'header': header,
+            'convert': convert,
+            'num_segments': num_segments,
+            'segment_length': segment_length,
+            'segment_units': segment_units,
+            'engine': engine,
+            'preserve_order': preserve_order,
+            'max_deviation': max_deviation,
+            'simplify_tolerance': simplify_tolerance,
+            'version': __version__,
+        }
+
+        batch: Optional[GeometryBatch] = cache.get(filename, options)
+        if batch is None:
+            batch = import_file(filename,allowedtypes,units,header,convert,num_segments,segment_length,segment_units,True,engine,preserve_order,max_deviation=max_deviation,workers=workers,simplify_tolerance=simplify_tolerance)
+            cache.put(filename, options, batch)
+        #end if
+        return batch if as_batch else batch.to_list()
+    #end if
+
+    # Simplify after importing and converting
+    if simplify_tolerance is not None:
+        return geometry_to_line.simplify(import_file(filename,allowedtypes,units,header,convert,num_segments,segment_length,segment_units,as_batch,engine,preserve_order,max_deviation=max_deviation,workers=workers),simplify_tolerance)
+
     # Get file extension
-    file_type: str = filename.split('.')[1].upper()
+    file_type: str = filename.rsplit('.', 1)[-1].upper()
 
     # Run appropriate function
     # DXF file
     if (file_type == "DXF"):
-        return import_dxf_file(filename,allowedtypes,convert,num_segments,segment_length,segment_units)
+        return import_dxf_file(filename,allowedtypes,convert,num_segments,segment_length,segment_units,as_batch,engine,preserve_order,max_deviation,workers)
 
     # CSV file
     elif (file_type == "CSV"):
-        return import_csv_file(filename,allowedtypes,units,header,convert,num_segments,segment_length,segment_units)
+        return import_csv_file(filename,allowedtypes,units,header,convert,num_segments,segment_length,segment_units,as_batch,preserve_order,max_deviation,workers)
 
     # TXT file
     elif (file_type == "TXT"):
-        return import_txt_file(filename,units)
+        return import_txt_file(filename,units,as_batch)
 
     else:
         # Unknown filetype
         raise Exception('Filetype Unknown')
         # end if
-#end def
\ No newline at end of file
+#end def
+
+def _import_file_worker(
+    filename: str,
+    options: Dict) -> Tuple[str, Optional[GeometryBatch], Optional[Exception]]:
+    '''
+    Summary:
+        Import a single file inside a worker process, capturing any error
+    Args:
+        filename (str): Filename with path
+        options (Dict): Keyword arguments for import_file
+    Returns:
+        Tuple[str, Optional[GeometryBatch], Optional[Exception]]: Filename, geometries as a GeometryBatch or None, error or None
+    '''
+
+    try:
+        # Return geometries as a batch so they are pickled as a few arrays
+        return (filename, import_file(filename, as_batch=True, **options), None)
+    except Exception as error:
+        return (filename, None, error)
+#end def
+
+def import_files(
+    filenames: Iterable[str],
+    allowedtypes: List[str] = [],
+    units: Optional[str] = 'um',
+    header: Optional[bool] = True,
+    convert: Optional[bool] = False,
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    segment_units: str = 'um',
+    as_batch: bool = False,
+    engine: str = 'ezdxf',
+    preserve_order: bool = True,
+    cache: Optional[Union[str, ImportCache]] = None,
+    max_deviation: float = 0,
+    workers: int = 0,
+    ordered: bool = True,
+    simplify_tolerance: Optional[float] = None) -> Iterator[Tuple[str, Optional[TGeometryList], Optional[Exception]]]:
+    '''
+    Summary:
+        Import many files of any filetype, spread across a pool of worker processes
+    Args:
+        filenames (Iterable[str]): Filenames with path
+        allowedtypes ... max_deviation: Same as import_file, applied to every file
+        workers (int, optional): Number of worker processes, 0 or 1 imports the files one after another in this process. Defaults to 0.
+        ordered (bool, optional): Yield results in the order of filenames, otherwise as each file completes. Defaults to True.
+        simplify_tolerance (float, optional): Same as import_file, every file is simplified inside its worker. Defaults to None.
+    Returns:
+        Iterator[Tuple[str, Optional[TGeometryList], Optional[Exception]]]: Filename, geometries (None on error) and
+        the error raised while importing the file (None on success) for every file
+        NOTE Geometries are sent back from the workers as GeometryBatch arrays and only converted to a TGeometryList here if as_batch is not set
+    '''
+
+    # Options passed to import_file for every file
+    options: Dict = {
+        'allowedtypes': allowedtypes,
+        'units': units,
+        'header': header,
+        'convert': convert,
+        'num_segments': num_segments,
+        'segment_length': segment_length,
+        'segment_units': segment_units,
+        'engine': engine,
+        'preserve_order': preserve_order,
+        'cache': cache,
+        'max_deviation': max_deviation,
+        'simplify_tolerance': simplify_tolerance,
+    }
+
+    # Results of all files as they become available
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_import_file_worker, filename, options) for filename in filenames]
+        results = (future.result() for future in (futures if ordered else as_completed(futures)))
+    else:
+        executor = None
+        results = (_import_file_worker(filename, options) for filename in filenames)
+    #end if
+
+    try:
+        for filename, batch, error in results:
+
+            # Convert back to a TGeometryList if no batch was requested
+            if batch is not None and not as_batch:
+                yield (filename, batch.to_list(), error)
+            else:
+                yield (filename, batch, error)
+        #end for
+    finally:
+        # Stop workers, also if the caller stops early
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    #end try
+#end def
+
+def iter_filter_geometries(
+    geometries: Iterable[TGeometryItem],
+    allowedtypes: List[str] = [],
+    convert: Optional[bool] = False,
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    segment_units: str = 'um',
+    max_deviation: float = 0,
+    chunk_size: int = geometry_to_line.STREAM_CHUNK_SIZE) -> Iterator[TGeometryItem]:
+    '''
+    Summary:
+        Lazily filter any iterable of geometries by allowedtypes, down-converting non-allowed geometries when convert is set
+        NOTE Geometries are filtered chunk_size at a time, so only one chunk and its converted geometries are held at once
+    Args:
+        geometries (Iterable[TGeometryItem]): Geometries to filter, may be a generator
+        allowedtypes ... max_deviation: Same as import_file
+        chunk_size (int, optional): Number of geometries filtered and converted together. Defaults to geometry_to_line.STREAM_CHUNK_SIZE.
+    Returns:
+        Iterator[TGeometryItem]: Allowed and down-converted geometries in the order of their source geometries
+    '''
+
+    geometry_iterator = iter(geometries)
+
+    # Number of geometries converted from each type so far
+    id_offsets: Dict[str, int] = {}
+
+    # Filter one chunk at a time, converted geometries are numbered over the whole stream
+    while True:
+        chunk: TGeometryList = list(islice(geometry_iterator, max(chunk_size, 1)))
+        if not chunk:
+            break
+        yield from _filter_geometries(chunk,allowedtypes,convert,num_segments,segment_length,segment_units,max_deviation=max_deviation,id_offsets=id_offsets)
+    #end while
+#end def
+
+def iter_file_geometries(
+    filename: str,
+    units: Optional[str] = 'um',
+    header: Optional[bool] = True) -> Iterator[TGeometryItem]:
+    '''
+    Summary:
+        Yield the unfiltered geometries of a file of any filetype
+        NOTE Files of every filetype are streamed as they are read
+    Args:
+        filename (str): Filename with path
+        units (str, optional): Units to import CSV and TXT in, defaults to 'um'=Microns.
+        header (bool, optional): Flag to remove header line
+    Raises:
+        Exception: Unknown filetype
+    Returns:
+        Iterator[TGeometryItem]: Geometries in the same format as import_file
+    '''
+
+    # Get file extension
+    file_type: str = filename.rsplit('.', 1)[-1].upper()
+
+    # Stream DXF entities
+    if file_type == 'DXF':
+        yield from iter_dxf_geometries(filename)
+    # Stream TXT points a block at a time
+    elif file_type == 'TXT':
+        for block in iter_txt_points(filename, units):
+            yield from block.to_list()
+        #end for
+    # Stream CSV rows a chunk at a time
+    elif file_type == 'CSV':
+        for chunk in iter_csv_geometries(filename, units, header):
+            yield from chunk
+        #end for
+    else:
+        yield from import_file(filename, units=units, header=header)
+#end def
+
+def geometry_pipeline(
+    source: Union[str, Iterable[TGeometryItem]],
+    allowedtypes: List[str] = [],
+    convert: Optional[bool] = False,
+    num_segments: float = 0, 
+    segment_length: float = 0, 
+    segment_units: str = 'um',
+    max_deviation: float = 0,
+    stages: Iterable[Callable[[Iterator[TGeometryItem]], Iterable[TGeometryItem]]] = (),
+    export_filename: Optional[str] = None,
+    exportunits: Optional[str] = 'um',
+    window_size: int = 0,
+    units: Optional[str] = 'um',
+    header: Optional[bool] = True) -> Union[Iterator[TGeometryItem], Iterator[TGeometryList], bool]:
+    '''
+    Summary:
+        Lazily chain import -> filter/convert -> custom stages -> export, no geometries are materialized unless exported to DXF
+    Args:
+        source (str or Iterable[TGeometryItem]): Filename to stream with iter_file_geometries, or geometries such as another pipeline
+        allowedtypes ... max_deviation: Same as import_file, geometries pass unfiltered if allowedtypes is empty
+        stages (Iterable[Callable], optional): Functions that take and return iterables of geometries, applied in order after filtering. Defaults to ().
+        export_filename (str, optional): Write the resulting geometries to this DXF/CSV/TXT file instead of returning them. Defaults to None.
+        exportunits (str, optional): Units to export in. Defaults to 'um'.
+        window_size (int, optional): Yield lists of up to window_size geometries instead of single geometries. Defaults to 0.
+        units (str, optional): Units to import CSV and TXT in, defaults to 'um'=Microns.
+        header (bool, optional): Flag to remove header line of CSV files
+    Raises:
+        Exception: Unknown filetype
+    Returns:
+        Iterator[TGeometryItem]: Resulting geometries, TGeometryList windows if window_size is set, or True once exported
+    '''
+
+    # Read source lazily
+    geometries: Iterable[TGeometryItem] = iter_file_geometries(source, units, header) if isinstance(source, str) else source
+
+    # Filter and convert
+    if allowedtypes:
+        geometries = iter_filter_geometries(geometries,allowedtypes,convert,num_segments,segment_length,segment_units,max_deviation)
+
+    # Apply custom stages
+    for stage in stages:
+        geometries = stage(geometries)
+
+    # Write to file
+    if export_filename is not None:
+        file_type: str = export_filename.rsplit('.', 1)[-1].upper()
+        if file_type == 'DXF':
+            # The DXF drawing is built in memory anyway
+            return export_dxf_file(export_filename, list(geometries), exportunits)
+        elif file_type == 'CSV':
+            return export_csv_file(export_filename, geometries, exportunits)
+        elif file_type == 'TXT':
+            return export_txt_file(export_filename, geometries, exportunits)
+        else:
+            # Unknown filetype
+            raise Exception('Filetype Unknown')
+        #end if
+    #end if
+
+    # Group into bounded windows
+    if window_size:
+        return _iter_windows(geometries, window_size)
+    return iter(geometries)
+#end def
+
+def _iter_windows(
+    geometries: Iterable[TGeometryItem],
+    window_size: int) -> Iterator[TGeometryList]:
+    '''
+    Summary:
+        Group geometries into lists of up to window_size geometries
+    Args:
+        geometries (Iterable[TGeometryItem]): Geometries to group
+        window_size (int): Largest number of geometries per list
+    Returns:
+        Iterator[TGeometryList]: Lists of consecutive geometries
+    '''
+
+    geometry_iterator = iter(geometries)
+    while True:
+        window: TGeometryList = list(islice(geometry_iterator, window_size))
+        if not window:
+            break
+        yield window
+    #end while
+#end def
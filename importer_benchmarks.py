@@ -0,0 +1,463 @@
+'''
+Benchmarks for importing and converting geometries
+
+Run with: python importer_benchmarks.py
+'''
+
+import os
+import tempfile
+import timeit
+import tracemalloc
+import numpy as np
+from typing import Callable, List
+import importer
+import geometry_to_line
+import scan_order
+import spatial_index
+import tiling
+from import_cache import ImportCache
+from geometry_batch import GeometryBatch
+
+import ezdxf
+from ezdxf.document import Drawing
+from ezdxf.layouts.layout import Modelspace
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+# Number of times every benchmark is run, the best time is reported
+REPEAT = 3
+
+def best_time(function: Callable[[], object]) -> float:
+    '''
+    Summary:
+        Time a function
+    Args:
+        function (Callable[[], object]): Function to time
+    Returns:
+        float: Best time out of REPEAT runs in seconds
+    '''
+
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+#end def
+
+def create_scaled_dxf(
+    filename: str,
+    sources: List[str],
+    copies: int) -> int:
+    '''
+    Summary:
+        Create a DXF file holding copies of all entities from the source files, each copy offset along X
+    Args:
+        filename (str): DXF filename to create
+        sources (List[str]): DXF files to copy entities from
+        copies (int): Number of copies of the source entities
+    Returns:
+        int: Number of entities written
+    '''
+
+    # Create DXF file in millimeters like the test files
+    dxf_drawing: Drawing = ezdxf.new('R2010')
+    dxf_drawing.units = 4
+    model_space: Modelspace = dxf_drawing.modelspace()
+
+    # Entities of all source files
+    entities = [entity for source in sources for entity in ezdxf.readfile(source).modelspace()]
+
+    # Add offset copies
+    for copy_index in range(copies):
+        for entity in entities:
+            copied_entity = entity.copy()
+            copied_entity.translate(copy_index*300.0, 0.0, 0.0)
+            model_space.add_entity(copied_entity)
+    #end for
+
+    dxf_drawing.saveas(filename)
+    return copies*len(entities)
+#end def
+
+def benchmark_dxf_engines(copies: int = 2000):
+    '''
+    Summary:
+        Compare the 'ezdxf' and 'fast' DXF import engines on the Test Files/Complex*.dxf fixtures scaled up
+        NOTE Complex Ellipses.dxf is left out, ELLIPSE entities make the fast engine fall back to ezdxf
+    Args:
+        copies (int, optional): Number of copies of the fixtures. Defaults to 2000.
+    '''
+
+    sources = [f'Test Files/Complex {name}.dxf' for name in ('Points', 'Lines', 'Arcs', 'Circles')]
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Create scaled up file
+        filename = os.path.join(directory, 'scaled.dxf')
+        num_entities = create_scaled_dxf(filename, sources, copies)
+
+        # Make sure both engines agree
+        assert importer.import_dxf_file(filename, engine='fast') == importer.import_dxf_file(filename)
+
+        # Time engines
+        ezdxf_time = best_time(lambda: importer.import_dxf_file(filename))
+        fast_time = best_time(lambda: importer.import_dxf_file(filename, engine='fast'))
+    #end with
+
+    print(f'DXF import of {num_entities} entities')
+    print(f'    ezdxf engine: {ezdxf_time:.3f}s')
+    print(f'    fast engine:  {fast_time:.3f}s ({ezdxf_time/fast_time:.1f}x)')
+#end def
+
+def benchmark_import_cache(copies: int = 2000):
+    '''
+    Summary:
+        Compare a cold import against a warm ImportCache hit on the scaled up Test Files/Complex*.dxf fixtures
+    Args:
+        copies (int, optional): Number of copies of the fixtures. Defaults to 2000.
+    '''
+
+    sources = [f'Test Files/Complex {name}.dxf' for name in ('Points', 'Lines', 'Arcs', 'Circles', 'Ellipses')]
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Create scaled up file
+        filename = os.path.join(directory, 'scaled.dxf')
+        num_entities = create_scaled_dxf(filename, sources, copies)
+
+        # Fill cache
+        cache = ImportCache(os.path.join(directory, 'cache'))
+        assert importer.import_file(filename, cache=cache) == importer.import_file(filename)
+
+        # Time import and cache hit
+        cold_time = best_time(lambda: importer.import_file(filename, as_batch=True))
+        warm_time = best_time(lambda: importer.import_file(filename, as_batch=True, cache=cache))
+    #end with
+
+    print(f'Cached DXF import of {num_entities} entities')
+    print(f'    cold import: {cold_time:.3f}s')
+    print(f'    cache hit:   {warm_time:.3f}s ({cold_time/warm_time:.1f}x)')
+#end def
+
+def benchmark_fused_kernels(count: int = 20000):
+    '''
+    Summary:
+        Compare converting arcs to points and ellipses to lines through the intermediate geometry types against the fused kernels
+    Args:
+        count (int, optional): Number of arcs, a tenth as many ellipses are converted. Defaults to 20000.
+    '''
+
+    arcs = [(f'ARC:{index}', [(index*10.0, 0.0, 0.0), (500.0, 0.0, 270.0)]) for index in range(count)]
+    ellipses = [(f'ELLIPSE:{index}', [(index*10.0, 0.0, 0.0), (5000.0, 0.0, 0.0), (0.5,)]) for index in range(count//10)]
+
+    # Time both ways
+    staged_arc_time = best_time(lambda: geometry_to_line.lines_to_points(geometry_to_line.arc_to_lines(arcs)))
+    fused_arc_time = best_time(lambda: geometry_to_line.arc_to_points(arcs))
+    staged_ellipse_time = best_time(lambda: geometry_to_line.arc_to_lines(geometry_to_line.ellipse_to_arcs(ellipses, geometry_to_line.NUM_SEGMENTS)))
+    fused_ellipse_time = best_time(lambda: geometry_to_line.ellipse_to_lines(ellipses))
+
+    print(f'ARC to POINT of {len(arcs)} arcs')
+    print(f'    staged: {staged_arc_time:.3f}s')
+    print(f'    fused:  {fused_arc_time:.3f}s ({staged_arc_time/fused_arc_time:.1f}x)')
+    print(f'ELLIPSE to LINE of {len(ellipses)} ellipses')
+    print(f'    staged: {staged_ellipse_time:.3f}s')
+    print(f'    fused:  {fused_ellipse_time:.3f}s ({staged_ellipse_time/fused_ellipse_time:.1f}x)')
+#end def
+
+def benchmark_conversion_cache(count: int = 2000):
+    '''
+    Summary:
+        Compare converting copies of one spline and one ellipse at different offsets with and without a ConversionCache
+    Args:
+        count (int, optional): Number of copies of each shape. Defaults to 2000.
+    '''
+
+    # Copies of the Basic Spline fixture along X
+    name, values = importer.import_dxf_file('Test Files/Basic Spline.dxf')[0]
+    num_control_points = values[0][2]
+    splines = [
+        (f'SPLINE:{index}', [values[0]] + [(point[0] + index*1000.0,) + tuple(point[1:]) for point in values[1:num_control_points+1]] + values[num_control_points+1:])
+        for index in range(count)
+    ]
+    ellipses = [(f'ELLIPSE:{index}', [(index*10.0, 0.0, 0.0), (5000.0, 0.0, 0.0), (0.5,)]) for index in range(count)]
+
+    for given_type, return_type, given in (('SPLINE', 'LINE', splines), ('ELLIPSE', 'ARC', ellipses)):
+        direct_time = best_time(lambda: geometry_to_line.convert_to(given_type, return_type, given, max_deviation=1))
+        cache = geometry_to_line.ConversionCache()
+        cached_time = best_time(lambda: geometry_to_line.convert_to(given_type, return_type, given, max_deviation=1, cache=cache))
+
+        print(f'{given_type} to {return_type} of {count} copies')
+        print(f'    direct: {direct_time:.3f}s')
+        print(f'    cached: {cached_time:.3f}s ({direct_time/cached_time:.1f}x)')
+    #end for
+#end def
+
+def benchmark_dedup_points(count: int = 200000):
+    '''
+    Summary:
+        Time merging points of a batch where every point has a near copy, exactly and within a tolerance
+    Args:
+        count (int, optional): Number of distinct points. Defaults to 200000.
+    '''
+
+    # Random points with a near copy each
+    points = np.random.default_rng(0).random((count, 3))*1e5
+    batch = GeometryBatch.from_points(np.concatenate([points, points, points + 1e-3]))
+
+    # Points crowded into a few cubes of the tolerance
+    crowded = GeometryBatch.from_points(np.random.default_rng(0).random((count, 3))*3)
+
+    exact_time = best_time(lambda: geometry_to_line.dedup_points(batch))
+    tolerance_time = best_time(lambda: geometry_to_line.dedup_points(batch, 0.01))
+    crowded_time = best_time(lambda: geometry_to_line.dedup_points(crowded, 1.0))
+
+    print(f'Point dedup of {len(batch.points)} points')
+    print(f'    exact:          {exact_time:.3f}s')
+    print(f'    tolerance 0.01: {tolerance_time:.3f}s')
+    print(f'    crowded {len(crowded.points)}: {crowded_time:.3f}s')
+#end def
+
+def benchmark_simplify(count: int = 1000000):
+    '''
+    Summary:
+        Time simplifying a spiral of connected lines
+    Args:
+        count (int, optional): Number of lines. Defaults to 1000000.
+    '''
+
+    # Spiral of 100 turns growing to 10mm
+    angles = np.linspace(0, 200*np.pi, count + 1)
+    vertices = np.stack([np.cos(angles), np.sin(angles), np.zeros(count + 1)], axis=1)*np.linspace(1e3, 1e4, count + 1)[:, None]
+    batch = GeometryBatch.from_lines(np.stack([vertices[:-1], vertices[1:]], axis=1))
+
+    for tolerance in (0.1, 1.0):
+        simplify_time = best_time(lambda: geometry_to_line.simplify(batch, tolerance))
+        print(f'Simplify {count} lines to {len(geometry_to_line.simplify(batch, tolerance).lines)} within {tolerance}um: {simplify_time:.3f}s')
+    #end for
+#end def
+
+def benchmark_scan_order(count: int = 100000):
+    '''
+    Summary:
+        Travel length of randomly placed lines before and after ordering, with and without improving the nearest neighbour tour
+    Args:
+        count (int, optional): Number of lines. Defaults to 100000.
+    '''
+
+    # Short lines spread over a 100mm field
+    starts = np.random.default_rng(0).random((count, 3))*[1e5, 1e5, 0]
+    lines = GeometryBatch.from_lines(np.stack([starts, starts + [100.0, 0.0, 0.0]], axis=1)).to_list()
+
+    for time_limit in (0, 5.0):
+        report = {}
+        order_time = best_time(lambda: scan_order.order_geometries(lines, time_limit=time_limit, report=report))
+        print(f'Order {count} lines improving for {time_limit}s: {order_time:.3f}s')
+        print(f'    travel: {report["travel_before"]/1e3:.0f}mm -> {report["travel_after"]/1e3:.0f}mm')
+    #end for
+
+    # Lines fanning out from one shared start point crowd a single grid cell
+    angles = np.random.default_rng(0).random(count//5)*2*np.pi
+    fan = GeometryBatch.from_lines(np.stack([np.zeros((len(angles), 3)), np.column_stack([np.cos(angles), np.sin(angles), np.zeros(len(angles))])*1e4], axis=1)).to_list()
+    fan_time = best_time(lambda: scan_order.order_geometries(fan, time_limit=0))
+    print(f'Order {len(fan)} lines sharing a start point: {fan_time:.3f}s')
+#end def
+
+def benchmark_spatial_index(count: int = 1000000, queries: int = 1000):
+    '''
+    Summary:
+        Compare field of view queries on a SpatialIndex against checking the bounds of every geometry
+    Args:
+        count (int, optional): Number of lines. Defaults to 1000000.
+        queries (int, optional): Number of 2mm windows queried. Defaults to 1000.
+    '''
+
+    # Short lines spread over a 1m field
+    rng = np.random.default_rng(0)
+    starts = rng.random((count, 3))*[1e6, 1e6, 0]
+    batch = GeometryBatch.from_lines(np.stack([starts, starts + rng.normal(size=(count, 3))*[50, 50, 0]], axis=1))
+    windows = rng.random((queries, 2))*1e6
+
+    build_time = best_time(lambda: spatial_index.SpatialIndex(batch))
+    index = spatial_index.SpatialIndex(batch)
+    bounds = index.bounds
+    scan_time = best_time(lambda: [np.flatnonzero((bounds[:, 0] <= x + 2e3) & (bounds[:, 2] >= x) & (bounds[:, 1] <= y + 2e3) & (bounds[:, 3] >= y)) for x, y in windows])
+    query_time = best_time(lambda: [index.query(x, y, x + 2e3, y + 2e3) for x, y in windows])
+
+    print(f'Spatial index of {count} lines')
+    print(f'    build:                   {build_time:.3f}s')
+    print(f'    {queries} scans of all bounds: {scan_time:.3f}s')
+    print(f'    {queries} window queries:     {query_time:.3f}s ({scan_time/query_time:.1f}x)')
+#end def
+
+def benchmark_partition(count: int = 200000):
+    '''
+    Summary:
+        Time splitting randomly placed lines and arcs into 5mm tiles
+    Args:
+        count (int, optional): Number of lines and of arcs. Defaults to 200000.
+    '''
+
+    # Lines and arcs spread over a 100mm field
+    rng = np.random.default_rng(0)
+    starts = rng.random((count, 3))*[1e5, 1e5, 0]
+    geometries = GeometryBatch.from_lines(np.stack([starts, starts + rng.normal(size=(count, 3))*[300, 300, 0]], axis=1)).to_list()
+    geometries += [(f'ARC:{index}', [(x, y, 0.0), (200.0, 0.0, 270.0)]) for index, (x, y) in enumerate((rng.random((count, 2))*1e5).tolist())]
+
+    partition_time = best_time(lambda: tiling.partition(geometries, 5000, 5000, overlap=100))
+    tiles = tiling.partition(geometries, 5000, 5000, overlap=100)
+    print(f'Partition of {len(geometries)} lines and arcs into {len(tiles)} tiles: {partition_time:.3f}s')
+    print(f'    {sum(len(tile) for tile in tiles.values())} geometries after cutting')
+#end def
+
+def benchmark_txt_import(count: int = 1000000):
+    '''
+    Summary:
+        Time importing a TXT file of signed 3D points as a list, as a batch and in blocks
+    Args:
+        count (int, optional): Number of points. Defaults to 1000000.
+    '''
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Signed points with 4 decimals
+        filename = os.path.join(directory, 'points.txt')
+        points = np.random.default_rng(0).normal(size=(count, 3))*1e3
+        np.savetxt(filename, points, fmt='%.4f', delimiter=',')
+
+        list_time = best_time(lambda: importer.import_txt_file(filename))
+        batch_time = best_time(lambda: importer.import_txt_file(filename, as_batch=True))
+        block_time = best_time(lambda: sum(len(block.points) for block in importer.iter_txt_points(filename, block_size=1 << 16)))
+
+    print(f'TXT import of {count} points')
+    print(f'    list:      {list_time:.3f}s')
+    print(f'    batch:     {batch_time:.3f}s')
+    print(f'    blocks:    {block_time:.3f}s')
+#end def
+
+def benchmark_txt_export(count: int = 1000000):
+    '''
+    Summary:
+        Time exporting a batch of 3D points to TXT as round-trip floats and with 4 decimals
+    Args:
+        count (int, optional): Number of points. Defaults to 1000000.
+    '''
+
+    batch = GeometryBatch.from_points(np.random.default_rng(0).normal(size=(count, 3))*1e3)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'points.txt')
+        repr_time = best_time(lambda: importer.export_txt_file(filename, batch))
+        fixed_time = best_time(lambda: importer.export_txt_file(filename, batch, float_format='%.4f'))
+
+    print(f'TXT export of {count} points')
+    print(f'    %r:        {repr_time:.3f}s')
+    print(f'    %.4f:      {fixed_time:.3f}s')
+#end def
+
+def benchmark_csv_import(count: int = 250000):
+    '''
+    Summary:
+        Time importing a CSV file with one signed point, line, arc and ellipse row per count as a list and as a batch
+    Args:
+        count (int, optional): Number of rows of every scantype. Defaults to 250000.
+    '''
+
+    # Signed geometries sharing random centers
+    centers = (np.random.default_rng(0).normal(size=(count, 3))*1e3).tolist()
+    geometries = []
+    for index, center in enumerate(map(tuple, centers)):
+        geometries += [
+            (f'POINT:{4*index}', [center]),
+            (f'LINE:{4*index+1}', [center, (1.5, -2.0, 3.0)]),
+            (f'ARC:{4*index+2}', [center, (2.0, -10.0, 350.0)]),
+            (f'ELLIPSE:{4*index+3}', [center, (3.0, 0.0, 0.0), (0.5,)]),
+        ]
+    #end for
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'geometries.csv')
+        importer.export_csv_file(filename, geometries)
+
+        list_time = best_time(lambda: importer.import_csv_file(filename))
+        batch_time = best_time(lambda: importer.import_csv_file(filename, as_batch=True))
+
+    print(f'CSV import of {len(geometries)} rows')
+    print(f'    list:      {list_time:.3f}s')
+    print(f'    batch:     {batch_time:.3f}s')
+#end def
+
+def benchmark_csv_stream(count: int = 1000000):
+    '''
+    Summary:
+        Time copying a CSV file of lines whole and chunk by chunk through a CSVWriter, with the peak memory of each
+    Args:
+        count (int, optional): Number of lines. Defaults to 1000000.
+    '''
+
+    lines = GeometryBatch.from_lines(np.random.default_rng(0).normal(size=(count, 2, 3))*1e3)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'lines.csv')
+        copy_filename = os.path.join(directory, 'copy.csv')
+        importer.export_csv_file(filename, lines)
+
+        def copy_whole():
+            importer.export_csv_file(copy_filename, importer.import_csv_file(filename))
+        #end def
+        def copy_chunks():
+            with importer.CSVWriter(copy_filename) as writer:
+                for chunk in importer.iter_csv_geometries(filename):
+                    writer.write(chunk)
+        #end def
+
+        # Peak memory of one traced run of each
+        results = []
+        for copy in (copy_whole, copy_chunks):
+            copy_time = best_time(copy)
+            tracemalloc.start()
+            copy()
+            results.append((copy_time, tracemalloc.get_traced_memory()[1] >> 20))
+            tracemalloc.stop()
+        #end for
+
+    print(f'CSV copy of {count} lines')
+    print(f'    whole:     {results[0][0]:.3f}s {results[0][1]} MiB')
+    print(f'    chunks:    {results[1][0]:.3f}s {results[1][1]} MiB')
+#end def
+
+def benchmark_spline_round_trip(copies: int = 20000):
+    '''
+    Summary:
+        Time writing and reading copies of a spline and a polyline through CSV and through DXF
+    Args:
+        copies (int, optional): Number of copies of each. Defaults to 20000.
+    '''
+
+    spline = importer.import_dxf_file('Test Files/Basic Spline.dxf')[0][1]
+    polyline = importer.import_dxf_file('Test Files/Basic LWPolyline.dxf')[0][1]
+    geometries = [(f'SPLINE:{2*index}', spline) for index in range(copies)] + [(f'LWPOLYLINE:{2*index+1}', polyline) for index in range(copies)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_filename = os.path.join(directory, 'curves.csv')
+        dxf_filename = os.path.join(directory, 'curves.dxf')
+        csv_time = best_time(lambda: importer.import_csv_file(csv_filename) if importer.export_csv_file(csv_filename, geometries) else None)
+        # NOTE export_dxf_file removes the closed flag from polylines, so every run exports copies
+        dxf_time = best_time(lambda: importer.import_dxf_file(dxf_filename) if importer.export_dxf_file(dxf_filename, [(name, list(values)) for name, values in geometries]) else None)
+
+    print(f'Round trip of {len(geometries)} splines and polylines')
+    print(f'    CSV:       {csv_time:.3f}s')
+    print(f'    DXF:       {dxf_time:.3f}s')
+#end def
+
+if __name__ == "__main__":
+    benchmark_dxf_engines()
+    benchmark_import_cache()
+    benchmark_fused_kernels()
+    benchmark_conversion_cache()
+    benchmark_dedup_points()
+    benchmark_simplify()
+    benchmark_scan_order()
+    benchmark_spatial_index()
+    benchmark_partition()
+    benchmark_txt_import()
+    benchmark_txt_export()
+    benchmark_csv_import()
+    benchmark_csv_stream()
+    benchmark_spline_round_trip()
@@ -1,10 +1,22 @@
 from typing import List, Tuple
 import unittest
 import importer
+import geometry_to_line
+import scan_order
+import spatial_index
+import tiling
 import math
+import numpy as np
+import os
+import shutil
+import tempfile
+from geometry_batch import GeometryBatch
+import import_cache
+from import_cache import ImportCache
+from ezdxf.math import BSpline
 
 __author__ = 'Joseph Lawler'
-__version__ = '1.2.0'
+__version__ = '1.3.0'
 
 PRECISION = 0.001
 
@@ -312,6 +324,109 @@ class TXT_Import_Tests(unittest.TestCase):
         geometries = importer.import_txt_file("Test Files/text_no_points.txt")
         self.assertEqual(len(geometries),0)
     #end def
+    def test_signs_and_junk(self):
+        '''
+        Signed, exponent and integer coordinates with blanks, junk lines are skipped
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'points.txt')
+            with open(filename, 'w') as file:
+                file.write('REF,1.0,2.0\n-1.5,+2.5\r\n1e3, -2.5E-1 ,3\nnot,a,point\n1.0,2.0,3.0,4.0\n.5,-.25')
+            geometries = importer.import_txt_file(filename)
+            self.assertEqual(geometries, [('POINT:0',(-1.5,2.5)),('POINT:1',(1000.0,-0.25,3.0)),('POINT:2',(0.5,-0.25))])
+            self.assertEqual(importer.import_txt_file(filename,'mm')[1][1],(1e6,-250.0,3000.0))
+            self.assertEqual(importer.import_txt_file(filename,as_batch=True).to_list(), geometries)
+        finally:
+            shutil.rmtree(directory)
+    #end def
+    def test_blocks(self):
+        '''
+        Streamed blocks have a fixed size and continue numbering
+        '''
+        blocks = list(importer.iter_txt_points("Test Files/text_given.txt", block_size=32))
+        self.assertEqual([len(block.points) for block in blocks], [32,32,32,14])
+        streamed = [geometry for block in blocks for geometry in block.to_list()]
+        self.assertEqual(streamed, importer.import_txt_file("Test Files/text_given.txt"))
+        self.assertEqual(list(importer.iter_file_geometries("Test Files/text_given.txt")), streamed)
+
+        # Lines split across chunks are parsed whole by both readers
+        chunk_size = importer.TXT_CHUNK_SIZE
+        importer.TXT_CHUNK_SIZE = 16
+        try:
+            self.assertEqual(importer.import_txt_file("Test Files/text_given.txt"), streamed)
+            self.assertEqual([geometry for block in importer.iter_txt_points("Test Files/text_given.txt", block_size=32) for geometry in block.to_list()], streamed)
+        finally:
+            importer.TXT_CHUNK_SIZE = chunk_size
+        #end try
+    #end def
+    def test_line_endings(self):
+        '''
+        CR-only and CRLF line endings are parsed like LF, also across chunks
+        '''
+        directory = tempfile.mkdtemp()
+        chunk_size = importer.TXT_CHUNK_SIZE
+        try:
+            expected = [('POINT:0',(1.0,2.0,3.0)),('POINT:1',(4.0,5.0,6.0)),('POINT:2',(-7.5,8.0))]
+            for newline in ['\r', '\r\n']:
+                filename = os.path.join(directory, 'points.txt')
+                with open(filename, 'w', newline='') as file:
+                    file.write(newline.join(['1.0,2.0,3.0', 'junk', '4.0,5.0,6.0', '-7.5, 8.0 ']) + newline)
+                for importer.TXT_CHUNK_SIZE in [chunk_size, 12]:
+                    self.assertEqual(importer.import_txt_file(filename), expected)
+                    self.assertEqual([geometry for block in importer.iter_txt_points(filename, block_size=2) for geometry in block.to_list()], expected)
+                #end for
+            #end for
+        finally:
+            importer.TXT_CHUNK_SIZE = chunk_size
+            shutil.rmtree(directory)
+        #end try
+    #end def
+
+class TXT_Export_Tests(unittest.TestCase):
+    '''
+    Tests for exporting txt files
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'points.txt')
+    #end def
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    #end def
+    def test_round_trip(self):
+        '''
+        Exported lists, batches and generators import as the same points
+        '''
+        geometries = importer.import_txt_file("Test Files/text_given.txt")
+        for scans in [geometries, GeometryBatch.from_list(geometries), iter(geometries)]:
+            self.assertTrue(importer.export_txt_file(self.filename, scans))
+            self.assertEqual(importer.import_txt_file(self.filename), geometries)
+        importer.export_txt_file(self.filename, geometries, 'mm')
+        for read, geometry in zip(importer.import_txt_file(self.filename, 'mm'), geometries):
+            self.assertTrue(np.allclose(read[1], geometry[1], 0, PRECISION))
+    #end def
+    def test_format(self):
+        '''
+        2D and 3D points in a chosen format, unsupported geometries are skipped
+        '''
+        geometries = [('POINT:0',(1.25,-2.0)),('LINE:0',[(0.0,0.0,0.0),(1.0,1.0,1.0)]),('POINT:1',[(1.0,2.0,3.0)])]
+        for scans in [geometries, GeometryBatch.from_list(geometries)]:
+            with self.assertLogs(level='WARNING'):
+                importer.export_txt_file(self.filename, scans, float_format='%.3f')
+            with open(self.filename) as file:
+                self.assertEqual(file.read(), '1.250,-2.000\n1.000,2.000,3.000\n')
+    #end def
+    def test_list_2d_points(self):
+        '''
+        2D list points are written in 2D from both lists and batches
+        '''
+        geometries = [('POINT:0',[(1.0,2.0)]),('POINT:1',[(1.0,2.0,3.0)])]
+        for scans in [geometries, GeometryBatch.from_list(geometries)]:
+            importer.export_txt_file(self.filename, scans)
+            with open(self.filename) as file:
+                self.assertEqual(file.read(), '1.0,2.0\n1.0,2.0,3.0\n')
+    #end def
 
 class CSV_Error_Tests(unittest.TestCase):
     '''
@@ -357,6 +472,177 @@ class CSV_Import_Tests(unittest.TestCase):
         self.assertEqual(geometries[3][1][1],(4.0,0.0,0.0))
         self.assertEqual(geometries[3][1][2],(5.0,))
     #end def
+    def test_signs_and_batch(self):
+        '''
+        Signed and exponent values, lower case and unknown scantypes, batches match lists
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'signed.csv')
+            with open(filename, 'w') as file:
+                file.write('name,scantype,arg1,arg2,arg3,arg4\nPOINT0,point,"-1.5, 2e3",,,\nBLOB1,blob,,,,\n'
+                    'LINE2,LINE,"-1,-2,-3","4, 5.5, -6e-1",,\nARC3,Arc,"0,0,0",2,-10,20\n')
+            with self.assertLogs(level='WARNING'):
+                geometries = importer.import_csv_file(filename)
+            self.assertEqual(geometries, [
+                ('POINT:0',[(-1.5,2000.0)]),
+                ('LINE:2',[(-1.0,-2.0,-3.0),(4.0,5.5,-0.6)]),
+                ('ARC:3',[(0.0,0.0,0.0),(2.0,-10.0,20.0)]),
+            ])
+            with self.assertLogs(level='WARNING'):
+                batch = importer.import_csv_file(filename,units='mm',as_batch=True)
+            with self.assertLogs(level='WARNING'):
+                expected = GeometryBatch.from_list(importer.import_csv_file(filename,units='mm'))
+            self.assertEqual(batch.to_list(), expected.to_list())
+        finally:
+            shutil.rmtree(directory)
+    #end def
+    def test_lenient_cells(self):
+        '''
+        Cells with brackets and units are read one at a time, rows that hold no numbers throw errors with their row #
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'lenient.csv')
+            with open(filename, 'w') as file:
+                file.write('name,scantype,arg1,arg2,arg3,arg4\nPOINT0,POINT,"(1.0, -2.0, 3.0)",,,\n'
+                    'LINE1,LINE,"1.0, 2.0, 3.0 um","-4e1,5,6",,\nARC2,ARC,"1,2",3.5 um,0,90\n')
+            geometries = importer.import_csv_file(filename)
+            self.assertEqual(geometries, [
+                ('POINT:0',[(1.0,-2.0,3.0)]),
+                ('LINE:1',[(1.0,2.0,3.0),(-40.0,5.0,6.0)]),
+                ('ARC:2',[(1.0,2.0),(3.5,0.0,90.0)]),
+            ])
+            self.assertEqual(importer.import_csv_file(filename,as_batch=True).to_list(), geometries)
+
+            with open(filename, 'a') as file:
+                file.write('POINT3,POINT,abc,,,\n')
+            with self.assertRaisesRegex(Exception, 'row 3'):
+                importer.import_csv_file(filename)
+        finally:
+            shutil.rmtree(directory)
+    #end def
+    def test_too_many_values(self):
+        '''
+        Plain cells with more than 3 numbers throw errors with their row # like lenient cells
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'too_many.csv')
+            for cell in ['"1.0, 2.0, 3.0, 4.0"', '"(1.0, 2.0, 3.0, 4.0)"']:
+                with open(filename, 'w') as file:
+                    file.write(f'name,scantype,arg1,arg2,arg3,arg4\nPOINT0,POINT,"1.0, 2.0",,,\nPOINT1,POINT,{cell},,,\n')
+                for as_batch in [False, True]:
+                    with self.assertRaisesRegex(Exception, 'row 1'):
+                        importer.import_csv_file(filename, as_batch=as_batch)
+                #end for
+            #end for
+        finally:
+            shutil.rmtree(directory)
+    #end def
+    def test_export_round_trip(self):
+        '''
+        Exported negative geometries import unchanged
+        '''
+        geometries = [('POINT:0',[(-1.0,2.5,-3.0)]),('LINE:1',[(-1.0,-2.0,0.0),(4.0,-5.0,6.0)]),('ARC:2',[(-1.0,2.0,3.0),(4.0,-90.0,45.0)])]
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'round_trip.csv')
+            importer.export_csv_file(filename, geometries)
+            self.assertEqual(importer.import_csv_file(filename), geometries)
+        finally:
+            shutil.rmtree(directory)
+    #end def
+
+class CSV_Round_Trip_Tests(unittest.TestCase):
+    '''
+    Tests for exporting geometries to csv files and importing them again
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'round_trip.csv')
+    #end def
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    #end def
+    def test_dxf_fixtures(self):
+        '''
+        Geometries of every DXF fixture import unchanged as lists and batches
+        NOTE Ellipses are left out, CSV ellipses only keep the length of the major axis
+        '''
+        for name in ['Basic Arc','Basic Circle','Basic LWPolyline','Basic Line','Basic Point','Basic Spline','Complex Arcs','Complex Circles','Complex Lines','Complex Points']:
+            geometries = importer.import_dxf_file(f'Test Files/{name}.dxf')
+            importer.export_csv_file(self.filename, geometries)
+            self.assertEqual(importer.import_csv_file(self.filename), geometries)
+            self.assertEqual(importer.import_csv_file(self.filename,as_batch=True).to_list(), geometries)
+    #end def
+    def test_splines_and_polylines(self):
+        '''
+        Non-rational splines, open polylines, units and conversion of imported splines and polylines
+        '''
+        geometries = [
+            ('SPLINE:0',[(2,0,3),(0.0,0.0,0.0),(-1.0,2.0,0.5),(3.0,0.0,0.0),[0.0,0.0,0.0,1.0,1.0,1.0],[]]),
+            ('LWPOLYLINE:1',[(0.0,0.0,1.0,2.0,0.5),(-4.0,4.0,0.0,0.0,0.0),0.0]),
+        ] + importer.import_dxf_file('Test Files/Basic Spline.dxf') + importer.import_dxf_file('Test Files/Basic LWPolyline.dxf')
+        importer.export_csv_file(self.filename, geometries, 'mm')
+        imported = importer.import_csv_file(self.filename, units='mm')
+        self.assertEqual([geometry[0] for geometry in imported], ['SPLINE:0','LWPOLYLINE:1','SPLINE:2','LWPOLYLINE:3'])
+        self.assertEqual(imported[0][1][0], (2,0,3))
+        self.assertEqual(imported[0][1][4:], [[0.0,0.0,0.0,1.0,1.0,1.0],[]])
+        self.assertTrue(np.allclose(imported[1][1][1], (-4.0,4.0,0.0,0.0,0.0)))
+        self.assertEqual(imported[1][1][2], 0.0)
+        # Widths are not scaled by the units, like DXF imports
+        self.assertTrue(np.allclose(imported[1][1][0], (0.0,0.0,1.0,2.0,0.5)))
+        with open(self.filename) as file:
+            self.assertIn('0.0, 0.0, 1.0, 2.0, 0.5', file.read())
+        self.assertTrue(np.allclose(imported[3][1][:-1], geometries[3][1][:-1]))
+        self.assertEqual(importer.import_csv_file(self.filename, units='mm', as_batch=True).to_list(), imported)
+
+        converted = importer.import_csv_file(self.filename, ['LINE'], convert=True, num_segments=10)
+        self.assertTrue(converted)
+        self.assertTrue(all(geometry[0].startswith('LINE') for geometry in converted))
+    #end def
+
+class CSV_Stream_Tests(unittest.TestCase):
+    '''
+    Tests for reading and writing csv files in chunks
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'stream.csv')
+    #end def
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    #end def
+    def test_chunks(self):
+        '''
+        Chunks hold at most chunk_rows rows and keep the ID # of every row
+        '''
+        geometries = importer.import_csv_file("Test Files/test.csv")
+        chunks = list(importer.iter_csv_geometries("Test Files/test.csv",chunk_rows=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3,1])
+        self.assertEqual([geometry for chunk in chunks for geometry in chunk], geometries)
+        batches = list(importer.iter_csv_geometries("Test Files/test.csv",chunk_rows=3,as_batch=True))
+        self.assertEqual([geometry for batch in batches for geometry in batch.to_list()], geometries)
+        self.assertEqual(list(importer.iter_file_geometries("Test Files/test.csv")), geometries)
+    #end def
+    def test_writer(self):
+        '''
+        Geometries written in several calls match a single export
+        '''
+        geometries = importer.import_dxf_file("Test Files/Complex Lines.dxf") + importer.import_csv_file("Test Files/test.csv")
+        with importer.CSVWriter(self.filename, 'mm', batch_rows=4) as writer:
+            writer.write(geometries[:5])
+            writer.write(iter(geometries[5:]))
+            writer.write(GeometryBatch.from_list(geometries[:2]))
+        self.assertEqual(writer.num_rows, len(geometries) + 2)
+        self.assertRaises(Exception, lambda: writer.write(geometries))
+        with open(self.filename) as file:
+            streamed = file.read()
+        importer.export_csv_file(self.filename, geometries + geometries[:2], 'mm')
+        with open(self.filename) as file:
+            self.assertEqual(file.read(), streamed)
+    #end def
 
 class Conversion_Tests(unittest.TestCase):
     '''
@@ -389,6 +675,18 @@ class Conversion_Tests(unittest.TestCase):
         for index2,point2 in enumerate(converted_segmentlength):
             self.assertEqual((index2*1000,0.0,0.0),point2[1][0])
     #end def 
+    def test_line_to_point_vectorized(self):
+        '''
+        Points keep Z, get unique ids and batches give the same points as lists
+        '''
+        lines = [('LINE:0',[(0.0,0.0,0.0),(0.0,90.0,9.0)]),('LINE:1',[(5.0,5.0),(5.0,5.0)]),('LINE:2',[(0.0,0.0),(30.0,60.0)])]
+        converted = geometry_to_line.lines_to_points(lines,10)
+        self.assertEqual(len(converted), 21)
+        self.assertEqual(converted[9], ('POINT:9',[(0.0,90.0,9.0)]))
+        self.assertEqual(converted[10], ('POINT:10',[(5.0,5.0,0.0)]))
+        self.assertEqual([point[0] for point in converted], [f'POINT:{index}' for index in range(21)])
+        self.assertEqual(geometry_to_line.lines_to_points(GeometryBatch.from_list(lines),10).to_list(), converted)
+    #end def
     def test_arc_to_line(self):
         '''
         Test converting arcs to lines using:
@@ -410,6 +708,127 @@ class Conversion_Tests(unittest.TestCase):
             line = converted_segmentlength[index]
             self.assertTrue(within_a_percent(round(math.dist(line[1][0],line[1][1]),3),1000))
     #end def
+    def test_arc_to_line_vectorized(self):
+        '''
+        Full circles close without a zero length line, centers are not scaled by units and batches give the same lines as lists
+        '''
+        arcs = [('ARC:0',[(1000.0,2000.0,5.0),(500.0,0.0,360.0)]),('ARC:1',[(0.0,0.0,0.0),(2000.0,45.0,135.0)])]
+        converted = geometry_to_line.arc_to_lines(arcs,16)
+        self.assertEqual(len(converted), 32)
+        self.assertTrue(all(math.dist(line[1][0],line[1][1]) > 0 for line in converted))
+        self.assertEqual(converted[0][1][0], (1500.0,2000.0,5.0))
+        self.assertTrue(math.dist(converted[15][1][1],(1500.0,2000.0,5.0)) < 10**-6)
+
+        # Last shorter line reaches the end angle
+        converted_length = geometry_to_line.arc_to_lines(arcs,0,0.5,'mm')
+        self.assertTrue(math.dist(converted_length[0][1][0],(1500.0,2000.0,5.0)) < 10**-6)
+        self.assertTrue(math.dist(converted_length[-1][1][1],(-2000*math.sqrt(0.5),2000*math.sqrt(0.5),0.0)) < 10**-6)
+        self.assertEqual(geometry_to_line.arc_to_lines(GeometryBatch.from_list(arcs),16).to_list(), converted)
+    #end def
+    def test_max_deviation(self):
+        '''
+        Curves get the fewest segments that stay within max_deviation
+        '''
+        arcs = [('ARC:0',[(0.0,0.0,0.0),(100.0,0.0,360.0)]),('ARC:1',[(0.0,0.0,0.0),(10000.0,350.0,10.0)])]
+        sources = []
+        converted = geometry_to_line.convert_to('ARC','LINE',arcs,max_deviation=1,sources=sources)
+
+        # Sagitta of every line is within max_deviation, but not with one line less
+        for source, (radius, degree) in enumerate([(100.0,360.0),(10000.0,20.0)]):
+            count = sources.count(source)
+            self.assertLessEqual(radius*(1-math.cos(math.radians(degree/count/2))), 1)
+            self.assertGreater(radius*(1-math.cos(math.radians(degree/(count-1)/2))), 1)
+        self.assertTrue(math.dist(converted[-1][1][1],(10000*math.cos(math.radians(10)),10000*math.sin(math.radians(10)),0.0)) < 10**-6)
+
+        # Ellipse points stay within max_deviation of the lines
+        converted_ellipse = importer.import_dxf_file('Test Files/Basic Ellipse.dxf',['LINE'],True,max_deviation=10)
+        for index in range(100):
+            angle = 2*math.pi*index/100
+            point = (25000*math.cos(angle), 15000*math.sin(angle), 0.0)
+            self.assertLessEqual(min(point_line_distance(point,*line[1]) for line in converted_ellipse), 10)
+        self.assertLess(len(importer.import_dxf_file('Test Files/Basic Ellipse.dxf',['LINE'],True,max_deviation=100)), len(converted_ellipse))
+    #end def
+    def test_spline_matches_ezdxf(self):
+        '''
+        Flattened splines stay close to the points of ezdxf's flattening and keep the spline's end points
+        '''
+        spline = importer.import_dxf_file('Test Files/Basic Spline.dxf')[0]
+        values = spline[1]
+        count = values[0][2]
+        ezdxf_points = list(BSpline(values[1:count+1], order=values[0][0]+1, knots=values[count+1], weights=values[count+2]).flattening(10))
+        converted = geometry_to_line.spline_to_lines([spline], 10)
+
+        self.assertTrue(math.dist(converted[0][1][0], ezdxf_points[0]) < 10**-6)
+        self.assertTrue(math.dist(converted[-1][1][1], ezdxf_points[-1]) < 10**-6)
+        for point in ezdxf_points:
+            self.assertLessEqual(min(point_line_distance(point,*line[1]) for line in converted), 10)
+        self.assertEqual(geometry_to_line.spline_to_lines(GeometryBatch.from_list([spline]), 10).to_list(), converted)
+
+        # Degree 1 splines are their control polygon
+        polygon = ('SPLINE:0', [(1,1,3),(0.0,0.0,0.0),(100.0,0.0,0.0),(100.0,100.0,0.0),[0.0,0.0,0.5,1.0,1.0],[]])
+        self.assertEqual([line[1][0] for line in geometry_to_line.spline_to_lines([polygon])], [(0.0,0.0,0.0),(25.0,0.0,0.0),(50.0,0.0,0.0),(75.0,0.0,0.0),(100.0,0.0,0.0),(100.0,25.0,0.0),(100.0,50.0,0.0),(100.0,75.0,0.0)])
+        self.assertEqual(GeometryBatch.from_list([polygon]).to_list(), [polygon])
+    #end def
+    def test_lwpolyline_bulges(self):
+        '''
+        Bulged vertex pairs become arcs like ezdxf's explode and the given polyline is not changed
+        '''
+        lwpolyline = ('LWPOLYLINE:0', [(0.0,0.0,0.0,0.0,1.0),(1000.0,0.0,0.0,0.0,-1.0),(2000.0,0.0,0.0,0.0,0.0),(2000.0,1000.0,0.0,0.0,0.0),1.0])
+        given = [lwpolyline]
+        converted = geometry_to_line.lwpolyline_to_arcs_lines(given)
+        self.assertEqual(given, [('LWPOLYLINE:0', [(0.0,0.0,0.0,0.0,1.0),(1000.0,0.0,0.0,0.0,-1.0),(2000.0,0.0,0.0,0.0,0.0),(2000.0,1000.0,0.0,0.0,0.0),1.0])])
+        self.assertEqual([geometry[0] for geometry in converted], ['ARC:0','ARC:1','LINE:2','LINE:3'])
+
+        # Counterclockwise half circle below and clockwise half circle above the X axis
+        for arc, expected in zip(converted[0:2], [[(500.0,0.0,0.0),(500.0,180.0,0.0)],[(1500.0,0.0,0.0),(500.0,0.0,180.0)]]):
+            for values, expected_values in zip(arc[1], expected):
+                self.assertTrue(math.dist(values, expected_values) < 10**-6)
+        self.assertEqual(converted[3][1], [(2000.0,1000.0,0.0),(0.0,0.0,0.0)])
+        self.assertEqual(geometry_to_line.lwpolyline_to_arcs_lines(GeometryBatch.from_list(given)).to_list(), converted)
+    #end def
+    def test_fused_kernels(self):
+        '''
+        Arcs, ellipses and splines converted to points and ellipses converted to lines are sampled on the given curves
+        '''
+
+        # Arc points lie on the arc, full circles do not repeat their start point
+        arcs = [('ARC:0', [(0.0,0.0,0.0),(1000.0,0.0,90.0)]), ('ARC:1', [(0.0,0.0,0.0),(1000.0,0.0,360.0)])]
+        sources = []
+        points = geometry_to_line.convert_to('ARC','POINT',arcs,num_segments=4,sources=sources)
+        self.assertEqual(sources, [0]*5 + [1]*4)
+        for point in points:
+            self.assertAlmostEqual(math.dist(point[1][0], (0.0,0.0,0.0)), 1000.0)
+
+        # Ellipse lines stay within max_deviation of a rotated ellipse and form a closed loop
+        ellipse = [('ELLIPSE:0', [(100.0,100.0,0.0),(3000.0,4000.0,0.0),(0.25,)])]
+        lines = geometry_to_line.convert_to('ELLIPSE','LINE',ellipse,max_deviation=5)
+        self.assertEqual(lines[-1][1][1], lines[0][1][0])
+        for line in lines:
+            for point in line[1]:
+                # Points on the ellipse satisfy (u/a)^2 + (v/b)^2 = 1 in the ellipse's own axes
+                u = ((point[0]-100.0)*3000.0 + (point[1]-100.0)*4000.0)/5000.0
+                v = (-(point[0]-100.0)*4000.0 + (point[1]-100.0)*3000.0)/5000.0
+                self.assertAlmostEqual((u/5000.0)**2 + (v/1250.0)**2, 1.0)
+            #end for
+            midpoint = tuple((start + end)/2 for start, end in zip(*line[1]))
+            parameter = math.atan2(
+                (-(midpoint[0]-100.0)*4000.0 + (midpoint[1]-100.0)*3000.0)/5000.0/1250.0,
+                ((midpoint[0]-100.0)*3000.0 + (midpoint[1]-100.0)*4000.0)/5000.0/5000.0)
+            closest = (100.0 + 3000.0*math.cos(parameter) - 1000.0*math.sin(parameter), 100.0 + 4000.0*math.cos(parameter) + 750.0*math.sin(parameter))
+            self.assertLess(math.dist(midpoint[:2], closest), 5.0)
+        #end for
+        self.assertEqual(len(geometry_to_line.convert_to('ELLIPSE','POINT',ellipse,max_deviation=5)), len(lines))
+
+        # Spline points are the vertices of the spline's lines
+        splines = importer.import_dxf_file('Test Files/Basic Spline.dxf',['SPLINE'])
+        points = geometry_to_line.convert_to('SPLINE','POINT',splines)
+        lines = geometry_to_line.spline_to_lines(splines)
+        self.assertEqual([point[1][0] for point in points[:-1]], [line[1][0] for line in lines[:len(points)-1]])
+
+        # Batches give the same results
+        for given_type, given in (('ARC',arcs), ('ELLIPSE',ellipse), ('SPLINE',splines)):
+            self.assertEqual(geometry_to_line.convert_to(given_type,'POINT',GeometryBatch.from_list(given)).to_list(), geometry_to_line.convert_to(given_type,'POINT',given))
+    #end def
     def test_ellipse_to_arc(self):
         '''
         Test converting ellipse to arcs using:
@@ -422,6 +841,37 @@ class Conversion_Tests(unittest.TestCase):
         # Check if 10 arcs were created
         self.assertEqual(len(converted_numsegments), 10)
     #end def
+    def test_rotated_ellipse_to_arc(self):
+        '''
+        Test converting ellipses with a rotated major axis to arcs:
+            - arcs lie on the rotated ellipse
+            - batches record the source of every arc
+        '''
+
+        ellipses = [('ELLIPSE:0', [(10.0, 20.0, 5.0), (0.0, 3000.0, 0.0), (0.2,)]), ('ELLIPSE:1', [(0.0, 0.0, 0.0), (-2000.0, 2000.0, 0.0), (0.5,)])]
+        arcs = geometry_to_line.ellipse_to_arcs(ellipses, 16)
+        self.assertEqual(len(arcs), 32)
+        for index, (name, values) in enumerate(arcs):
+            center, major_axis, ratio = ellipses[index // 16][1]
+            major_radius = math.hypot(major_axis[0], major_axis[1])
+            rotation = math.atan2(major_axis[1], major_axis[0])
+            radius, start_angle, end_angle = values[1]
+            self.assertEqual(values[0][2], center[2])
+            for angle in (start_angle, end_angle):
+                x = values[0][0] + radius*math.cos(math.radians(angle)) - center[0]
+                y = values[0][1] + radius*math.sin(math.radians(angle)) - center[1]
+                # Back into the axes of the ellipse
+                u = x*math.cos(rotation) + y*math.sin(rotation)
+                v = -x*math.sin(rotation) + y*math.cos(rotation)
+                self.assertAlmostEqual(math.hypot(u/major_radius, v/(ratio[0]*major_radius)), 1)
+            #end for
+        #end for
+
+        sources = []
+        batch = geometry_to_line.ellipse_to_arcs(GeometryBatch.from_list(ellipses), 4, sources=sources)
+        self.assertEqual(batch.to_list(), geometry_to_line.ellipse_to_arcs(ellipses, 4))
+        self.assertEqual(sources, [0]*4 + [1]*4)
+    #end def
     def test_spline_to_line(self):
         '''
         Basic test to make sure down converting splines to lines function throws no error
@@ -449,7 +899,703 @@ class Conversion_Tests(unittest.TestCase):
         self.assertTrue(within_a_percent_tuple(converted_numsegments[3][1][1],(25000.0,0.0,0.0)))
     #end def
 
+class Batch_Conversion_Tests(unittest.TestCase):
+    '''
+    Tests for converting non-allowed geometries in one batch per type
+    '''
+    def test_order_preserved(self):
+        '''
+        Converted geometries stay in the place of their source entity
+        '''
+        geometries = importer.import_dxf_file('Test Files/Complex Arcs.dxf')
+
+        # Convert every arc on its own
+        expected = []
+        for geometry in geometries:
+            expected.extend(line[1] for line in geometry_to_line.convert_to('ARC','LINE',[geometry],0,1000))
+
+        converted = importer.import_dxf_file('Test Files/Complex Arcs.dxf',['LINE'],True,0,1000)
+        self.assertEqual([line[1] for line in converted], expected)
+    #end def
+    def test_order_not_preserved(self):
+        '''
+        Without preserve_order converted geometries follow the allowed geometries
+        '''
+        converted = importer.import_csv_file('Test Files/test.csv',['POINT','LINE'],convert=True,preserve_order=False)
+        self.assertEqual(converted[0][1],[(1.0,2.0,3.0)])
+        self.assertEqual(converted[1][1],[(1.0,2.0,3.0),(4.0,5.0,6.0)])
+        self.assertEqual(len(converted), 2 + 10 + 10*10)  # Arc to 10 lines, ellipse to 10 arcs to 10 lines each
+    #end def
+
+class Multi_File_Tests(unittest.TestCase):
+    '''
+    Tests for importing many files with import_files
+    '''
+    def test_same_as_import_file(self):
+        '''
+        Results come back in input order and match import_file, missing files report their error
+        '''
+        filenames = ['Test Files/Complex Lines.dxf','Test Files/test.csv','missing.dxf','Test Files/Basic Spline.dxf']
+        results = list(importer.import_files(filenames,['LINE'],convert=True,workers=2))
+
+        self.assertEqual([result[0] for result in results], filenames)
+        for filename, geometries, error in results:
+            if filename == 'missing.dxf':
+                self.assertIsNone(geometries)
+                self.assertIsInstance(error, Exception)
+            else:
+                self.assertIsNone(error)
+                self.assertEqual(geometries, importer.import_file(filename,['LINE'],convert=True))
+    #end def
+    def test_unordered(self):
+        '''
+        Unordered results hold every file once
+        '''
+        filenames = ['Test Files/Complex Lines.dxf','Test Files/Complex Arcs.dxf','Test Files/test.csv']
+        results = list(importer.import_files(filenames,workers=2,ordered=False,as_batch=True))
+        self.assertEqual(sorted(result[0] for result in results), sorted(filenames))
+        self.assertTrue(all(isinstance(result[1], GeometryBatch) for result in results))
+    #end def
+    def test_simplify(self):
+        '''
+        Every file is simplified like import_file
+        '''
+        filenames = ['Test Files/Complex Arcs.dxf','Test Files/Complex Circles.dxf']
+        for filename, geometries, error in importer.import_files(filenames,['LINE'],convert=True,workers=2,simplify_tolerance=5000.0):
+            self.assertIsNone(error)
+            self.assertEqual(geometries, importer.import_file(filename,['LINE'],convert=True,simplify_tolerance=5000.0))
+            self.assertLess(len(geometries), len(importer.import_file(filename,['LINE'],convert=True)))
+        #end for
+    #end def
+
+class Import_Cache_Tests(unittest.TestCase):
+    '''
+    Tests for the on-disk import cache
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ImportCache(os.path.join(self.directory, 'cache'))
+    #end def
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    #end def
+    def test_hit_same_as_import(self):
+        '''
+        Cached imports match uncached imports, including TXT points
+        '''
+        for filename in ['Test Files/Complex Lines.dxf','Test Files/Basic Spline.dxf','Test Files/text_2d.txt','Test Files/test.csv']:
+            expected = importer.import_file(filename,['LINE'],convert=True)
+            self.assertEqual(importer.import_file(filename,['LINE'],convert=True,cache=self.cache), expected)
+            self.assertEqual(importer.import_file(filename,['LINE'],convert=True,cache=self.cache), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 4))
+    #end def
+    def test_key(self):
+        '''
+        Changed options and changed files miss the cache
+        '''
+        filename = os.path.join(self.directory, 'lines.dxf')
+        shutil.copy('Test Files/Complex Lines.dxf', filename)
+        importer.import_file(filename,cache=self.cache)
+        importer.import_file(filename,['POINT'],convert=True,cache=self.cache)
+        self.assertEqual(self.cache.misses, 2)
+
+        # Rewrite file with different contents
+        shutil.copy('Test Files/Complex Arcs.dxf', filename)
+        os.utime(filename, ns=(0, 0))
+        self.assertEqual(importer.import_file(filename,cache=self.cache), importer.import_file('Test Files/Complex Arcs.dxf'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 3))
+
+        # Entries of another cache version are not reused
+        path = self.cache.entry_path(filename, {'option': 1})
+        import_cache.CACHE_VERSION += 1
+        try:
+            self.assertNotEqual(self.cache.entry_path(filename, {'option': 1}), path)
+        finally:
+            import_cache.CACHE_VERSION -= 1
+        #end try
+    #end def
+    def test_missing_file(self):
+        '''
+        Missing files throw the importer error instead of a FileNotFoundError
+        '''
+        with self.assertRaisesRegex(Exception, 'Invalid/Corrupt/Missing'):
+            self.cache.get(os.path.join(self.directory, 'missing.dxf'), {})
+        with self.assertRaisesRegex(Exception, 'Invalid/Corrupt/Missing'):
+            importer.import_file(os.path.join(self.directory, 'missing.dxf'),cache=self.cache)
+    #end def
+    def test_invalidate_and_evict(self):
+        '''
+        Entries are removed per file, all at once and beyond max_bytes
+        '''
+        importer.import_file('Test Files/Complex Lines.dxf',cache=self.cache)
+        importer.import_file('Test Files/Complex Lines.dxf',['POINT'],convert=True,cache=self.cache)
+        importer.import_file('Test Files/Complex Arcs.dxf',cache=self.cache)
+        self.assertEqual(self.cache.invalidate('Test Files/Complex Lines.dxf'), 2)
+        self.assertEqual(self.cache.invalidate(), 1)
+
+        # Keep only the most recent entry
+        importer.import_file('Test Files/Complex Lines.dxf',cache=self.cache)
+        for name in os.listdir(self.cache.directory):
+            os.utime(os.path.join(self.cache.directory, name), ns=(0, 0))
+        importer.import_file('Test Files/Complex Arcs.dxf',cache=self.cache)
+        self.cache.max_bytes = self.cache.size() - 1
+        self.assertEqual(self.cache.evict(), 1)
+        importer.import_file('Test Files/Complex Arcs.dxf',cache=self.cache)
+        self.assertEqual(self.cache.hits, 1)
+    #end def
+
+class DXF_Stream_Tests(unittest.TestCase):
+    '''
+    Tests for streaming DXF files with iter_dxf_geometries
+    '''
+    def test_no_file_found(self):
+        '''
+        No file found iter_dxf_geometries throws error
+        '''
+        self.assertRaises(Exception, lambda: list(importer.iter_dxf_geometries("")))
+    #end def
+    def test_same_as_import(self):
+        '''
+        Streamed geometries match import_dxf_file, with and without conversion
+        '''
+        for name in ['Complex Points','Complex Lines','Complex Circles','Basic Spline','Basic LWPolyline']:
+            filename = f'Test Files/{name}.dxf'
+            self.assertEqual(list(importer.iter_dxf_geometries(filename)), importer.import_dxf_file(filename))
+            self.assertEqual(list(importer.iter_dxf_geometries(filename,['LINE'],True,5)), importer.import_dxf_file(filename,['LINE'],True,5))
+    #end def
+    def test_chunks(self):
+        '''
+        Chunks hold at most chunk_size geometries and together hold every geometry
+        '''
+        chunks = list(importer.iter_dxf_geometries('Test Files/Complex Lines.dxf', chunk_size=5))
+        self.assertTrue(all(len(chunk) <= 5 for chunk in chunks))
+        self.assertEqual([geometry for chunk in chunks for geometry in chunk], importer.import_dxf_file('Test Files/Complex Lines.dxf'))
+    #end def
+
+class Conversion_Cache_Tests(unittest.TestCase):
+    '''
+    Tests for memoizing conversions of repeated shapes with ConversionCache
+    '''
+    def test_same_as_convert_to(self):
+        '''
+        Cached conversions match convert_to for every type, repeated shapes are only converted once
+        '''
+        splines = importer.import_dxf_file('Test Files/Basic Spline.dxf')
+        lwpolylines = importer.import_dxf_file('Test Files/Basic LWPolyline.dxf')
+        for given_type, given in (('ARC',importer.import_dxf_file('Test Files/Complex Circles.dxf')),('ELLIPSE',importer.import_dxf_file('Test Files/Basic Ellipse.dxf')),('SPLINE',splines),('LWPOLYLINE',lwpolylines)):
+            for return_type in ('ARC','LINE','POINT'):
+                if given_type in ('ARC','SPLINE') and return_type == 'ARC':
+                    continue
+                cache = geometry_to_line.ConversionCache()
+                expected_sources, cached_sources = [], []
+                expected = geometry_to_line.convert_to(given_type,return_type,given,num_segments=10,sources=expected_sources)
+                for _ in range(2):
+                    cached = geometry_to_line.convert_to(given_type,return_type,given,num_segments=10,sources=cached_sources,cache=cache)
+                self.assertEqual(cached_sources, expected_sources*2)
+                self.assertEqual([geometry[0] for geometry in cached], [geometry[0] for geometry in expected])
+                for cached_geometry, expected_geometry in zip(cached, expected):
+                    for cached_values, expected_values in zip(cached_geometry[1], expected_geometry[1]):
+                        self.assertTrue(math.dist(cached_values, expected_values) < PRECISION)
+                self.assertEqual(cache.misses, len(cache))
+                self.assertEqual(cache.hits + cache.misses, 2*len(given))
+            #end for
+        #end for
+    #end def
+    def test_translated_copies(self):
+        '''
+        Copies of a shape at other positions hit the cache and are moved to their position, the LRU bound holds
+        '''
+        cache = geometry_to_line.ConversionCache(max_entries=2)
+        vias = [(f'ARC:{index}', [(index*100.0, -index*50.0, 0.0), (25.0, 0.0, 360.0)]) for index in range(50)]
+        lines = geometry_to_line.convert_to('ARC','LINE',GeometryBatch.from_list(vias),max_deviation=1,cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (49, 1))
+        self.assertEqual(lines.to_list(), geometry_to_line.convert_to('ARC','LINE',vias,max_deviation=1))
+
+        # Other shapes and settings evict the least recently used shape
+        geometry_to_line.convert_to('ARC','LINE',vias,max_deviation=2,cache=cache)
+        geometry_to_line.convert_to('ARC','POINT',vias,max_deviation=2,cache=cache)
+        self.assertEqual(len(cache), 2)
+        geometry_to_line.convert_to('ARC','LINE',vias,max_deviation=1,cache=cache)
+        self.assertEqual(cache.misses, 4)
+    #end def
+
+class Parallel_Conversion_Tests(unittest.TestCase):
+    '''
+    Tests for converting across worker processes with workers=
+    '''
+    def test_same_as_serial(self):
+        '''
+        Parallel conversions match serial ones, including IDs, sources and batches
+        '''
+        arcs = [(f'ARC:{index}', [(index*100.0, 0.0, 0.0), (25.0 + index%7, 0.0, 90.0 + index%180)]) for index in range(2*geometry_to_line.PARALLEL_MIN_GEOMETRIES + 1)]
+        serial_sources, parallel_sources = [], []
+        serial = geometry_to_line.convert_to('ARC','LINE',arcs,sources=serial_sources)
+        self.assertEqual(geometry_to_line.convert_to('ARC','LINE',arcs,sources=parallel_sources,workers=2), serial)
+        self.assertEqual(parallel_sources, serial_sources)
+        self.assertEqual(geometry_to_line.convert_to('ARC','POINT',GeometryBatch.from_list(arcs),workers=3).to_list(), geometry_to_line.convert_to('ARC','POINT',arcs))
+    #end def
+    def test_import(self):
+        '''
+        Imports converting in parallel match serial imports
+        '''
+        minimum = geometry_to_line.PARALLEL_MIN_GEOMETRIES
+        geometry_to_line.PARALLEL_MIN_GEOMETRIES = 1
+        try:
+            for filename in ['Test Files/Complex Arcs.dxf','Test Files/Complex Circles.dxf','Test Files/test.csv']:
+                self.assertEqual(importer.import_file(filename,['POINT'],convert=True,workers=2), importer.import_file(filename,['POINT'],convert=True))
+        finally:
+            geometry_to_line.PARALLEL_MIN_GEOMETRIES = minimum
+        #end try
+    #end def
+
+class Pipeline_Tests(unittest.TestCase):
+    '''
+    Tests for streaming conversion and geometry_pipeline
+    '''
+    def test_iter_convert_to(self):
+        '''
+        Streamed conversion matches convert_to, numbers geometries consecutively and only reads the chunks it needs
+        '''
+        arcs = importer.import_dxf_file('Test Files/Complex Arcs.dxf')
+        streamed = list(geometry_to_line.iter_convert_to('ARC','LINE',iter(arcs),num_segments=4,chunk_size=3))
+        self.assertEqual([geometry[1] for geometry in streamed], [geometry[1] for geometry in geometry_to_line.convert_to('ARC','LINE',arcs,num_segments=4)])
+        self.assertEqual([geometry[0] for geometry in streamed], [f'LINE:{index}' for index in range(len(streamed))])
+
+        # Taking the first line only reads the first chunk
+        read = []
+        def arc_generator():
+            for arc in arcs:
+                read.append(arc)
+                yield arc
+        #end def
+        next(geometry_to_line.iter_convert_to('ARC','LINE',arc_generator(),chunk_size=2))
+        self.assertEqual(len(read), 2)
+    #end def
+    def test_iter_filter_geometries(self):
+        '''
+        Converted geometries are numbered over the whole stream, not per chunk
+        '''
+        geometries = importer.import_dxf_file('Test Files/Complex Circles.dxf')
+        streamed = list(importer.iter_filter_geometries(iter(geometries),['LINE'],True,chunk_size=3))
+        self.assertEqual(streamed, importer.import_dxf_file('Test Files/Complex Circles.dxf',['LINE'],True))
+        self.assertEqual(len({geometry[0] for geometry in streamed}), len(streamed))
+    #end def
+    def test_same_as_import(self):
+        '''
+        A pipeline without custom stages gives the same geometries as import_file
+        '''
+        for name in ['Complex Arcs.dxf','Basic LWPolyline.dxf','test.csv']:
+            filename = f'Test Files/{name}'
+            self.assertEqual(list(importer.geometry_pipeline(filename,['LINE','POINT'],True)), importer.import_file(filename,['LINE','POINT'],convert=True))
+    #end def
+    def test_stages_windows_and_export(self):
+        '''
+        Custom stages run in order, windows are bounded and pipelines export to files
+        '''
+        def shift(geometries):
+            for name, values in geometries:
+                yield (name, [(point[0] + 1.0,) + tuple(point[1:]) for point in values])
+        #end def
+        windows = list(importer.geometry_pipeline('Test Files/Complex Arcs.dxf',['POINT'],True,stages=[shift],window_size=7))
+        self.assertTrue(all(len(window) <= 7 for window in windows))
+        points = importer.import_file('Test Files/Complex Arcs.dxf',['POINT'],convert=True)
+        self.assertEqual([geometry[1] for window in windows for geometry in window], [[(point[1][0][0] + 1.0,) + point[1][0][1:]] for point in points])
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'points.txt')
+            self.assertTrue(importer.geometry_pipeline(importer.geometry_pipeline('Test Files/Complex Arcs.dxf',['POINT'],True),export_filename=filename))
+            with open(filename) as file:
+                self.assertEqual(len(file.readlines()), len(points))
+    #end def
+
+class Point_Dedup_Tests(unittest.TestCase):
+    '''
+    Tests for connected point output and dedup_points
+    '''
+    def test_connected(self):
+        '''
+        Shared vertices of consecutive lines and polyline segments are stored once
+        '''
+        lines = [('LINE:0', [(0.0, 0.0, 0.0), (10.0, 0.0, 0.0)]), ('LINE:1', [(10.0, 0.0, 0.0), (10.0, 10.0, 0.0)]), ('LINE:2', [(20.0, 0.0, 0.0), (30.0, 0.0, 0.0)])]
+        sources = []
+        points = geometry_to_line.lines_to_points(lines, num_segments=3, sources=sources, connected=True)
+        self.assertEqual([point[1][0] for point in points], [(0.0,0.0,0.0),(5.0,0.0,0.0),(10.0,0.0,0.0),(10.0,5.0,0.0),(10.0,10.0,0.0),(20.0,0.0,0.0),(25.0,0.0,0.0),(30.0,0.0,0.0)])
+        self.assertEqual(sources, [0,0,0,1,1,2,2,2])
+
+        # Same points as dropping repeats from the unconnected conversion
+        polylines = importer.import_dxf_file('Test Files/Basic LWPolyline.dxf')
+        unconnected = [point[1][0] for point in geometry_to_line.convert_to('LWPOLYLINE','POINT',polylines)]
+        connected = geometry_to_line.convert_to('LWPOLYLINE','POINT',polylines,connected=True)
+        self.assertEqual([point[1][0] for point in connected], [point for index, point in enumerate(unconnected) if index == 0 or point != unconnected[index-1]])
+        self.assertLess(len(connected), len(unconnected))
+        self.assertEqual(geometry_to_line.convert_to('LWPOLYLINE','POINT',GeometryBatch.from_list(polylines),connected=True).to_list(), connected)
+    #end def
+    def test_dedup_points(self):
+        '''
+        Equal points and points within tolerance of an earlier kept point are merged, in lists and batches
+        '''
+        geometries = [
+            ('POINT:0', [(0.0, 0.0, 0.0)]),
+            ('LINE:1', [(0.0, 0.0, 0.0), (1.0, 1.0, 0.0)]),
+            ('POINT:2', [(0.0, 0.0, 0.0)]),
+            ('POINT:3', [(0.5, 0.0, 0.0)]),
+            ('POINT:4', [(0.9, 0.0, 0.0)]),
+            ('POINT:5', (5.0, 5.0)),
+        ]
+        sources = []
+        self.assertEqual(geometry_to_line.dedup_points(geometries, sources=sources), geometries[:2] + geometries[3:])
+        self.assertEqual(sources, [0,1,3,4,5])
+
+        # POINT:4 is only close to POINT:3, which was merged into POINT:0
+        sources = []
+        merged = geometry_to_line.dedup_points(geometries, 0.6, sources)
+        self.assertEqual(merged, [geometries[0], geometries[1], geometries[4], geometries[5]])
+        self.assertEqual(sources, [0,1,4,5])
+        batch_sources = []
+        self.assertEqual(geometry_to_line.dedup_points(GeometryBatch.from_list(geometries), 0.6, batch_sources).to_list(), GeometryBatch.from_list(merged).to_list())
+        self.assertEqual(batch_sources, sources)
+
+        # Matches comparing every pair
+        points = np.random.default_rng(0).random((500, 3))*20
+        kept = []
+        for index, point in enumerate(points):
+            if all(np.linalg.norm(points[other] - point) > 1.5 for other in kept):
+                kept.append(index)
+        #end for
+        sources = []
+        geometry_to_line.dedup_points([(f'POINT:{index}', [tuple(point)]) for index, point in enumerate(points)], 1.5, sources)
+        self.assertEqual(sources, kept)
+    #end def
+    def test_dedup_crowded(self):
+        '''
+        Many points within a few cubes are merged into few points without comparing every pair
+        '''
+        points = np.random.default_rng(1).random((20000, 3))*3
+        kept = []
+        for index, point in enumerate(points):
+            if all(np.linalg.norm(points[other] - point) > 1.0 for other in kept):
+                kept.append(index)
+        #end for
+        sources = []
+        merged = geometry_to_line.dedup_points(GeometryBatch.from_points(points), 1.0, sources)
+        self.assertEqual(sources, kept)
+        self.assertEqual(len(merged.points), len(kept))
+    #end def
+
+class Simplify_Tests(unittest.TestCase):
+    '''
+    Tests for Douglas-Peucker simplification of point and line chains
+    '''
+    def test_deviation(self):
+        '''
+        Every given vertex is within tolerance of the simplified chain, which keeps the chain ends
+        '''
+        arcs = importer.import_dxf_file('Test Files/Complex Arcs.dxf')
+        lines = geometry_to_line.convert_to('ARC','LINE',arcs,max_deviation=0.01)
+        for tolerance in [0.1, 5.0, 50.0]:
+            sources = []
+            simplified = geometry_to_line.simplify(lines, tolerance, sources)
+            self.assertLess(len(simplified), len(lines))
+            self.assertEqual([lines[source][0] for source in sources], [line[0] for line in simplified])
+            for line_index, source in enumerate(sources):
+                self.assertEqual(simplified[line_index][1][0], lines[source][1][0])
+                end = sources[line_index+1] if line_index + 1 < len(sources) else len(lines)
+                start, stop = np.array(simplified[line_index][1][0]), np.array(simplified[line_index][1][1])
+                self.assertEqual(simplified[line_index][1][1], lines[end-1][1][1])
+                for line in lines[source:end]:
+                    direction = stop - start
+                    position = min(max(np.dot(np.array(line[1][1]) - start, direction)/np.dot(direction, direction), 0), 1) if np.dot(direction, direction) else 0
+                    self.assertLessEqual(np.linalg.norm(np.array(line[1][1]) - (start + position*direction)), tolerance + 1e-9)
+            #end for
+            self.assertEqual(geometry_to_line.simplify(GeometryBatch.from_list(lines), tolerance).to_list(), GeometryBatch.from_list(simplified).to_list())
+        #end for
+    #end def
+    def test_chains(self):
+        '''
+        Chains end at other geometries and gaps, straight point runs keep their ends
+        '''
+        geometries = [
+            ('POINT:0', [(0.0, 0.0, 0.0)]), ('POINT:1', [(1.0, 0.0, 0.0)]), ('POINT:2', [(2.0, 0.0, 0.0)]),
+            ('LINE:3', [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0)]), ('LINE:4', [(1.0, 0.0, 0.0), (2.0, 0.0, 0.0)]), ('LINE:5', [(3.0, 0.0, 0.0), (4.0, 0.0, 0.0)]),
+            ('ARC:6', [(0.0, 0.0, 0.0), (1.0, 0.0, 90.0)]),
+            ('POINT:7', (5.0, 5.0)), ('POINT:8', (6.0, 5.0)),
+        ]
+        sources = []
+        simplified = geometry_to_line.simplify(geometries, sources=sources)
+        self.assertEqual(sources, [0, 2, 3, 5, 6, 7, 8])
+        self.assertEqual(simplified[2], ('LINE:3', [(0.0, 0.0, 0.0), (2.0, 0.0, 0.0)]))
+        self.assertEqual(simplified[3:], geometries[5:])
+        self.assertEqual(importer.import_file('Test Files/Complex Arcs.dxf',['LINE'],convert=True,simplify_tolerance=1.0), geometry_to_line.simplify(importer.import_file('Test Files/Complex Arcs.dxf',['LINE'],convert=True),1.0))
+    #end def
+
+class Scan_Order_Tests(unittest.TestCase):
+    '''
+    Tests for travel minimizing ordering
+    '''
+    def test_nearest_neighbour(self):
+        '''
+        Without improvement the order is the greedy nearest neighbour tour, lines are entered at either end
+        '''
+        rng = np.random.default_rng(0)
+        geometries = [(f'LINE:{index}', [(x, y, 0.0), (x + dx, y + dy, 0.0)]) for index, (x, y, dx, dy) in enumerate((rng.random((150, 4))*[100, 100, 6, 6]).tolist())]
+        geometries += [(f'POINT:{index}', [(x, y, 0.0)]) for index, (x, y) in enumerate((rng.random((50, 2))*100).tolist(), 150)]
+
+        # Greedy tour comparing every unvisited geometry
+        expected, position, remaining = [], (0.0, 0.0, 0.0), set(range(len(geometries)))
+        while remaining:
+            index, values = min(((index, values) for index in remaining for values in (geometries[index][1], geometries[index][1][::-1])), key=lambda entry: math.dist(position, entry[1][0]))
+            remaining.remove(index)
+            expected.append((geometries[index][0], values))
+            position = values[-1]
+        #end while
+        self.assertEqual(scan_order.order_geometries(geometries, time_limit=0), expected)
+        self.assertEqual(scan_order.order_geometries(geometries, reverse=False, time_limit=0)[0][1], min(geometries, key=lambda geometry: math.dist((0.0, 0.0, 0.0), geometry[1][0]))[1])
+    #end def
+    def test_crowded(self):
+        '''
+        Geometries sharing a start point and crowded into a tiny area are still ordered by the greedy tour
+        '''
+        rng = np.random.default_rng(1)
+        geometries = [(f'LINE:{index}', [(0.0, 0.0, 0.0), (x, y, 0.0)]) for index, (x, y) in enumerate((rng.random((300, 2))*200 - 100).tolist())]
+        geometries += [(f'POINT:{index}', [(x, y, 0.0)]) for index, (x, y) in enumerate((rng.random((300, 2))*1e-3 + 50).tolist(), 300)]
+
+        # Every step moves to the closest entry point of an unvisited geometry
+        position, remaining = (0.0, 0.0, 0.0), {geometry[0]: geometry[1] for geometry in geometries}
+        for name, values in scan_order.order_geometries(geometries, time_limit=0):
+            closest = min(math.dist(position, point) for other in remaining.values() for point in ((other[0], other[-1]) if len(other) > 1 else other))
+            self.assertAlmostEqual(math.dist(position, values[0]), closest)
+            self.assertIn(values, [remaining[name], remaining[name][::-1]])
+            del remaining[name]
+            position = values[-1]
+        #end for
+        self.assertFalse(remaining)
+    #end def
+    def test_improvement(self):
+        '''
+        Improving keeps every geometry once, never scans arcs backwards and reports shorter travel
+        '''
+        geometries = importer.import_file('Test Files/Complex Arcs.dxf',['LINE'],convert=True) + importer.import_dxf_file('Test Files/Complex Arcs.dxf') + importer.import_dxf_file('Test Files/Complex Points.dxf')
+        geometries = geometries[::-1]
+        sources, report = [], {}
+        ordered = scan_order.order_geometries(geometries, time_limit=0.5, sources=sources, report=report)
+        self.assertEqual(sorted(sources), list(range(len(geometries))))
+        for geometry, source in zip(ordered, sources):
+            self.assertIn(geometry[1], [geometries[source][1], geometries[source][1][::-1] if geometry[0].startswith('LINE') else None])
+        self.assertLess(report['travel_after'], report['travel_before'])
+        self.assertAlmostEqual(report['travel_after'], scan_order.travel_length(ordered))
+        self.assertLessEqual(report['travel_after'], scan_order.travel_length(scan_order.order_geometries(geometries, time_limit=0)) + 1e-6)
+        self.assertEqual(scan_order.order_geometries(GeometryBatch.from_list(geometries), time_limit=0).to_list(), GeometryBatch.from_list(scan_order.order_geometries(geometries, time_limit=0)).to_list())
+    #end def
+
+class Spatial_Index_Tests(unittest.TestCase):
+    '''
+    Tests for geometry bounds and SpatialIndex queries
+    '''
+    def test_bounds(self):
+        '''
+        Bounding boxes contain the points of the converted geometries and are tight for arcs, ellipses and polylines
+        '''
+        for name in ['Complex Arcs','Complex Circles','Basic Ellipse','Basic LWPolyline','Basic Spline','Complex Lines']:
+            geometries = importer.import_dxf_file(f'Test Files/{name}.dxf')
+            bounds = spatial_index.geometry_bounds(geometries)
+            for geometry, geometry_bounds in zip(geometries, bounds):
+                geometry_type = geometry[0].split(':')[0]
+                points = np.array([point[1][0][:2] for point in geometry_to_line.convert_to(geometry_type,'POINT',[geometry],max_deviation=0.01)])
+                self.assertTrue(np.all(points.min(axis=0) >= geometry_bounds[0:2] - 1e-6) and np.all(points.max(axis=0) <= geometry_bounds[2:4] + 1e-6))
+                if geometry_type != 'SPLINE':
+                    np.testing.assert_allclose(np.concatenate([points.min(axis=0), points.max(axis=0)]), geometry_bounds, atol=0.02)
+            #end for
+        #end for
+        np.testing.assert_allclose(spatial_index.geometry_bounds([('ARC:0', [(0.0, 0.0, 0.0), (1.0, 300.0, 60.0)])]), [[0.5, -math.sqrt(3)/2, 1.0, math.sqrt(3)/2]])
+    #end def
+    def test_queries(self):
+        '''
+        Window, radius and nearest queries match checking every bounding box, also after inserting geometries
+        '''
+        rng = np.random.default_rng(0)
+        geometries = [(f'LINE:{index}', [(x, y, 0.0), (x + dx, y + dy, 0.0)]) for index, (x, y, dx, dy) in enumerate((rng.random((2000, 4))*[1e4, 1e4, 200, 200]).tolist())]
+        geometries += importer.import_dxf_file('Test Files/Complex Circles.dxf') + [('LINE:2000', [(0.0, 0.0, 0.0), (1e4, 1e4, 0.0)])]
+        index = spatial_index.SpatialIndex(geometries[:1000])
+        index.extend(GeometryBatch.from_list(geometries[1000:1500]))
+        for geometry in geometries[1500:]:
+            index.insert(geometry)
+        self.assertEqual(len(index), len(geometries))
+
+        bounds = spatial_index.geometry_bounds(geometries)
+        for x, y, size in (rng.random((100, 3))*[1e4, 1e4, 1e3]).tolist():
+            self.assertEqual(index.query(x, y, x + size, y + size), np.flatnonzero((bounds[:, 0] <= x + size) & (bounds[:, 2] >= x) & (bounds[:, 1] <= y + size) & (bounds[:, 3] >= y)).tolist())
+            distances = np.hypot(np.maximum(np.maximum(bounds[:, 0] - x, x - bounds[:, 2]), 0), np.maximum(np.maximum(bounds[:, 1] - y, y - bounds[:, 3]), 0))
+            self.assertEqual(index.radius(x, y, size), np.flatnonzero(distances <= size).tolist())
+            np.testing.assert_allclose(distances[index.nearest(x, y, 3)], np.sort(distances)[:3])
+        #end for
+    #end def
+
+class Tiling_Tests(unittest.TestCase):
+    '''
+    Tests for partitioning geometries into tiles
+    '''
+    def test_cut(self):
+        '''
+        Lines are clipped and arcs split at tile borders, the parts cover the given geometries once
+        '''
+        geometries = [('LINE:0', [(-5.0, 5.0, 0.0), (25.0, 5.0, 3.0)]), ('ARC:1', [(0.0, 0.0, 0.0), (10.0, 0.0, 360.0)]), ('POINT:2', [(10.0, 10.0, 0.0)])]
+        tiles = tiling.partition(geometries, 10, 10, origin=(0.0, 0.0))
+        self.assertEqual(list(tiles), [(-5.0, -5.0), (5.0, -5.0), (-5.0, 5.0), (5.0, 5.0), (15.0, 5.0), (25.0, 5.0), (15.0, 15.0)])
+        self.assertEqual(tiles[(-5.0, 5.0)][0], ('LINE:0', [(0.0, 0.0, 0.0), (5.0, 0.0, 0.5)]))
+        self.assertEqual(tiles[(25.0, 5.0)][0], ('LINE:0', [(-5.0, 0.0, 2.5), (0.0, 0.0, 3.0)]))
+        self.assertEqual(tiles[(15.0, 15.0)], [('POINT:2', [(-5.0, -5.0, 0.0)])])
+
+        # Quarter circles in each tile around the center
+        arcs = [geometry for tile in tiles.values() for geometry in tile if geometry[0] == 'ARC:1']
+        self.assertEqual(sorted(round((arc[1][1][2] - arc[1][1][1]) % 360, 9) for arc in arcs), [90.0]*4)
+        self.assertEqual(tiles[(5.0, 5.0)][-1], ('ARC:1', [(-5.0, -5.0, 0.0), (10.0, 0.0, 90.0)]))
+    #end def
+    def test_whole_and_converted(self):
+        '''
+        Geometries within the overlap stay whole, cut ellipses and polylines become arcs and lines of the same length
+        '''
+        arcs = importer.import_dxf_file('Test Files/Complex Arcs.dxf')
+        whole = tiling.partition(arcs, 100000, 100000, overlap=100000)
+        self.assertEqual(sum(len(tile) for tile in whole.values()), len(arcs))
+
+        geometries = importer.import_dxf_file('Test Files/Basic LWPolyline.dxf') + importer.import_dxf_file('Test Files/Basic Ellipse.dxf')
+        tiles = tiling.partition(geometries, 7000, 7000, max_deviation=1)
+        parts = [geometry for tile in tiles.values() for geometry in tile]
+        self.assertTrue(all(geometry[0].split(':')[0] in ('LINE', 'ARC') for geometry in parts))
+        length = sum(math.dist(values[0][:2], values[1][:2]) if name.startswith('LINE') else values[1][0]*math.radians((values[1][2] - values[1][1]) % 360) for name, values in parts)
+        converted = geometry_to_line.convert_to('LWPOLYLINE','ARC',geometries[:1]) + geometry_to_line.convert_to('ELLIPSE','ARC',geometries[1:],max_deviation=1)
+        self.assertAlmostEqual(length, sum(math.dist(values[0][:2], values[1][:2]) if name.startswith('LINE') else values[1][0]*math.radians((values[1][2] - values[1][1]) % 360) for name, values in converted), 3)
+        for (center_x, center_y), tile in tiles.items():
+            tile_bounds = spatial_index.geometry_bounds(tile)
+            self.assertTrue(np.all(tile_bounds[:, 0:2] >= -3500 - 1e-6) and np.all(tile_bounds[:, 2:4] <= 3500 + 1e-6))
+        self.assertEqual({key: tile.to_list() for key, tile in tiling.partition(GeometryBatch.from_list(geometries), 7000, 7000, max_deviation=1).items()}, {key: GeometryBatch.from_list(tile).to_list() for key, tile in tiles.items()})
+    #end def
+    def test_rotated_ellipse(self):
+        '''
+        Cut ellipses with a rotated major axis become arcs on the ellipse
+        '''
+        tiles = tiling.partition([('ELLIPSE:0', [(0.0, 0.0, 0.0), (0.0, 3000.0, 0.0), (0.2,)])], 1000, 1000, max_deviation=1)
+        parts = [(center, geometry) for center, tile in tiles.items() for geometry in tile]
+        self.assertTrue(parts)
+        for (center_x, center_y), (name, values) in parts:
+            self.assertEqual(name, 'ARC:0')
+            radius, start_angle, end_angle = values[1]
+            for angle in (start_angle, start_angle + ((end_angle - start_angle) % 360)/2, end_angle):
+                x = center_x + values[0][0] + radius*math.cos(math.radians(angle))
+                y = center_y + values[0][1] + radius*math.sin(math.radians(angle))
+                # Vertical major axis of 3000 and minor axis of 600
+                self.assertAlmostEqual(math.hypot(x/600, y/3000), 1, delta=2/600)
+            #end for
+        #end for
+    #end def
+    def test_txt_points(self):
+        '''
+        Bare TXT points are partitioned like list points
+        '''
+        geometries = importer.import_txt_file('Test Files/text_3d.txt')
+        tiles = tiling.partition(geometries, 1000, 1000)
+        parts = [(center, geometry) for center, tile in tiles.items() for geometry in tile]
+        self.assertEqual(len(parts), len(geometries))
+        for ((center_x, center_y), (name, point)), (original_name, original) in zip(parts, geometries):
+            self.assertEqual(name, original_name)
+            self.assertTrue(np.allclose((point[0] + center_x, point[1] + center_y, point[2]), original))
+        #end for
+    #end def
+
+class DXF_Engine_Tests(unittest.TestCase):
+    '''
+    Tests for the fast DXF import engine
+    '''
+    def test_unknown_engine(self):
+        '''
+        Unknown engine throws error
+        '''
+        self.assertRaises(Exception, lambda: importer.import_dxf_file('Test Files/Basic Line.dxf', engine='unknown'))
+    #end def
+    def test_same_as_ezdxf(self):
+        '''
+        Fast engine matches the ezdxf engine, including the fall back for ELLIPSE and SPLINE
+        '''
+        for name in ['Basic Point','Complex Points','Complex Lines','Complex Circles','Complex Arcs','Basic LWPolyline','Complex Ellipses','Basic Spline']:
+            filename = f'Test Files/{name}.dxf'
+            self.assertEqual(importer.import_dxf_file(filename, engine='fast'), importer.import_dxf_file(filename))
+        self.assertEqual(importer.import_dxf_file('Test Files/Basic Arc.dxf',['LINE'],True,engine='fast'), importer.import_dxf_file('Test Files/Basic Arc.dxf',['LINE'],True))
+    #end def
+
+class Batch_Tests(unittest.TestCase):
+    '''
+    Tests for the columnar GeometryBatch format
+    '''
+    def test_round_trip(self):
+        '''
+        Every DXF test file survives TGeometryList -> GeometryBatch -> TGeometryList unchanged
+        '''
+        for name in ['Basic Point','Complex Lines','Complex Circles','Complex Arcs','Complex Ellipses','Basic Spline','Basic LWPolyline']:
+            geometries = importer.import_dxf_file(f'Test Files/{name}.dxf')
+            self.assertEqual(GeometryBatch.from_list(geometries).to_list(), geometries)
+    #end def
+    def test_round_trip_2d(self):
+        '''
+        2D coordinates and nameless geometry survive the round trip and save/load unchanged
+        '''
+        geometries = [
+            ('POINT',[(1.0,2.0)]),
+            ('POINT:1',[(1.0,2.0,3.0)]),
+            ('LINE:2',[(1.0,2.0),(3.0,4.0,5.0)]),
+            ('ARC:3',[(1.0,2.0),(1.0,0.0,90.0)]),
+            ('ELLIPSE',[(1.0,2.0),(3.0,0.0),(0.5,)]),
+        ]
+        batch = GeometryBatch.from_list(geometries)
+        self.assertEqual(batch.to_list(), geometries)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'batch.npz')
+            batch.save(path)
+            self.assertEqual(GeometryBatch.load(path).to_list(), geometries)
+        #end with
+    #end def
+    def test_import_as_batch(self):
+        '''
+        Importers return a GeometryBatch holding the same geometries
+        '''
+        batch = importer.import_file('Test Files/test.csv', as_batch=True)
+        self.assertIsInstance(batch, GeometryBatch)
+        self.assertEqual(batch.to_list(), importer.import_csv_file('Test Files/test.csv'))
+        self.assertEqual(batch.points.shape, (1,3))
+        self.assertEqual(batch.lines.shape, (1,2,3))
+
+        batch = importer.import_dxf_file('Test Files/Complex Circles.dxf', as_batch=True)
+        self.assertEqual(batch.count('ARC'), 10)
+        self.assertEqual(batch.arcs.shape, (10,6))
+    #end def
+    def test_convert_batch(self):
+        '''
+        Conversion functions accept and return a GeometryBatch
+        '''
+        geometries = importer.import_dxf_file('Test Files/Basic Arc.dxf')
+        converted = geometry_to_line.convert_to('ARC','POINT',GeometryBatch.from_list(geometries))
+        self.assertIsInstance(converted, GeometryBatch)
+        self.assertEqual(converted.to_list(), geometry_to_line.convert_to('ARC','POINT',geometries))
+    #end def
+
 # Verification functions
+def point_line_distance(point: Tuple[float, ...], start: Tuple[float, ...], end: Tuple[float, ...]) -> float:
+    '''
+    Distance between a point and a line segment
+
+    Args:
+        point (Tuple[float, ...]): Point (X,Y,Z)
+        start (Tuple[float, ...]): Start of the line (X,Y,Z)
+        end (Tuple[float, ...]): End of the line (X,Y,Z)
+
+    Returns:
+        float: Shortest distance between the point and the line
+    '''
+    direction = [end[index] - start[index] for index in range(3)]
+    length = sum(value*value for value in direction)
+    along = 0 if length == 0 else max(0, min(1, sum((point[index] - start[index])*direction[index] for index in range(3))/length))
+    return math.dist(point, [start[index] + along*direction[index] for index in range(3)])
+#end def
 
 def within_a_percent_tuple(tuple1: tuple[float,...], tuple2: tuple[float,...]) -> bool:
     '''
@@ -0,0 +1,561 @@
+'''
+Ordering of geometries to minimize travel between them
+
+Geometries are ordered with a greedy nearest neighbour tour over a grid of their entry points, with crowded cells split
+into grids of their own, which is then improved with 2-opt and Or-opt moves between geometries close together in the
+tour until a time limit is reached.
+'''
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from geometry_batch import GeometryBatch
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
+TGeometryList = List[TGeometryItem]
+
+# Number of tour positions between the ends of the 2-opt and Or-opt moves that are tried
+IMPROVE_WINDOW = 16
+
+# Longest run of geometries moved at once by Or-opt
+OR_OPT_LENGTH = 3
+
+# Average number of entry points per grid cell of the nearest neighbour search
+GRID_CELL_POINTS = 2
+
+# Most entry points of a grid cell before the cell is split into a grid of its own
+GRID_MAX_CELL_POINTS = 32
+
+# Geometry types that may be scanned backwards
+REVERSIBLE_TYPES = ('LINE',)
+
+def _xyz(point: Tuple[float, ...]) -> Tuple[float, float, float]:
+    '''
+    Summary:
+        Pad a point to 3D
+    Args:
+        point (Tuple[float, ...]): Point (X,Y) or (X,Y,Z)
+    Returns:
+        Tuple[float, float, float]: Point (X,Y,Z)
+    '''
+
+    return tuple(point[:3]) + (0.0,)*(3-len(point[:3]))
+#end def
+
+def geometry_endpoints(geometry: TGeometryItem) -> Tuple[Tuple[float, float, float], Tuple[float, float, float]]:
+    '''
+    Summary:
+        Point where scanning a geometry starts and ends
+        NOTE Ellipses start and end at their major axis endpoint, splines at their first and last control point
+    Args:
+        geometry (TGeometryItem): Given geometry
+    Raises:
+        Exception: Unknown geometry type
+    Returns:
+        Tuple[Tuple[float, float, float], Tuple[float, float, float]]: Start and end point (X,Y,Z)
+    '''
+
+    name: str = geometry[0].split(':')[0].upper()
+    values = geometry[1]
+
+    if name == 'POINT':
+        # TXT points are a bare tuple
+        point = _xyz(values if not isinstance(values[0], (tuple, list)) else values[0])
+        return point, point
+
+    elif name == 'LINE':
+        return _xyz(values[0]), _xyz(values[1])
+
+    elif name == 'ARC':
+        center = _xyz(values[0])
+        radius, start_angle, end_angle = values[1][:3]
+        start = (center[0] + radius*math.cos(math.radians(start_angle)), center[1] + radius*math.sin(math.radians(start_angle)), center[2])
+        end = (center[0] + radius*math.cos(math.radians(end_angle)), center[1] + radius*math.sin(math.radians(end_angle)), center[2])
+        return start, end
+
+    elif name == 'ELLIPSE':
+        center, major_axis = _xyz(values[0]), _xyz(values[1])
+        point = (center[0] + major_axis[0], center[1] + major_axis[1], center[2] + major_axis[2])
+        return point, point
+
+    elif name == 'SPLINE':
+        return _xyz(values[1]), _xyz(values[values[0][2]])
+
+    elif name == 'LWPOLYLINE':
+        # Closed polylines end at their first vertex
+        first = (values[0][0], values[0][1], 0.0)
+        return first, first if values[-1] else (values[-2][0], values[-2][1], 0.0)
+
+    else:
+        raise Exception(f'Unknown geometry type {name}')
+    #end if
+#end def
+
+def travel_length(
+    given_geometry: TGeometryList,
+    start_point: Optional[Tuple[float, ...]] = (0.0, 0.0, 0.0)) -> float:
+    '''
+    Summary:
+        Total distance travelled between geometries when scanning them in order
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries
+        start_point (Tuple[float, ...], optional): Position before the first geometry, None starts at the first geometry. Defaults to (0,0,0).
+    Returns:
+        float: Travel length in the units of the geometries
+    '''
+
+    if isinstance(given_geometry, GeometryBatch):
+        given_geometry = given_geometry.to_list()
+
+    endpoints = [geometry_endpoints(geometry) for geometry in given_geometry]
+    if not endpoints:
+        return 0.0
+    starts = np.array([endpoint[0] for endpoint in endpoints], dtype=np.float64)
+    ends = np.array([endpoint[1] for endpoint in endpoints], dtype=np.float64)
+
+    # Travel from the start point, then from the end of every geometry to the start of the next
+    travel = float(np.linalg.norm(ends[:-1] - starts[1:], axis=1).sum())
+    if start_point is not None:
+        travel += float(np.linalg.norm(starts[0] - np.array(_xyz(start_point))))
+    return travel
+#end def
+
+class _EntryGrid:
+    '''
+    Uniform grid of entry points for the nearest neighbour search, cells holding more than GRID_MAX_CELL_POINTS entry
+    points are split into grids of their own so crowded areas are searched like sparse ones
+    '''
+
+    def __init__(
+        self,
+        slots: np.ndarray,
+        slot_points: np.ndarray,
+        slot_cells: List[Optional[List[int]]],
+        slot_grids: List[Optional[List['_EntryGrid']]],
+        parents: Optional[List['_EntryGrid']] = None):
+        '''
+        Summary:
+            Bucket entry points into cells, entry points of every cell are held in a list or a nested grid
+        Args:
+            slots (np.ndarray): (N,) indices of the entry points in slot_points
+            slot_points (np.ndarray): (M,3) all entry points
+            slot_cells (List[Optional[List[int]]]): Filled with the cell list holding every entry point
+            slot_grids (List[Optional[List[_EntryGrid]]]): Filled with the grids holding every entry point, outermost first
+            parents (Optional[List[_EntryGrid]], optional): Grids around this grid, outermost first. Defaults to None.
+        '''
+
+        points = slot_points[slots, :2]
+        self.lower = points.min(axis=0)
+        self.upper = points.max(axis=0)
+        extent = self.upper - self.lower
+        self.cell_size = math.sqrt(max(extent[0]*extent[1], max(extent)**2/len(slots), 1e-12)*GRID_CELL_POINTS/len(slots))
+        self.num_cells = (np.floor(extent/self.cell_size).astype(np.int64) + 1).tolist()
+
+        # Number of entry points left in the grid
+        self.count = len(slots)
+
+        # Group entry points by cell
+        grids = (parents or []) + [self]
+        cells = np.floor((points - self.lower)/self.cell_size).astype(np.int64)
+        cell_keys = cells[:, 0]*self.num_cells[1] + cells[:, 1]
+        order = np.argsort(cell_keys, kind='stable')
+        sorted_keys = cell_keys[order]
+        starts = np.flatnonzero(np.append(True, sorted_keys[1:] != sorted_keys[:-1]))
+        self.cells: Dict[int, Union[List[int], _EntryGrid]] = {}
+        for start, end in zip(starts.tolist(), np.append(starts[1:], len(order)).tolist()):
+            members = slots[order[start:end]]
+
+            # Split crowded cells, unless all entry points of this grid fell into the cell
+            if GRID_MAX_CELL_POINTS < len(members) < len(slots):
+                self.cells[int(sorted_keys[start])] = _EntryGrid(members, slot_points, slot_cells, slot_grids, grids)
+                continue
+            #end if
+            cell = members.tolist()
+            self.cells[int(sorted_keys[start])] = cell
+            for slot in cell:
+                slot_cells[slot] = cell
+                slot_grids[slot] = grids
+            #end for
+        #end for
+    #end def
+
+    def nearest(
+        self,
+        position: List[float],
+        slot_points: List[List[float]],
+        best_slot: int,
+        best_distance: float,
+        max_ring: Optional[int] = None) -> Tuple[int, float, bool]:
+        '''
+        Summary:
+            Closest entry point to a position closer than best_distance, searching rings of cells around the position
+        Args:
+            position (List[float]): Position (X,Y,Z)
+            slot_points (List[List[float]]): All entry points
+            best_slot (int): Closest entry point found so far, -1 for none
+            best_distance (float): Distance to best_slot
+            max_ring (int, optional): Largest ring of cells searched, None searches the whole grid. Defaults to None.
+        Returns:
+            Tuple[int, float, bool]: Closest entry point, its distance and False if max_ring stopped the search early
+        '''
+
+        # Positions outside the grid start at its closest cell, the rings stay lower bounds of the distance
+        cell_x = min(max(int((position[0] - self.lower[0])//self.cell_size), 0), self.num_cells[0] - 1)
+        cell_y = min(max(int((position[1] - self.lower[1])//self.cell_size), 0), self.num_cells[1] - 1)
+        last_ring = max(self.num_cells) if max_ring is None else min(max_ring, max(self.num_cells))
+
+        # Search rings of cells around the position until no closer entry point can be outside them
+        ring = 0
+        while (ring - 1)*self.cell_size < best_distance and ring <= last_ring:
+            for x in range(cell_x - ring, cell_x + ring + 1):
+                if x < 0 or x >= self.num_cells[0]:
+                    continue
+                step = 2*ring if ring and x not in (cell_x - ring, cell_x + ring) else 1
+                for y in range(cell_y - ring, cell_y + ring + 1, step):
+                    if y < 0 or y >= self.num_cells[1]:
+                        continue
+                    cell = self.cells.get(x*self.num_cells[1] + y)
+                    if not cell:
+                        continue
+
+                    # Search nested grids that may hold a closer entry point
+                    if isinstance(cell, _EntryGrid):
+                        if cell.count and cell.box_distance(position) < best_distance:
+                            best_slot, best_distance, _ = cell.nearest(position, slot_points, best_slot, best_distance)
+                        continue
+                    #end if
+                    for slot in cell:
+                        distance = math.dist(position, slot_points[slot])
+                        if distance < best_distance:
+                            best_slot, best_distance = slot, distance
+                    #end for
+                #end for
+            #end for
+            ring += 1
+        #end while
+        return best_slot, best_distance, (ring - 1)*self.cell_size >= best_distance or ring > max(self.num_cells)
+    #end def
+
+    def box_distance(self, position: List[float]) -> float:
+        '''
+        Summary:
+            Distance in XY between a position and the bounds of the grid, no entry point of the grid is closer
+        Args:
+            position (List[float]): Position (X,Y,Z)
+        Returns:
+            float: Distance, 0 inside the bounds
+        '''
+
+        return math.hypot(
+            max(self.lower[0] - position[0], 0.0, position[0] - self.upper[0]),
+            max(self.lower[1] - position[1], 0.0, position[1] - self.upper[1])
+        )
+    #end def
+#end class
+
+def _nearest_neighbour_tour(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    reversible: np.ndarray,
+    start_point: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Greedy tour always moving to the closest unvisited geometry
+        NOTE Entry points at the same position share one slot of an _EntryGrid searched in growing rings, when the rings
+        get larger than the number of unvisited entry points the remaining entry points are searched directly. Visited
+        entry points and slots are swap-removed, so every step only touches the cells around the position
+    Args:
+        starts (np.ndarray): (N,3) start points of the geometries
+        ends (np.ndarray): (N,3) end points of the geometries
+        reversible (np.ndarray): (N,) True for geometries that may be scanned from their end point
+        start_point (np.ndarray): (3,) position before the first geometry
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N,) geometry index and (N,) True for reversed geometries in tour order
+    '''
+
+    num_geometries = len(starts)
+
+    # Entry points, reversible geometries can also be entered at their end
+    reversed_geometries = np.flatnonzero(reversible)
+    entries = np.concatenate([starts, ends[reversed_geometries]])
+    entry_geometries = np.concatenate([np.arange(num_geometries), reversed_geometries])
+    exits = np.concatenate([ends, starts[reversed_geometries]])
+    end_entries = np.full(num_geometries, -1, dtype=np.int64)
+    end_entries[reversed_geometries] = np.arange(num_geometries, len(entries))
+
+    # Entry points at the same position share a slot, the first entry point is taken first
+    slot_points, entry_slots = np.unique(entries, axis=0, return_inverse=True)
+    entry_slots = entry_slots.reshape(-1)
+    slot_entries: List[List[int]] = [[] for _ in range(len(slot_points))]
+    entry_positions: List[int] = [0]*len(entries)
+    for entry, slot in reversed(list(enumerate(entry_slots.tolist()))):
+        entry_positions[entry] = len(slot_entries[slot])
+        slot_entries[slot].append(entry)
+    #end for
+
+    # Grid of slots, with the cell and the grids holding every slot
+    slot_cells: List[Optional[List[int]]] = [None]*len(slot_points)
+    slot_grids: List[Optional[List[_EntryGrid]]] = [None]*len(slot_points)
+    grid = _EntryGrid(np.arange(len(slot_points)), slot_points, slot_cells, slot_grids)
+
+    slot_point_list = slot_points.tolist()
+    entry_slot_list = entry_slots.tolist()
+    end_entry_list = end_entries.tolist()
+    visited = np.zeros(num_geometries, dtype=bool)
+    remaining = np.arange(len(entries))
+    tour_entries: List[int] = []
+    position = start_point.tolist()
+
+    for _ in range(num_geometries):
+        best_slot, best_distance, complete = grid.nearest(position, slot_point_list, -1, math.inf, int((math.sqrt(4*len(remaining)) + 1)//2))
+
+        # Search unvisited entry points directly once the rings are too large
+        if complete:
+            best_entry = slot_entries[best_slot][-1]
+        else:
+            remaining = remaining[~visited[entry_geometries[remaining]]]
+            best_entry = int(remaining[np.argmin(np.linalg.norm(entries[remaining] - np.array(position), axis=1))])
+        #end if
+
+        tour_entries.append(best_entry)
+        geometry = int(entry_geometries[best_entry])
+        visited[geometry] = True
+        position = exits[best_entry].tolist()
+
+        # Swap-remove both entry points of the geometry, and their slots once empty
+        for entry in (geometry, end_entry_list[geometry]):
+            if entry < 0:
+                continue
+            slot = entry_slot_list[entry]
+            stack = slot_entries[slot]
+            last = stack.pop()
+            if last != entry:
+                stack[entry_positions[entry]] = last
+                entry_positions[last] = entry_positions[entry]
+            #end if
+            if stack:
+                continue
+
+            # Cells hold at most GRID_MAX_CELL_POINTS slots
+            cell = slot_cells[slot]
+            last = cell.pop()
+            if last != slot:
+                cell[cell.index(slot)] = last
+            for slot_grid in slot_grids[slot]:
+                slot_grid.count -= 1
+        #end for
+    #end for
+
+    tour_entries_array = np.array(tour_entries, dtype=np.int64)
+    return entry_geometries[tour_entries_array], tour_entries_array >= num_geometries
+#end def
+
+def _tour_points(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    start_point: np.ndarray,
+    tour: np.ndarray,
+    tour_reversed: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Entry and exit points of every tour position and the travel after it, position 0 is the start point
+    Args:
+        starts (np.ndarray): (N,3) start points of the geometries
+        ends (np.ndarray): (N,3) end points of the geometries
+        start_point (np.ndarray): (3,) position before the first geometry
+        tour (np.ndarray): (N,) geometry index in tour order
+        tour_reversed (np.ndarray): (N,) True for reversed geometries in tour order
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (N+1,3) entry points, (N+1,3) exit points and (N+2,) travel after every position, 0 after the last
+    '''
+
+    entries = np.concatenate([start_point[None], np.where(tour_reversed[:, None], ends[tour], starts[tour])])
+    exits = np.concatenate([start_point[None], np.where(tour_reversed[:, None], starts[tour], ends[tour])])
+    travel = np.concatenate([np.linalg.norm(exits[:-1] - entries[1:], axis=1), [0.0, 0.0]])
+    return entries, exits, travel
+#end def
+
+def _distances(
+    points: np.ndarray,
+    point_index: np.ndarray,
+    other_points: np.ndarray,
+    other_index: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Distances between points of two arrays, 0 where the other index is past the end of the tour
+    Args:
+        points (np.ndarray): (N+1,3) points
+        point_index (np.ndarray): (M,) index into points
+        other_points (np.ndarray): (N+1,3) other points
+        other_index (np.ndarray): (M,) index into other points
+    Returns:
+        np.ndarray: (M,) distances
+    '''
+
+    inside = other_index < len(other_points)
+    distances = np.zeros(len(point_index))
+    distances[inside] = np.linalg.norm(points[point_index[inside]] - other_points[other_index[inside]], axis=1)
+    return distances
+#end def
+
+def _improve_tour(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    flippable: np.ndarray,
+    start_point: np.ndarray,
+    tour: np.ndarray,
+    tour_reversed: np.ndarray,
+    time_limit: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Summary:
+        Improve a tour with 2-opt moves reversing runs of geometries and Or-opt moves shifting runs of up to OR_OPT_LENGTH geometries
+        NOTE All moves of one kind and length are evaluated at once, the best moves not touching each other are applied
+    Args:
+        starts (np.ndarray): (N,3) start points of the geometries
+        ends (np.ndarray): (N,3) end points of the geometries
+        flippable (np.ndarray): (N,) True for geometries that may be scanned in both directions
+        start_point (np.ndarray): (3,) position before the first geometry
+        tour (np.ndarray): (N,) geometry index in tour order
+        tour_reversed (np.ndarray): (N,) True for reversed geometries in tour order
+        time_limit (float): Seconds to spend improving the tour
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Improved tour and reversed flags
+    '''
+
+    stop_time = time.perf_counter() + time_limit
+    num_positions = len(tour)
+    improved = True
+    while improved and time.perf_counter() < stop_time:
+        improved = False
+
+        # 2-opt reverses positions first to last, Or-opt moves first to last behind or in front of other positions
+        moves = [('2-opt', length, 0) for length in range(1, IMPROVE_WINDOW + 1)]
+        moves += [('or-opt', length, shift) for length in range(1, OR_OPT_LENGTH + 1) for shift in range(-IMPROVE_WINDOW, IMPROVE_WINDOW + 1) if shift]
+        for kind, length, shift in moves:
+            if time.perf_counter() >= stop_time:
+                break
+            entries, exits, travel = _tour_points(starts, ends, start_point, tour, tour_reversed)
+
+            # Positions of the moved run (position 0 is the start point)
+            first = np.arange(1, num_positions - length + 2)
+            last = first + length - 1
+            if kind == '2-opt':
+                # Only runs of geometries scanned in both directions can be reversed
+                fixed = np.concatenate([[0], np.cumsum(~flippable[tour])])
+                first = first[fixed[last] == fixed[first - 1]]
+                last = first + length - 1
+                gains = travel[first - 1] + travel[last] - _distances(exits, first - 1, exits, last) - _distances(entries, first, entries, last + 1)
+                low, high = first - 1, last + 1
+            else:
+                # Insert the run between target and target + 1
+                target = last + shift if shift > 0 else first - 1 + shift
+                inside = (target >= 0) & (target <= num_positions)
+                first, last, target = first[inside], last[inside], target[inside]
+                removed = travel[first - 1] + travel[last] + travel[target] - _distances(exits, first - 1, entries, last + 1)
+                added = _distances(exits, target, entries, first) + _distances(exits, last, entries, target + 1)
+                gains = removed - added
+                low, high = np.minimum(first - 1, target), np.maximum(last + 1, target + 1)
+            #end if
+
+            # Apply the best improving moves that do not touch each other
+            improving = np.flatnonzero(gains > 1e-9*(1 + travel.max()))
+            if not len(improving):
+                continue
+            improved = True
+            used = np.zeros(num_positions + 2, dtype=bool)
+            for move in improving[np.argsort(-gains[improving])].tolist():
+                if used[low[move]:high[move] + 1].any():
+                    continue
+                used[low[move]:high[move] + 1] = True
+
+                # Tour positions are one less than move positions
+                move_first, move_last = first[move] - 1, last[move]
+                if kind == '2-opt':
+                    tour[move_first:move_last] = tour[move_first:move_last][::-1]
+                    tour_reversed[move_first:move_last] = ~tour_reversed[move_first:move_last][::-1]
+                elif shift > 0:
+                    move_target = target[move]
+                    tour[move_first:move_target] = np.concatenate([tour[move_last:move_target], tour[move_first:move_last]])
+                    tour_reversed[move_first:move_target] = np.concatenate([tour_reversed[move_last:move_target], tour_reversed[move_first:move_last]])
+                else:
+                    move_target = target[move]
+                    tour[move_target:move_last] = np.concatenate([tour[move_first:move_last], tour[move_target:move_first]])
+                    tour_reversed[move_target:move_last] = np.concatenate([tour_reversed[move_first:move_last], tour_reversed[move_target:move_first]])
+                #end if
+            #end for
+        #end for
+    #end while
+    return tour, tour_reversed
+#end def
+
+def order_geometries(
+    given_geometry: TGeometryList,
+    reverse: bool = True,
+    start_point: Optional[Tuple[float, ...]] = (0.0, 0.0, 0.0),
+    time_limit: float = 1.0,
+    sources: Optional[List[int]] = None,
+    report: Optional[Dict[str, float]] = None) -> TGeometryList:
+    '''
+    Summary:
+        Reorder geometries to shorten the travel between them, with a nearest neighbour tour improved by 2-opt and Or-opt
+        NOTE Only lines are reversed, arcs can not be stored clockwise. Geometries keep their names
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries
+        reverse (bool, optional): Allow scanning lines from their end point, reversed lines swap their start and end. Defaults to True.
+        start_point (Tuple[float, ...], optional): Position before the first geometry, None starts at the first given geometry. Defaults to (0,0,0).
+        time_limit (float, optional): Seconds to spend improving the nearest neighbour tour, 0 returns the nearest neighbour tour. Defaults to 1.0.
+        sources (List[int], optional): If passed, the index of the given geometry at every returned position is appended to it.
+        report (Dict[str, float], optional): If passed, 'travel_before' and 'travel_after' are set to the travel length of the given and returned order.
+    Raises:
+        Exception: Unknown geometry type
+    Returns:
+        TGeometryList: Reordered geometries, a GeometryBatch if one was given
+    '''
+
+    # Accept columnar batches and return the same format
+    if isinstance(given_geometry, GeometryBatch):
+        return GeometryBatch.from_list(order_geometries(given_geometry.to_list(), reverse, start_point, time_limit, sources, report))
+
+    if not given_geometry:
+        if report is not None:
+            report.update(travel_before=0.0, travel_after=0.0)
+        return []
+    #end if
+
+    # Start and end points, geometries scanned from either end are reversible or start where they end
+    endpoints = [geometry_endpoints(geometry) for geometry in given_geometry]
+    starts = np.array([endpoint[0] for endpoint in endpoints], dtype=np.float64)
+    ends = np.array([endpoint[1] for endpoint in endpoints], dtype=np.float64)
+    reversible = np.array([reverse and geometry[0].split(':')[0].upper() in REVERSIBLE_TYPES for geometry in given_geometry]) & np.any(starts != ends, axis=1)
+    flippable = reversible | np.all(starts == ends, axis=1)
+
+    # Tour from the start point, or from the first geometry
+    if start_point is None:
+        first_point = starts[0]
+    else:
+        first_point = np.array(_xyz(start_point), dtype=np.float64)
+    tour, tour_reversed = _nearest_neighbour_tour(starts, ends, reversible, first_point)
+    if time_limit > 0:
+        tour, tour_reversed = _improve_tour(starts, ends, flippable, first_point, tour, tour_reversed, time_limit)
+
+    # Reversed lines swap their start and end, flipping geometries that start where they end changes nothing
+    ordered: TGeometryList = []
+    for geometry_index, geometry_reversed in zip(tour.tolist(), (tour_reversed & reversible[tour]).tolist()):
+        geometry = given_geometry[geometry_index]
+        if geometry_reversed:
+            geometry = (geometry[0], [geometry[1][1], geometry[1][0]] + list(geometry[1][2:]))
+        ordered.append(geometry)
+    #end for
+
+    if sources is not None:
+        sources.extend(tour.tolist())
+    if report is not None:
+        report['travel_before'] = travel_length(given_geometry, start_point)
+        report['travel_after'] = travel_length(ordered, start_point)
+    #end if
+    return ordered
+#end def
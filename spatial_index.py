@@ -0,0 +1,428 @@
+'''
+Spatial index over geometries for window, nearest and radius queries
+
+Geometries are stored by their XY bounding box in a uniform grid, every geometry is listed in each cell its bounding box
+touches. The grid is kept as a sorted array of cell keys, geometries inserted later are kept in a dictionary of cells
+until there are as many as in the sorted array and the grid is rebuilt.
+'''
+
+import math
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from geometry_batch import GEOMETRY_TYPES, GeometryBatch
+from geometry_to_line import _lwpolyline_segments
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
+TGeometryList = List[TGeometryItem]
+
+# Average number of geometries per grid cell
+GRID_CELL_GEOMETRIES = 4
+
+# Geometries touching more cells are kept in a list checked by every query instead
+MAX_GEOMETRY_CELLS = 64
+
+# Cell size in microns of indexes created without geometries or a cell size
+DEFAULT_CELL_SIZE = 1000.0
+
+# Smallest number of inserted geometries that causes the grid to be rebuilt
+MIN_REBUILD_GEOMETRIES = 1024
+
+# Cell coordinates are clamped to +-CELL_LIMIT so cell keys fit an int64
+CELL_LIMIT = 1 << 30
+
+def _arc_bounds(arcs: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Bounding boxes of arcs, including the points where arcs cross the X and Y axes through their centers
+    Args:
+        arcs (np.ndarray): (N,6) arcs [CENTER X,Y,Z, RADIUS, START ANGLE, END ANGLE] running counterclockwise
+    Returns:
+        np.ndarray: (N,4) bounding boxes [MIN X, MIN Y, MAX X, MAX Y]
+    '''
+
+    centers, radii = arcs[:, 0:2], arcs[:, 3:4]
+    start_angles, end_angles = arcs[:, 4], arcs[:, 5]
+
+    # Sweep of every arc, equal start and end angles make a full circle
+    sweeps = np.mod(end_angles - start_angles, 360)
+    sweeps[sweeps == 0] = 360
+
+    # End points and the quadrant points inside the sweep
+    angles = np.radians(np.stack([start_angles, end_angles, *[np.full(len(arcs), quadrant*90.0) for quadrant in range(4)]], axis=1))
+    inside = np.ones(angles.shape, dtype=bool)
+    inside[:, 2:] = np.mod(np.degrees(angles[:, 2:]) - start_angles[:, None], 360) <= sweeps[:, None]
+    x = np.where(inside, centers[:, 0:1] + radii*np.cos(angles), np.nan)
+    y = np.where(inside, centers[:, 1:2] + radii*np.sin(angles), np.nan)
+    return np.stack([np.nanmin(x, axis=1), np.nanmin(y, axis=1), np.nanmax(x, axis=1), np.nanmax(y, axis=1)], axis=1)
+#end def
+
+def _point_bounds(points: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Bounding boxes of runs of points
+    Args:
+        points (np.ndarray): (M,2+) points of all runs
+        offsets (np.ndarray): (N+1,) first point of every run, no run is empty
+    Returns:
+        np.ndarray: (N,4) bounding boxes [MIN X, MIN Y, MAX X, MAX Y]
+    '''
+
+    if len(offsets) < 2:
+        return np.zeros((0, 4))
+    return np.concatenate([np.minimum.reduceat(points[:, 0:2], offsets[:-1]), np.maximum.reduceat(points[:, 0:2], offsets[:-1])], axis=1)
+#end def
+
+def geometry_bounds(given_geometry: TGeometryList) -> np.ndarray:
+    '''
+    Summary:
+        XY bounding boxes of geometries
+        NOTE Arcs, ellipses and polyline bulges are bounded exactly, splines by their control points which contain the curve
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries
+    Raises:
+        Exception: Unknown geometry type
+    Returns:
+        np.ndarray: (N,4) bounding boxes [MIN X, MIN Y, MAX X, MAX Y] in given order
+    '''
+
+    batch = given_geometry if isinstance(given_geometry, GeometryBatch) else GeometryBatch.from_list(given_geometry)
+    bounds = np.zeros((len(batch.types), 4))
+
+    # POINT
+    bounds[batch.types == GEOMETRY_TYPES.index('POINT')] = np.concatenate([batch.points[:, 0:2], batch.points[:, 0:2]], axis=1)
+
+    # LINE
+    bounds[batch.types == GEOMETRY_TYPES.index('LINE')] = np.concatenate([batch.lines[:, :, 0:2].min(axis=1), batch.lines[:, :, 0:2].max(axis=1)], axis=1)
+
+    # ARC
+    bounds[batch.types == GEOMETRY_TYPES.index('ARC')] = _arc_bounds(batch.arcs)
+
+    # ELLIPSE, half extents of the major axis and the minor axis turned counterclockwise from it
+    centers, major_axes, ratios = batch.ellipses[:, 0:2], batch.ellipses[:, 3:5], batch.ellipses[:, 6:7]
+    minor_axes = ratios*np.stack([-major_axes[:, 1], major_axes[:, 0]], axis=1)
+    half_extents = np.hypot(major_axes, minor_axes)
+    bounds[batch.types == GEOMETRY_TYPES.index('ELLIPSE')] = np.concatenate([centers - half_extents, centers + half_extents], axis=1)
+
+    # SPLINE
+    bounds[batch.types == GEOMETRY_TYPES.index('SPLINE')] = _point_bounds(batch.spline_control_points, batch.spline_control_offsets)
+
+    # LWPOLYLINE, vertices and the arcs of bulged segments
+    polyline_bounds = _point_bounds(batch.lwpolyline_vertices, batch.lwpolyline_offsets)
+    if len(polyline_bounds):
+        is_arc, _, arcs, segment_polylines = _lwpolyline_segments(batch.lwpolyline_vertices, batch.lwpolyline_offsets, batch.lwpolyline_closed)
+        arc_bounds = _arc_bounds(arcs)
+        arc_polylines = segment_polylines[is_arc]
+        np.minimum.at(polyline_bounds[:, 0:2], arc_polylines, arc_bounds[:, 0:2])
+        np.maximum.at(polyline_bounds[:, 2:4], arc_polylines, arc_bounds[:, 2:4])
+    #end if
+    bounds[batch.types == GEOMETRY_TYPES.index('LWPOLYLINE')] = polyline_bounds
+
+    return bounds
+#end def
+
+def _box_distances(bounds: np.ndarray, x: float, y: float) -> np.ndarray:
+    '''
+    Summary:
+        Distances from a point to bounding boxes, 0 inside them
+    Args:
+        bounds (np.ndarray): (N,4) bounding boxes [MIN X, MIN Y, MAX X, MAX Y]
+        x (float): X of the point
+        y (float): Y of the point
+    Returns:
+        np.ndarray: (N,) distances
+    '''
+
+    dx = np.maximum(np.maximum(bounds[:, 0] - x, x - bounds[:, 2]), 0)
+    dy = np.maximum(np.maximum(bounds[:, 1] - y, y - bounds[:, 3]), 0)
+    return np.hypot(dx, dy)
+#end def
+
+def _cell_keys(cell_x: np.ndarray, cell_y: np.ndarray) -> np.ndarray:
+    '''
+    Summary:
+        Unique int64 key of grid cells
+    Args:
+        cell_x (np.ndarray): Cell X coordinates
+        cell_y (np.ndarray): Cell Y coordinates
+    Returns:
+        np.ndarray: Cell keys
+    '''
+
+    return (np.clip(cell_x, -CELL_LIMIT, CELL_LIMIT) + CELL_LIMIT)*(2*CELL_LIMIT + 1) + np.clip(cell_y, -CELL_LIMIT, CELL_LIMIT) + CELL_LIMIT
+#end def
+
+class SpatialIndex:
+    '''
+    Summary:
+        Uniform grid of the XY bounding boxes of geometries for window, nearest and radius queries
+        NOTE Queries return indexes into SpatialIndex.geometries, distances are to bounding boxes
+    '''
+
+    def __init__(
+        self,
+        geometries: Iterable[TGeometryItem] = (),
+        cell_size: float = 0):
+        '''
+        Summary:
+            Create an index of geometries
+        Args:
+            geometries (TGeometryList or GeometryBatch, optional): Geometries to index. Defaults to none.
+            cell_size (float, optional): Grid cell size in microns, 0 picks one from the geometries. Defaults to 0.
+        '''
+
+        self.geometries: TGeometryList = []
+        self._fixed_cell_size = cell_size
+        self.cell_size: float = cell_size or DEFAULT_CELL_SIZE
+        self._bounds = np.zeros((0, 4))
+
+        # Sorted cell keys with the geometry listed in every cell, geometries inserted since the last build by cell
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._entries = np.zeros(0, dtype=np.int64)
+        self._inserted: Dict[int, List[int]] = {}
+        self._num_inserted = 0
+
+        # Geometries touching more than MAX_GEOMETRY_CELLS cells
+        self._large = np.zeros(0, dtype=np.int64)
+
+        # Pick the cell size from the given geometries
+        self.extend(geometries)
+        if self.geometries:
+            self._build()
+    #end def
+
+    def __len__(self) -> int:
+        '''
+        Summary:
+            Number of indexed geometries
+        Returns:
+            int: Number of geometries
+        '''
+
+        return len(self.geometries)
+    #end def
+
+    @property
+    def bounds(self) -> np.ndarray:
+        '''
+        Summary:
+            Bounding boxes of all indexed geometries
+        Returns:
+            np.ndarray: (N,4) bounding boxes [MIN X, MIN Y, MAX X, MAX Y]
+        '''
+
+        return self._bounds[:len(self.geometries)]
+    #end def
+
+    def _cells(self, bounds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Summary:
+            Grid cells touched by bounding boxes
+        Args:
+            bounds (np.ndarray): (N,4) bounding boxes
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (N,2) first cell, (N,2) number of cells along X and Y and (N,) number of cells
+        '''
+
+        first_cells = np.floor(bounds[:, 0:2]/self.cell_size).astype(np.int64)
+        spans = np.floor(bounds[:, 2:4]/self.cell_size).astype(np.int64) - first_cells + 1
+        return first_cells, spans, spans[:, 0]*spans[:, 1]
+    #end def
+
+    def _build(self):
+        '''
+        Summary:
+            Rebuild the grid from the bounding boxes of all geometries
+        '''
+
+        bounds = self.bounds
+
+        # Cells about the size of the geometries holding a few geometries each
+        if not self._fixed_cell_size and len(bounds):
+            extent = bounds[:, 2:4].max(axis=0) - bounds[:, 0:2].min(axis=0)
+            sizes = np.median(np.max(bounds[:, 2:4] - bounds[:, 0:2], axis=1))
+            self.cell_size = max(math.sqrt(extent[0]*extent[1]*GRID_CELL_GEOMETRIES/len(bounds)), max(extent)/len(bounds), sizes) or DEFAULT_CELL_SIZE
+        #end if
+        first_cells, spans, counts = self._cells(bounds)
+
+        # Large geometries are checked by every query
+        large = counts > MAX_GEOMETRY_CELLS
+        self._large = np.flatnonzero(large)
+        counts[large] = 0
+
+        # One entry for every cell of every geometry
+        geometry_index = np.repeat(np.arange(len(bounds)), counts)
+        cell_index = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = first_cells[geometry_index, 0] + cell_index//spans[geometry_index, 1]
+        cell_y = first_cells[geometry_index, 1] + cell_index%spans[geometry_index, 1]
+        keys = _cell_keys(cell_x, cell_y)
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._entries = geometry_index[order]
+        self._inserted = {}
+        self._num_inserted = 0
+    #end def
+
+    def extend(self, geometries: Iterable[TGeometryItem]):
+        '''
+        Summary:
+            Add geometries to the index
+        Args:
+            geometries (TGeometryList or GeometryBatch): Geometries to add
+        Raises:
+            Exception: Unknown geometry type
+        '''
+
+        # Bounds of batches straight from their arrays
+        if isinstance(geometries, GeometryBatch):
+            new_bounds = geometry_bounds(geometries)
+            geometries = geometries.to_list()
+        else:
+            geometries = list(geometries)
+            new_bounds = geometry_bounds(geometries)
+        #end if
+        if not geometries:
+            return
+        first_index = len(self.geometries)
+        self.geometries.extend(geometries)
+
+        # Grow the bounding boxes by at least half
+        if len(self.geometries) > len(self._bounds):
+            grown = np.zeros((max(len(self.geometries), len(self._bounds)*3//2), 4))
+            grown[:first_index] = self._bounds[:first_index]
+            self._bounds = grown
+        #end if
+        self._bounds[first_index:len(self.geometries)] = new_bounds
+
+        # Rebuild once as many geometries were inserted as were built
+        if self._num_inserted + len(geometries) > max(MIN_REBUILD_GEOMETRIES, len(self._entries)):
+            self._build()
+            return
+        #end if
+
+        # List new geometries by cell
+        first_cells, spans, counts = self._cells(new_bounds)
+        large = counts > MAX_GEOMETRY_CELLS
+        self._large = np.concatenate([self._large, first_index + np.flatnonzero(large)])
+        for geometry_index in np.flatnonzero(~large).tolist():
+            cell_x, cell_y = first_cells[geometry_index]
+            span_x, span_y = spans[geometry_index]
+            keys = _cell_keys(np.repeat(np.arange(cell_x, cell_x + span_x), span_y), np.tile(np.arange(cell_y, cell_y + span_y), span_x))
+            for key in keys.tolist():
+                self._inserted.setdefault(key, []).append(first_index + geometry_index)
+        #end for
+        self._num_inserted += len(geometries)
+    #end def
+
+    def insert(self, geometry: TGeometryItem) -> int:
+        '''
+        Summary:
+            Add a geometry to the index
+        Args:
+            geometry (TGeometryItem): Geometry to add
+        Raises:
+            Exception: Unknown geometry type
+        Returns:
+            int: Index of the geometry
+        '''
+
+        self.extend([geometry])
+        return len(self.geometries) - 1
+    #end def
+
+    def _candidates(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        '''
+        Summary:
+            Geometries listed in the cells touched by a window
+        Args:
+            min_x, min_y, max_x, max_y (float): Window
+        Returns:
+            np.ndarray: Sorted unique geometry indexes, a superset of the geometries touching the window
+        '''
+
+        first_cells, spans, counts = self._cells(np.array([[min_x, min_y, max_x, max_y]], dtype=np.float64))
+
+        # Windows with more cells than geometries check every geometry
+        if counts[0] > len(self.geometries):
+            return np.arange(len(self.geometries))
+
+        # Built cells
+        cell_x, cell_y = first_cells[0]
+        keys = _cell_keys(np.repeat(np.arange(cell_x, cell_x + spans[0, 0]), spans[0, 1]), np.tile(np.arange(cell_y, cell_y + spans[0, 1]), spans[0, 0]))
+        first = np.searchsorted(self._keys, keys, 'left')
+        entry_counts = np.searchsorted(self._keys, keys, 'right') - first
+        entry_index = np.repeat(first - (np.cumsum(entry_counts) - entry_counts), entry_counts) + np.arange(int(entry_counts.sum()))
+        candidates = [self._entries[entry_index], self._large]
+
+        # Cells of inserted geometries
+        if self._inserted:
+            candidates.append(np.array([geometry_index for key in keys.tolist() for geometry_index in self._inserted.get(key, ())], dtype=np.int64))
+
+        return np.unique(np.concatenate(candidates))
+    #end def
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float) -> List[int]:
+        '''
+        Summary:
+            Geometries whose bounding box touches a window
+        Args:
+            min_x, min_y, max_x, max_y (float): Window in microns
+        Returns:
+            List[int]: Sorted indexes of the geometries
+        '''
+
+        candidates = self._candidates(min_x, min_y, max_x, max_y)
+        bounds = self._bounds[candidates]
+        touching = (bounds[:, 0] <= max_x) & (bounds[:, 2] >= min_x) & (bounds[:, 1] <= max_y) & (bounds[:, 3] >= min_y)
+        return candidates[touching].tolist()
+    #end def
+
+    def radius(self, x: float, y: float, radius: float) -> List[int]:
+        '''
+        Summary:
+            Geometries whose bounding box is within a distance of a point
+        Args:
+            x (float): X of the point
+            y (float): Y of the point
+            radius (float): Distance in microns
+        Returns:
+            List[int]: Sorted indexes of the geometries
+        '''
+
+        candidates = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        return candidates[_box_distances(self._bounds[candidates], x, y) <= radius].tolist()
+    #end def
+
+    def nearest(self, x: float, y: float, count: int = 1) -> List[int]:
+        '''
+        Summary:
+            Geometries with the closest bounding boxes to a point
+            NOTE The search window starts at one cell and doubles until it holds count geometries within its half width
+        Args:
+            x (float): X of the point
+            y (float): Y of the point
+            count (int, optional): Number of geometries. Defaults to 1.
+        Returns:
+            List[int]: Indexes of the geometries, closest first
+        '''
+
+        count = min(count, len(self.geometries))
+        if count <= 0:
+            return []
+
+        half_width = self.cell_size
+        while True:
+            candidates = self._candidates(x - half_width, y - half_width, x + half_width, y + half_width)
+            distances = _box_distances(self._bounds[candidates], x, y)
+
+            # Every geometry within the half width touches the window
+            if np.count_nonzero(distances <= half_width) >= count or len(candidates) == len(self.geometries):
+                order = np.lexsort((candidates, distances))[:count]
+                return candidates[order].tolist()
+            #end if
+            half_width *= 2
+        #end while
+    #end def
+#end class
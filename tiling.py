@@ -0,0 +1,281 @@
+'''
+Partitioning of geometries into stage tiles
+
+The plane is split into tiles of the galvo field size. Geometries that fit in their home tile widened by the overlap are
+kept whole in the tile holding the center of their bounding box, all others are cut at the tile borders: lines are
+clipped, arcs are split and ellipses, splines and polylines are converted to arcs and lines first. Every tile is returned
+in tile-local coordinates around its center.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import geometry_to_line
+from geometry_batch import GeometryBatch
+from spatial_index import SpatialIndex, geometry_bounds
+
+__author__ = 'Joseph Lawler'
+__version__ = '1.3.0'
+
+TGeometryItem = Tuple[str, List[Tuple[float, ...]]]
+TGeometryList = List[TGeometryItem]
+
+# Type every geometry type that can not be cut at tile borders is converted to first
+CUT_TYPES = {'ELLIPSE': 'ARC', 'SPLINE': 'LINE', 'LWPOLYLINE': 'ARC'}
+
+# Smallest number of geometries per worker process when partitioning in parallel
+PARALLEL_MIN_GEOMETRIES = 1000
+
+def _inside(x: float, y: float, core: Tuple[float, float, float, float]) -> bool:
+    '''
+    Summary:
+        Whether a point is inside a tile, tiles hold their lower and left borders only so borders belong to one tile
+    Args:
+        x (float): X of the point
+        y (float): Y of the point
+        core (Tuple[float, float, float, float]): Tile [MIN X, MIN Y, MAX X, MAX Y]
+    Returns:
+        bool: True inside the tile
+    '''
+
+    return core[0] <= x < core[2] and core[1] <= y < core[3]
+#end def
+
+def _clip_line(values: list, core: Tuple[float, float, float, float]) -> List[list]:
+    '''
+    Summary:
+        Clip a line to a tile with Liang-Barsky, Z is interpolated along the line
+    Args:
+        values (list): Line [START (X,Y,Z), END (X,Y,Z)]
+        core (Tuple[float, float, float, float]): Tile [MIN X, MIN Y, MAX X, MAX Y]
+    Returns:
+        List[list]: The clipped line, empty if no part of the line is in the tile
+    '''
+
+    start, end = values[0], values[1]
+    delta = [end_coordinate - start_coordinate for start_coordinate, end_coordinate in zip(start, end)]
+
+    # Shrink the parameter range of the line to each border
+    low, high = 0.0, 1.0
+    for direction, distance in ((-delta[0], start[0] - core[0]), (delta[0], core[2] - start[0]), (-delta[1], start[1] - core[1]), (delta[1], core[3] - start[1])):
+        if direction == 0:
+            if distance < 0:
+                return []
+            continue
+        #end if
+        parameter = distance/direction
+        if direction < 0:
+            low = max(low, parameter)
+        else:
+            high = min(high, parameter)
+    #end for
+
+    # Keep pieces with their middle inside the tile
+    if low >= high:
+        return []
+    middle = (low + high)/2
+    if not _inside(start[0] + middle*delta[0], start[1] + middle*delta[1], core):
+        return []
+    if low == 0 and high == 1:
+        return [list(values)]
+    return [[tuple(coordinate + low*step for coordinate, step in zip(start, delta)), tuple(coordinate + high*step for coordinate, step in zip(start, delta))]]
+#end def
+
+def _clip_arc(values: list, core: Tuple[float, float, float, float]) -> List[list]:
+    '''
+    Summary:
+        Split an arc at the borders of a tile
+    Args:
+        values (list): Arc [CENTER (X,Y,Z), (RADIUS, START ANGLE, END ANGLE)]
+        core (Tuple[float, float, float, float]): Tile [MIN X, MIN Y, MAX X, MAX Y]
+    Returns:
+        List[list]: Arcs of the parts of the arc in the tile
+    '''
+
+    center = values[0]
+    radius, start_angle, end_angle = values[1][:3]
+    sweep = (end_angle - start_angle) % 360 or 360
+
+    # Angles where the circle crosses the borders, measured from the start angle
+    cuts = [0.0, sweep]
+    for border_x in (core[0], core[2]):
+        if radius and abs(border_x - center[0]) <= radius:
+            angle = math.degrees(math.acos((border_x - center[0])/radius))
+            cuts += [(angle - start_angle) % 360, (-angle - start_angle) % 360]
+    #end for
+    for border_y in (core[1], core[3]):
+        if radius and abs(border_y - center[1]) <= radius:
+            angle = math.degrees(math.asin((border_y - center[1])/radius))
+            cuts += [(angle - start_angle) % 360, (180 - angle - start_angle) % 360]
+    #end for
+    cuts = sorted(set(cut for cut in cuts if 0 <= cut <= sweep))
+
+    # Keep the parts with their middle inside the tile, joining neighbouring parts
+    parts: List[List[float]] = []
+    for low, high in zip(cuts[:-1], cuts[1:]):
+        middle = math.radians(start_angle + (low + high)/2)
+        if not _inside(center[0] + radius*math.cos(middle), center[1] + radius*math.sin(middle), core):
+            continue
+        if parts and parts[-1][1] == low:
+            parts[-1][1] = high
+        else:
+            parts.append([low, high])
+    #end for
+
+    # Parts of a full circle joined across its start angle
+    if len(parts) > 1 and sweep == 360 and parts[0][0] == 0 and parts[-1][1] == 360:
+        parts = [[parts[-1][0], parts[0][1] + 360]] + parts[1:-1]
+
+    clipped: List[list] = []
+    for low, high in parts:
+        if low == 0 and high == sweep:
+            clipped.append(list(values))
+        else:
+            clipped.append([center, (radius, (start_angle + low) % 360, (start_angle + high) % 360)])
+    #end for
+    return clipped
+#end def
+
+def _partition_tiles(tiles: List[Tuple[Tuple[float, float, float, float], TGeometryList, List[bool]]]) -> List[TGeometryList]:
+    '''
+    Summary:
+        Cut and move the geometries of tiles into tile-local coordinates
+    Args:
+        tiles (List[Tuple[Tuple[float, float, float, float], TGeometryList, List[bool]]]): For every tile its [MIN X, MIN Y, MAX X, MAX Y],
+        its geometries and whether each geometry has to be cut at the tile borders
+    Returns:
+        List[TGeometryList]: Geometries of every tile around its center
+    '''
+
+    partitioned: List[TGeometryList] = []
+    for core, geometries, cut in tiles:
+        offset = (-(core[0] + core[2])/2, -(core[1] + core[3])/2, 0.0)
+        tile_geometries: TGeometryList = []
+        for (name, values), cut_geometry in zip(geometries, cut):
+            geometry_type = name.split(':')[0].upper()
+
+            # Parts inside the tile
+            if not cut_geometry:
+                parts = [values]
+            elif geometry_type == 'LINE':
+                parts = _clip_line(values, core)
+            else:
+                parts = _clip_arc(values, core)
+            #end if
+
+            for part in parts:
+                tile_geometries.append((name, geometry_to_line._translate_item(geometry_type, part, offset)))
+        #end for
+        partitioned.append(tile_geometries)
+    #end for
+    return partitioned
+#end def
+
+def partition(
+    given_geometry: TGeometryList,
+    tile_width: float,
+    tile_height: float,
+    overlap: float = 0,
+    origin: Optional[Tuple[float, float]] = None,
+    max_deviation: float = 0,
+    workers: int = 0) -> Dict[Tuple[float, float], TGeometryList]:
+    '''
+    Summary:
+        Split geometries into tiles of the given size, in tile-local coordinates around the tile center
+        NOTE Geometries that fit in the tile holding the center of their bounding box widened by overlap on every side are kept
+        whole in that tile. Others are cut at the tile borders: lines are clipped, arcs split and ellipses, splines and
+        polylines converted to arcs and lines first. Cut parts keep the ID # of their geometry
+    Args:
+        given_geometry (TGeometryList or GeometryBatch): Given geometries, for example the output of any importer
+        tile_width (float): Tile width in microns
+        tile_height (float): Tile height in microns
+        overlap (float, optional): Distance in microns geometries may reach past the tile borders and still be kept whole. Defaults to 0.
+        origin (Tuple[float, float], optional): Lower left corner of a tile, None uses the lower left corner of all geometries. Defaults to None.
+        max_deviation (float, optional): Largest distance in microns between converted and given curves that are cut, see geometry_to_line.convert_to. Defaults to 0.
+        workers (int, optional): Number of worker processes to split the tiles across, each gets at least PARALLEL_MIN_GEOMETRIES geometries. Defaults to 0.
+    Raises:
+        Exception: Tile size must be positive
+    Returns:
+        Dict[Tuple[float, float], TGeometryList]: Geometries of every tile holding any by the tile center (X,Y), row by row,
+        GeometryBatches if one was given
+    '''
+
+    if tile_width <= 0 or tile_height <= 0:
+        raise Exception('Tile size must be positive')
+
+    geometries: TGeometryList = given_geometry.to_list() if isinstance(given_geometry, GeometryBatch) else list(given_geometry)
+    if not geometries:
+        return {}
+    tile_size = np.array([tile_width, tile_height])
+
+    # Home tile and whether geometries fit in it
+    bounds = geometry_bounds(geometries)
+    if origin is None:
+        origin = tuple(bounds[:, 0:2].min(axis=0))
+    home_tiles = np.floor(((bounds[:, 0:2] + bounds[:, 2:4])/2 - origin)/tile_size).astype(np.int64)
+    home_corners = origin + home_tiles*tile_size
+    whole = np.all((bounds[:, 0:2] >= home_corners - overlap) & (bounds[:, 2:4] <= home_corners + tile_size + overlap), axis=1)
+
+    # Convert geometries that are cut and can not be cut themselves, the parts keep the ID # of their geometry
+    types = np.array([geometry[0].split(':')[0].upper() for geometry in geometries])
+    converted_geometries: TGeometryList = []
+    converted_positions: List[int] = []
+    for geometry_type, return_type in CUT_TYPES.items():
+        positions = np.flatnonzero(~whole & (types == geometry_type))
+        if not len(positions):
+            continue
+        sources: List[int] = []
+        converted = geometry_to_line.convert_to(geometry_type, return_type, [geometries[position] for position in positions], max_deviation=max_deviation, sources=sources)
+        for (name, values), source in zip(converted, sources):
+            converted_geometries.append((f'{name.split(":")[0]}:{geometries[positions[source]][0].split(":", 1)[-1]}', values))
+            converted_positions.append(positions[source])
+        #end for
+    #end for
+    if converted_geometries:
+        kept = np.flatnonzero(whole | ~np.isin(types, list(CUT_TYPES)))
+        geometries = [geometries[position] for position in kept] + converted_geometries
+        bounds = np.concatenate([bounds[kept], geometry_bounds(converted_geometries)])
+        home_tiles = np.concatenate([home_tiles[kept], np.zeros((len(converted_geometries), 2), dtype=np.int64)])
+        whole = np.concatenate([whole[kept], np.zeros(len(converted_geometries), dtype=bool)])
+
+        # Keep the given order
+        order = np.argsort(np.concatenate([kept, converted_positions]), kind='stable')
+        geometries = [geometries[position] for position in order]
+        bounds, home_tiles, whole = bounds[order], home_tiles[order], whole[order]
+    #end if
+
+    # Geometries of every tile, whole geometries only in their home tile
+    index = SpatialIndex(geometries)
+    first_tile = np.floor((bounds[:, 0:2].min(axis=0) - origin)/tile_size).astype(np.int64)
+    last_tile = np.floor((bounds[:, 2:4].max(axis=0) - origin)/tile_size).astype(np.int64)
+    keys: List[Tuple[float, float]] = []
+    tiles: List[Tuple[Tuple[float, float, float, float], TGeometryList, List[bool]]] = []
+    for row in range(first_tile[1], last_tile[1] + 1):
+        for column in range(first_tile[0], last_tile[0] + 1):
+            core = (origin[0] + column*tile_width, origin[1] + row*tile_height, origin[0] + (column + 1)*tile_width, origin[1] + (row + 1)*tile_height)
+            candidates = np.array(index.query(*core), dtype=np.int64)
+            candidates = candidates[~whole[candidates] | ((home_tiles[candidates, 0] == column) & (home_tiles[candidates, 1] == row))]
+            if not len(candidates):
+                continue
+            keys.append(((core[0] + core[2])/2, (core[1] + core[3])/2))
+            tiles.append((core, [geometries[candidate] for candidate in candidates.tolist()], (~whole[candidates]).tolist()))
+        #end for
+    #end for
+
+    # Cut and move tiles, in worker processes for large partitions
+    num_chunks = max(1, min(workers, len(geometries)//PARALLEL_MIN_GEOMETRIES, len(tiles)))
+    if num_chunks > 1:
+        chunk_bounds = [len(tiles)*chunk_index//num_chunks for chunk_index in range(num_chunks + 1)]
+        with ProcessPoolExecutor(max_workers=num_chunks) as executor:
+            partitioned = [tile for chunk in executor.map(_partition_tiles, [tiles[chunk_bounds[chunk_index]:chunk_bounds[chunk_index+1]] for chunk_index in range(num_chunks)]) for tile in chunk]
+    else:
+        partitioned = _partition_tiles(tiles)
+    #end if
+
+    # Drop tiles only touched by parts of geometries in other tiles
+    result = {key: tile_geometries for key, tile_geometries in zip(keys, partitioned) if tile_geometries}
+    if isinstance(given_geometry, GeometryBatch):
+        return {key: GeometryBatch.from_list(tile_geometries) for key, tile_geometries in result.items()}
+    return result
+#end def